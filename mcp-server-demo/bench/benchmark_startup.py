@@ -0,0 +1,126 @@
+"""
+MCPサーバーの起動時間ベンチマーク
+
+新しいPythonプロセスで davinci_mcp_server をインポートし、fake_resolve の
+シミュレータを接続して最初のツール呼び出しが返るまでの時間を計測します。
+ツールのマニフェストがない状態（全モジュールを読み込む初回起動）と、
+マニフェストがある状態（遅延読み込み）の両方を計測し、
+後者が予算を超えた場合は終了コード1で終了します。
+
+使い方:
+    python bench/benchmark_startup.py
+    python bench/benchmark_startup.py --runs 10 --budget-ms 2500 --tool get_project_name
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+
+# 子プロセスで実行するスクリプト（起動から最初のツール応答までを計測）
+CHILD_SCRIPT = """
+import asyncio, json, sys, time, warnings
+warnings.simplefilter("ignore")
+sys.path[:0] = [{src!r}, {bench!r}]
+
+import davinci_mcp_server as server
+from fake_resolve import build_demo_resolve
+from fastmcp import Client
+
+server.set_resolve_instance(build_demo_resolve(clip_count=10))
+
+async def first_request():
+    async with Client(server.mcp) as client:
+        tools = await client.list_tools()
+        await client.call_tool({tool!r}, {{}}, raise_on_error=False)
+        return len(tools)
+
+tool_count = asyncio.run(first_request())
+print(json.dumps({{
+    "first_request_ms": (time.perf_counter() - server.startup_profile.origin) * 1000,
+    "tools": tool_count,
+    "profile": server.startup_profile.as_dict(),
+}}))
+"""
+
+
+def run_once(tool, manifest_path):
+    """新しいプロセスで起動し、プロセス開始から最初のツール応答までを計測"""
+    env = dict(os.environ, DAVINCI_MCP_TOOL_MANIFEST=manifest_path)
+    script = CHILD_SCRIPT.format(src=SRC_DIR, bench=BENCH_DIR, tool=tool)
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result["process_ms"] = elapsed
+    return result
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+def run_benchmarks(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manifest_path = os.path.join(temp_dir, "tool_manifest.json")
+        for mode in ("cold", "warm"):
+            runs = []
+            for _ in range(args.runs):
+                if mode == "cold" and os.path.exists(manifest_path):
+                    os.remove(manifest_path)
+                runs.append(run_once(args.tool, manifest_path))
+            results[mode] = {
+                "process_ms_p50": _median([r["process_ms"] for r in runs]),
+                "first_request_ms_p50": _median([r["first_request_ms"] for r in runs]),
+                "tools": runs[-1]["tools"],
+                "profile": runs[-1]["profile"],
+            }
+    return results
+
+
+def print_report(results, budget_ms):
+    for mode, label in (("cold", "without manifest (all tool modules imported)"),
+                        ("warm", "with manifest (tool modules loaded on first call)")):
+        result = results[mode]
+        print(f"{mode}: {label}")
+        print(f"  process start -> first response               {result['process_ms_p50']:>9.1f} ms (p50)")
+        print(f"  server import -> first response               {result['first_request_ms_p50']:>9.1f} ms (p50)")
+        print(f"  tools registered                              {result['tools']:>9}")
+        for name, ms in result["profile"]["startup_phases_ms"].items():
+            print(f"    {name:<44} {ms:>9.1f} ms")
+        for name, ms in result["profile"]["deferred_phases_ms"].items():
+            print(f"    {name + ' (on first call)':<44} {ms:>9.1f} ms")
+    print(f"budget: {budget_ms:.0f} ms for process start -> first response (warm)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MCP server time-to-first-request")
+    parser.add_argument("--runs", type=int, default=5, help="server starts per mode")
+    parser.add_argument("--tool", default="get_project_name", help="tool used for the first request")
+    parser.add_argument("--budget-ms", type=float, default=4000.0,
+                        help="fail if the warm start takes longer than this to answer the first request")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, args.budget_ms)
+
+    warm_ms = results["warm"]["process_ms_p50"]
+    if warm_ms > args.budget_ms:
+        print(f"FAIL: warm start took {warm_ms:.1f} ms (budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
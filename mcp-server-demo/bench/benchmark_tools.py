@@ -0,0 +1,286 @@
+"""
+MCPツールのレイテンシ/API呼び出し回数ベンチマーク
+
+fake_resolve のシミュレータに対して register_tools() で登録したツールを
+FastMCP のインメモリクライアント経由で呼び出し、ツールごとの
+レイテンシのパーセンタイルと1回あたりのResolve API呼び出し回数を表示します。
+
+計測するシナリオ:
+- 大きなビン: get_project_name, add_solid_color_to_timeline, add_clips_to_timeline（クリップ名インデックス）,
+  search_clips（初回のインデックス構築と、その後の検索）, build_timeline
+- 大量のアイテムがあるトラック: find_free_timeline_slot, get_timeline_snapshot（全ページの取得と
+  キャッシュからの再取得）, execute_batch
+- import_media: 一時ディレクトリのファイルの初回取り込みと、取り込み済みの再実行
+- 同時接続クライアント
+
+使い方:
+    python bench/benchmark_tools.py
+    python bench/benchmark_tools.py --clips 10000 --track-items 5000 --clients 8 --latency 0.0005
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+# srcフォルダをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_resolve import build_demo_resolve
+
+# 1回の呼び出しが重いシナリオ (build_timeline, execute_batch, import_media の再実行) の呼び出し回数
+BUILD_ITERATIONS = 5
+BATCH_ITERATIONS = 5
+
+
+class ToolStats:
+    """1ツール分の計測結果"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.api_calls = []
+
+    def add(self, latency, api_calls):
+        self.latencies.append(latency)
+        self.api_calls.append(api_calls)
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        api_calls = sorted(self.api_calls)
+        return {
+            "tool": self.name,
+            "calls": len(latencies),
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "api_calls_p50": _percentile(api_calls, 0.50),
+            "api_calls_avg": sum(api_calls) / len(api_calls) if api_calls else 0.0,
+        }
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def create_server(resolve):
+    """シミュレータを接続したFastMCPサーバーを作成"""
+    from fastmcp import FastMCP
+    from tools import register_tools, set_resolve_instance
+
+    set_resolve_instance(resolve)
+    mcp = FastMCP("benchmark")
+    register_tools(mcp, lazy=False)
+    return mcp
+
+
+async def run_sequential(client, resolve, stats, tool_name, argument_list):
+    """ツールを順番に呼び出し、1回ごとのレイテンシとAPI呼び出し回数を記録"""
+    for arguments in argument_list:
+        before = resolve.recorder.total()
+        started = time.perf_counter()
+        await client.call_tool(tool_name, arguments, raise_on_error=False)
+        stats.add(time.perf_counter() - started, resolve.recorder.total() - before)
+
+
+async def run_pages(client, resolve, stats, tool_name, arguments):
+    """next_cursor をたどって全ページを取得し、1ページごとのレイテンシとAPI呼び出し回数を記録"""
+    cursor = None
+    while True:
+        before = resolve.recorder.total()
+        started = time.perf_counter()
+        result = await client.call_tool(tool_name, {**arguments, "cursor": cursor}, raise_on_error=False)
+        stats.add(time.perf_counter() - started, resolve.recorder.total() - before)
+        cursor = (result.data or {}).get("next_cursor")
+        if not cursor:
+            return
+
+
+def create_media_files(directory, count):
+    """import_media 用の空のメディアファイルを作成"""
+    for i in range(count):
+        subdirectory = os.path.join(directory, f"CARD{i // 100:03d}")
+        os.makedirs(subdirectory, exist_ok=True)
+        with open(os.path.join(subdirectory, f"A{i:05d}.mov"), "wb"):
+            pass
+
+
+async def run_concurrent(server, resolve, stats, tool_name, arguments, clients, calls_per_client):
+    """複数のクライアントから同時にツールを呼び出す"""
+    from fastmcp import Client
+
+    async def worker():
+        async with Client(server) as client:
+            for _ in range(calls_per_client):
+                started = time.perf_counter()
+                await client.call_tool(tool_name, arguments, raise_on_error=False)
+                latencies.append(time.perf_counter() - started)
+
+    latencies = []
+    before = resolve.recorder.total()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    per_call = (resolve.recorder.total() - before) / max(1, len(latencies))
+    for latency in latencies:
+        stats.add(latency, per_call)
+
+
+async def run_benchmarks(args, work_dir):
+    from fastmcp import Client
+
+    results = []
+
+    # 大きなビンからのクリップ挿入
+    resolve = build_demo_resolve(clip_count=args.clips, latency=args.latency)
+    server = create_server(resolve)
+    async with Client(server) as client:
+        stats = ToolStats("get_project_name")
+        await run_sequential(client, resolve, stats, "get_project_name", [{}] * args.iterations)
+        results.append(stats)
+
+        stats = ToolStats(f"add_solid_color_to_timeline ({args.clips} clip bin)")
+        await run_sequential(client, resolve, stats, "add_solid_color_to_timeline", [
+            {"start_frame": i * 60, "duration_in_frames": 48} for i in range(args.iterations)
+        ])
+        results.append(stats)
+
+        stats = ToolStats(f"add_clips_to_timeline ({args.placements} placements)")
+        offset = args.iterations * 60
+        await run_sequential(client, resolve, stats, "add_clips_to_timeline", [{
+            "placements": [
+                {"clip_name": "Solid Color", "start_frame": offset + i * 30, "duration_in_frames": 24,
+                 "track_index": 1 + i % 3}
+                for i in range(args.placements)
+            ]
+        }])
+        results.append(stats)
+
+        queries = ["clip", "name:clip 00", "solid", "clip 099", "clip 0001"]
+        stats = ToolStats(f"search_clips ({args.clips} clips, first call builds the index)")
+        await run_sequential(client, resolve, stats, "search_clips", [{"query": "clip", "refresh": True}])
+        results.append(stats)
+
+        stats = ToolStats(f"search_clips ({args.clips} clips, indexed)")
+        await run_sequential(client, resolve, stats, "search_clips", [
+            {"query": queries[i % len(queries)]} for i in range(args.iterations)
+        ])
+        results.append(stats)
+
+        build_clips = min(args.placements, args.clips)
+        stats = ToolStats(f"build_timeline ({build_clips} clips on track 1)")
+        await run_sequential(client, resolve, stats, "build_timeline", [{
+            "name": f"Bench build {i}",
+            "clips": [{"clip_name": f"Clip {j:05d}", "in_frame": 0, "out_frame": 24} for j in range(build_clips)],
+        } for i in range(BUILD_ITERATIONS)])
+        results.append(stats)
+
+        stats = ToolStats(f"build_timeline ({build_clips} clips on 3 tracks)")
+        await run_sequential(client, resolve, stats, "build_timeline", [{
+            "name": f"Bench build tracks {i}",
+            "clips": [{"clip_name": f"Clip {j:05d}", "in_frame": 0, "out_frame": 24, "track_index": 1 + j % 3}
+                      for j in range(build_clips)],
+        } for i in range(BUILD_ITERATIONS)])
+        results.append(stats)
+
+    # 大量のアイテムがあるトラックでの空き位置検索・スナップショット・一括編集
+    resolve = build_demo_resolve(clip_count=10, latency=args.latency, timeline_items=args.track_items)
+    server = create_server(resolve)
+    async with Client(server) as client:
+        stats = ToolStats(f"find_free_timeline_slot ({args.track_items} item track)")
+        await run_sequential(client, resolve, stats, "find_free_timeline_slot", [
+            {"start_frame": i * 24, "duration_in_frames": 48} for i in range(args.iterations)
+        ])
+        results.append(stats)
+
+        snapshot = {"fields": ["name", "start", "end", "duration"], "page_size": 1000}
+        stats = ToolStats(f"get_timeline_snapshot ({args.track_items} items, per page, first read)")
+        await run_pages(client, resolve, stats, "get_timeline_snapshot", snapshot)
+        results.append(stats)
+
+        stats = ToolStats(f"get_timeline_snapshot ({args.track_items} items, per page, cached)")
+        await run_pages(client, resolve, stats, "get_timeline_snapshot", snapshot)
+        results.append(stats)
+
+        # トラック末尾より後ろに追加し、追加したクリップの色を同じバッチで設定する
+        clip_ops = args.batch_ops // 2
+        track_end = args.track_items * 24
+        stats = ToolStats(f"execute_batch ({clip_ops} add_clip + {clip_ops} set_clip_color)")
+        await run_sequential(client, resolve, stats, "execute_batch", [{
+            "operations": [
+                {"op": "add_clip", "args": {"clip_name": "Solid Color", "duration_in_frames": 24,
+                                            "start_frame": track_end + (i * clip_ops + j) * 24}}
+                for j in range(clip_ops)
+            ] + [
+                {"op": "set_clip_color", "args": {"item": j, "color": "Orange"}}
+                for j in range(clip_ops)
+            ]
+        } for i in range(BATCH_ITERATIONS)])
+        results.append(stats)
+
+    # カードからのメディア取り込み
+    media_dir = os.path.join(work_dir, "media")
+    create_media_files(media_dir, args.import_files)
+    resolve = build_demo_resolve(clip_count=args.clips, latency=args.latency)
+    server = create_server(resolve)
+    async with Client(server) as client:
+        stats = ToolStats(f"import_media ({args.import_files} files, first import)")
+        await run_sequential(client, resolve, stats, "import_media", [{"paths": [media_dir]}])
+        results.append(stats)
+
+        stats = ToolStats(f"import_media ({args.import_files} files, already imported)")
+        await run_sequential(client, resolve, stats, "import_media", [{"paths": [media_dir]}] * BATCH_ITERATIONS)
+        results.append(stats)
+
+    # 同時接続クライアント
+    resolve = build_demo_resolve(clip_count=args.clips, latency=args.latency)
+    server = create_server(resolve)
+    stats = ToolStats(f"get_project_name ({args.clients} concurrent clients)")
+    await run_concurrent(server, resolve, stats, "get_project_name", {}, args.clients, args.iterations)
+    results.append(stats)
+
+    return [stats.summary() for stats in results]
+
+
+def print_table(summaries):
+    header = (f"{'tool':<60} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'API p50':>8} {'API avg':>8}")
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        print(f"{s['tool']:<60} {s['calls']:>6} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+              f"{s['p99_ms']:>9.2f} {s['api_calls_p50']:>8.0f} {s['api_calls_avg']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DaVinci Resolve MCP tools against a simulated Resolve")
+    parser.add_argument("--clips", type=int, default=10000, help="clips in the media pool bin")
+    parser.add_argument("--track-items", type=int, default=5000, help="items on video track 1")
+    parser.add_argument("--placements", type=int, default=200,
+                        help="placements for add_clips_to_timeline and clips for build_timeline")
+    parser.add_argument("--batch-ops", type=int, default=200, help="operations per execute_batch call")
+    parser.add_argument("--import-files", type=int, default=500, help="files for import_media")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent MCP clients")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per tool (per client when concurrent)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per Resolve API call")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    with tempfile.TemporaryDirectory() as work_dir:
+        # 取り込み済みインデックスとマニフェストはユーザーのファイルを使わない（tools を読み込む前に設定する）
+        os.environ["DAVINCI_MCP_IMPORT_INDEX"] = os.path.join(work_dir, "import_index.json")
+        os.environ["DAVINCI_MCP_TOOL_MANIFEST"] = os.path.join(work_dir, "tool_manifest.json")
+        summaries = asyncio.run(run_benchmarks(args, work_dir))
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        print_table(summaries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,941 @@
+"""
+DaVinci Resolve スクリプトAPIのインメモリ代替実装
+
+Resolve を起動できない環境 (CI など) でツールを動かすための簡易シミュレータです。
+すべてのAPI呼び出しを "クラス名.メソッド名" 単位でカウントし、
+呼び出しごとに任意のレイテンシを挿入できます。
+"""
+
+import base64
+import collections
+import itertools
+import json
+import threading
+import time
+
+
+class CallRecorder:
+    """API呼び出しの回数を記録し、レイテンシを挿入する"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name):
+        with self._lock:
+            self.counts[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def total(self):
+        with self._lock:
+            return sum(self.counts.values())
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+_ids = itertools.count(1)
+
+
+def _new_id(prefix):
+    return f"{prefix}-{next(_ids):08d}"
+
+
+# Timeline.Export() の書き出し種別（Resolveでは resolve.EXPORT_EDL などの定数）
+EXPORT_EDL = "EDL"
+EXPORT_FCPXML_1_10 = "FCPXML 1.10"
+EXPORT_OTIO = "OTIO"
+EXPORT_NONE = ""
+
+
+def _frames_to_timecode(frames, fps):
+    seconds, frame = divmod(frames, fps)
+    minutes, second = divmod(seconds, 60)
+    hours, minute = divmod(minutes, 60)
+    return f"{hours:02d}:{minute:02d}:{second:02d}:{frame:02d}"
+
+
+def _write_slowly(path, header, seconds, steps=10):
+    """書き出しに seconds 秒かかるResolveを模して、ファイルを少しずつ書く"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header)
+        for _ in range(steps if seconds else 0):
+            f.write("x" * 100000)
+            f.flush()
+            time.sleep(seconds / steps)
+
+
+class _FakeObject:
+    """
+    API メソッド (先頭が大文字) の呼び出しを記録する基底クラス
+
+    シミュレータ内部からの呼び出しは記録しないよう、内部では
+    先頭が小文字またはアンダースコアの属性・ヘルパーだけを使います。
+    Resolveと同様に、閉じられたプロジェクト配下のオブジェクトに対する
+    API呼び出しはNoneを返します。
+    """
+
+    def __init__(self, recorder):
+        self._recorder = recorder
+        self._closed = False
+
+    def __getattribute__(self, name):
+        attr = object.__getattribute__(self, name)
+        if name[:1].isupper() and callable(attr):
+            recorder = object.__getattribute__(self, "_recorder")
+            class_name = type(self).__name__.replace("Fake", "", 1)
+            obj = self
+
+            def api_call(*args, **kwargs):
+                recorder.record(f"{class_name}.{name}")
+                if object.__getattribute__(obj, "_closed"):
+                    return None
+                return attr(*args, **kwargs)
+
+            return api_call
+        return attr
+
+
+class _FakeMarkers:
+    """Timeline / TimelineItem / MediaPoolItem 共通のマーカーAPI（self._markers を使用）"""
+
+    def AddMarker(self, frameId, color, name, note, duration, customData=""):
+        if frameId in self._markers or duration <= 0:
+            return False
+        self._markers[frameId] = {"color": color, "duration": duration, "note": note, "name": name,
+                                  "customData": customData}
+        return True
+
+    def GetMarkers(self):
+        return {frame: dict(marker) for frame, marker in self._markers.items()}
+
+    def GetMarkerByCustomData(self, customData):
+        for frame, marker in self._markers.items():
+            if marker["customData"] == customData:
+                return {frame: dict(marker)}
+        return {}
+
+    def UpdateMarkerCustomData(self, frameId, customData):
+        if frameId not in self._markers:
+            return False
+        self._markers[frameId]["customData"] = customData
+        return True
+
+    def GetMarkerCustomData(self, frameId):
+        return self._markers.get(frameId, {}).get("customData", "")
+
+    def DeleteMarkersByColor(self, color):
+        frames = [frame for frame, marker in self._markers.items() if color == "All" or marker["color"] == color]
+        for frame in frames:
+            del self._markers[frame]
+        return bool(frames)
+
+    def DeleteMarkerAtFrame(self, frameNum):
+        return self._markers.pop(frameNum, None) is not None
+
+    def DeleteMarkerByCustomData(self, customData):
+        for frame, marker in list(self._markers.items()):
+            if marker["customData"] == customData:
+                del self._markers[frame]
+                return True
+        return False
+
+
+class FakeMediaPoolItem(_FakeMarkers, _FakeObject):
+    def __init__(self, recorder, name, frames=1000, properties=None, metadata=None):
+        super().__init__(recorder)
+        self._id = _new_id("mpi")
+        self._media_id = _new_id("media")
+        self._properties = {
+            "Clip Name": name,
+            "File Name": name,
+            "File Path": "",
+            "Frames": str(frames),
+            "Type": "Video",
+        }
+        self._properties.update(properties or {})
+        self._metadata = dict(metadata or {})
+        self._markers = {}
+
+    def GetName(self):
+        return self._properties["Clip Name"]
+
+    def SetName(self, name):
+        self._properties["Clip Name"] = name
+        return True
+
+    def GetUniqueId(self):
+        return self._id
+
+    def GetMediaId(self):
+        return self._media_id
+
+    def GetClipProperty(self, propertyName=None):
+        if not propertyName:
+            return dict(self._properties)
+        return self._properties.get(propertyName, "")
+
+    def SetClipProperty(self, propertyName, propertyValue):
+        self._properties[propertyName] = propertyValue
+        return True
+
+    def GetMetadata(self, metadataType=None):
+        if not metadataType:
+            return dict(self._metadata)
+        return self._metadata.get(metadataType, "")
+
+    def SetMetadata(self, metadataType, metadataValue=None):
+        if isinstance(metadataType, dict):
+            self._metadata.update(metadataType)
+        else:
+            self._metadata[metadataType] = metadataValue
+        return True
+
+
+class FakeFolder(_FakeObject):
+    def __init__(self, recorder, name):
+        super().__init__(recorder)
+        self._id = _new_id("folder")
+        self._name = name
+        self._clips = []
+        self._subfolders = []
+
+    def GetName(self):
+        return self._name
+
+    def GetUniqueId(self):
+        return self._id
+
+    def GetClipList(self):
+        return list(self._clips)
+
+    def GetSubFolderList(self):
+        return list(self._subfolders)
+
+    def GetIsFolderStale(self):
+        return False
+
+    def Export(self, filePath):
+        with open(filePath, "w", encoding="utf-8") as f:
+            f.write(f"DRB {self._name}\n")
+        return True
+
+    # シミュレータ用ヘルパー (APIとしてはカウントしない)
+    def add_clip(self, name, **kwargs):
+        clip = FakeMediaPoolItem(self._recorder, name, **kwargs)
+        self._clips.append(clip)
+        return clip
+
+    def add_subfolder(self, name):
+        folder = FakeFolder(self._recorder, name)
+        self._subfolders.append(folder)
+        return folder
+
+
+class FakeGraph(_FakeObject):
+    def __init__(self, recorder):
+        super().__init__(recorder)
+        self._num_nodes = 1
+        self._luts = {}
+        self._grade = None
+
+    def GetNumNodes(self):
+        return self._num_nodes
+
+    def SetLUT(self, nodeIndex, lutPath):
+        if not 1 <= nodeIndex <= self._num_nodes or not str(lutPath).lower().endswith((".cube", ".3dl", ".dat")):
+            return False
+        self._luts[nodeIndex] = lutPath
+        return True
+
+    def GetLUT(self, nodeIndex):
+        return self._luts.get(nodeIndex, "")
+
+    def ApplyGradeFromDRX(self, path, gradeMode):
+        if not str(path).lower().endswith(".drx") or gradeMode not in (0, 1, 2):
+            return False
+        self._copy_from(path, 3, {})
+        return True
+
+    def ResetAllGrades(self):
+        self._copy_from(None, 1, {})
+        return True
+
+    def _copy_from(self, grade, num_nodes, luts):
+        self._grade = grade
+        self._num_nodes = num_nodes
+        self._luts = dict(luts)
+
+
+class FakeTimelineItem(_FakeMarkers, _FakeObject):
+    def __init__(self, recorder, timeline, media_pool_item, start, duration, track_type, track_index,
+                 source_start=0):
+        super().__init__(recorder)
+        self._id = _new_id("ti")
+        self._timeline = timeline
+        self._media_pool_item = media_pool_item
+        self._start = start
+        self._duration = duration
+        self._track_type = track_type
+        self._track_index = track_index
+        self._source_start = source_start
+        self._name = media_pool_item._properties["Clip Name"] if media_pool_item else "Item"
+        self._properties = {
+            "Pan": 0.0, "Tilt": 0.0, "ZoomX": 1.0, "ZoomY": 1.0, "RotationAngle": 0.0,
+            "CropLeft": 0.0, "CropRight": 0.0, "CropTop": 0.0, "CropBottom": 0.0,
+            "Opacity": 100.0,
+        }
+        self._markers = {}
+        self._clip_color = ""
+        self._flags = []
+        self._graph = FakeGraph(recorder)
+
+    def GetName(self):
+        return self._name
+
+    def GetUniqueId(self):
+        return self._id
+
+    def GetStart(self, subframe_precision=False):
+        return self._start
+
+    def GetEnd(self, subframe_precision=False):
+        return self._start + self._duration
+
+    def GetDuration(self, subframe_precision=False):
+        return self._duration
+
+    def GetLeftOffset(self, subframe_precision=False):
+        return self._source_start
+
+    def GetRightOffset(self, subframe_precision=False):
+        return 0
+
+    def GetSourceStartFrame(self):
+        return self._source_start
+
+    def GetSourceEndFrame(self):
+        return self._source_start + self._duration
+
+    def GetMediaPoolItem(self):
+        return self._media_pool_item
+
+    def GetTrackTypeAndIndex(self):
+        return [self._track_type, self._track_index]
+
+    def GetProperty(self, propertyKey=None):
+        if not propertyKey:
+            return dict(self._properties)
+        return self._properties.get(propertyKey)
+
+    def SetProperty(self, propertyKey, propertyValue):
+        self._properties[propertyKey] = propertyValue
+        return True
+
+    def GetClipColor(self):
+        return self._clip_color
+
+    def SetClipColor(self, colorName):
+        self._clip_color = colorName
+        return True
+
+    def GetFlagList(self):
+        return list(self._flags)
+
+    def AddFlag(self, color):
+        self._flags.append(color)
+        return True
+
+    def GetNodeGraph(self, layerIdx=None):
+        return self._graph if self._track_type == "video" else None
+
+    def CopyGrades(self, tgtTimelineItems):
+        if not tgtTimelineItems or any(item._track_type != "video" for item in tgtTimelineItems):
+            return False
+        source = self._graph
+        for item in tgtTimelineItems:
+            item._graph._copy_from(source._grade, source._num_nodes, source._luts)
+        return True
+
+    def ClearClipColor(self):
+        self._clip_color = ""
+        return True
+
+
+class FakeTimeline(_FakeMarkers, _FakeObject):
+    def __init__(self, recorder, name, start_frame=86400):
+        super().__init__(recorder)
+        self._id = _new_id("timeline")
+        self._name = name
+        self._start_frame = start_frame
+        self._tracks = {"video": [[]], "audio": [[]], "subtitle": []}
+        self._markers = {}
+        self._playhead = start_frame
+        self._thumbnail_size = (960, 540)
+        self._settings = {
+            "timelineFrameRate": "24",
+            "timelineResolutionWidth": "1920",
+            "timelineResolutionHeight": "1080",
+        }
+
+    def GetName(self):
+        return self._name
+
+    def SetName(self, timelineName):
+        self._name = timelineName
+        return True
+
+    def GetUniqueId(self):
+        return self._id
+
+    def GetStartFrame(self):
+        return self._start_frame
+
+    def GetEndFrame(self):
+        ends = [item._start + item._duration for track in self._tracks["video"] for item in track]
+        return max(ends, default=self._start_frame)
+
+    def GetSetting(self, settingName=None):
+        if not settingName:
+            return dict(self._settings)
+        return self._settings.get(settingName, "")
+
+    def SetSetting(self, settingName, settingValue):
+        self._settings[settingName] = settingValue
+        return True
+
+    def GetTrackCount(self, trackType):
+        return len(self._tracks.get(trackType, []))
+
+    def AddTrack(self, trackType, subTrackType=None):
+        self._tracks.setdefault(trackType, []).append([])
+        return True
+
+    def GetItemListInTrack(self, trackType, index):
+        tracks = self._tracks.get(trackType, [])
+        if not 1 <= index <= len(tracks):
+            return None
+        return sorted(tracks[index - 1], key=lambda item: item._start)
+
+    def GetCurrentTimecode(self):
+        return _frames_to_timecode(self._playhead, self._fps())
+
+    def SetCurrentTimecode(self, timecode):
+        try:
+            hours, minutes, seconds, frames = (int(part) for part in timecode.replace(";", ":").split(":"))
+        except ValueError:
+            return False
+        fps = self._fps()
+        self._playhead = ((hours * 60 + minutes) * 60 + seconds) * fps + frames
+        return True
+
+    def GetCurrentVideoItem(self):
+        # 再生ヘッド位置の一番上のビデオトラックのアイテム
+        for track in reversed(self._tracks["video"]):
+            for item in track:
+                if item._start <= self._playhead < item._start + item._duration:
+                    return item
+        return None
+
+    def GetCurrentClipThumbnailImage(self):
+        item = self.GetCurrentVideoItem()
+        if item is None:
+            return {}
+        width, height = self._thumbnail_size
+        # アイテムとフレームごとに異なる縦縞の画像 (RGB 8bit)
+        seed = (hash(item._id) + self._playhead) & 0xFFFFFF
+        row = bytes((seed + x) & 0xFF for x in range(width * 3))
+        return {"width": width, "height": height, "format": "RGB 8 bit",
+                "data": base64.b64encode(row * height).decode("ascii")}
+
+    def Export(self, fileName, exportType, exportSubtype=None):
+        writers = {EXPORT_EDL: self._write_edl, EXPORT_FCPXML_1_10: self._write_fcpxml, EXPORT_OTIO: self._write_otio}
+        if exportType not in writers:
+            return False
+        with open(fileName, "w", encoding="utf-8") as f:
+            writers[exportType](f)
+        return True
+
+    def DeleteClips(self, timelineItems, ripple=False):
+        targets = {item._id for item in timelineItems}
+        found = False
+        for tracks in self._tracks.values():
+            for track in tracks:
+                before = len(track)
+                track[:] = [item for item in track if item._id not in targets]
+                found = found or len(track) != before
+        return found
+
+    # シミュレータ用ヘルパー
+    def _fps(self):
+        return int(round(float(self._settings["timelineFrameRate"])))
+
+    def _sorted_tracks(self, track_type):
+        return [sorted(track, key=lambda item: item._start) for track in self._tracks.get(track_type, [])]
+
+    def _write_edl(self, f):
+        fps = self._fps()
+        f.write(f"TITLE: {self._name}\nFCM: NON-DROP FRAME\n\n")
+        items = self._sorted_tracks("video")[0] if self._tracks["video"] else []
+        for number, item in enumerate(items, 1):
+            tc = [_frames_to_timecode(frame, fps) for frame in (
+                item._source_start, item._source_start + item._duration, item._start, item._start + item._duration)]
+            f.write(f"{number:03d}  AX       V     C        {' '.join(tc)}\n* FROM CLIP NAME: {item._name}\n\n")
+
+    def _write_fcpxml(self, f):
+        fps = self._fps()
+
+        def t(frames):
+            return f"{frames * 100}/{fps * 100}s"
+
+        # ビデオトラック1を基本ストーリーライン、その他のトラックを接続クリップにする
+        spine = []
+        position = self._start_frame
+        for item in (self._sorted_tracks("video") or [[]])[0]:
+            if item._start > position:
+                spine.append(["gap", "Gap", position, item._start - position, 0, []])
+            spine.append(["asset-clip", item._name, item._start, item._duration, item._source_start, []])
+            position = item._start + item._duration
+        end = max(self.GetEndFrame(), position)
+        spine.append(["gap", "Gap", position, end - position + 1, 0, []])
+        for track_type in ("video", "audio"):
+            for index, track in enumerate(self._sorted_tracks(track_type), 1):
+                if track_type == "video" and index == 1:
+                    continue
+                lane = index - 1 if track_type == "video" else -index
+                for item in track:
+                    parent = next(e for e in spine if e[2] <= item._start < e[2] + e[3])
+                    parent[5].append((lane, item))
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fcpxml>\n<fcpxml version="1.10">\n')
+        f.write(f'<resources><format id="r0" frameDuration="100/{fps * 100}s"/></resources>\n')
+        f.write(f'<library><event name="Timeline"><project name="{self._name}">'
+                f'<sequence format="r0" tcStart="{t(self._start_frame)}" duration="{t(end - self._start_frame)}">\n<spine>\n')
+        for tag, name, start, duration, source_start, children in spine:
+            f.write(f'<{tag} name="{name}" offset="{t(start)}" start="{t(source_start)}" duration="{t(duration)}">')
+            if tag == "asset-clip":
+                f.write('<adjust-transform position="0 0"/>')
+            for lane, item in children:
+                offset = source_start + (item._start - start)
+                f.write(f'<asset-clip name="{item._name}" lane="{lane}" offset="{t(offset)}" '
+                        f'start="{t(item._source_start)}" duration="{t(item._duration)}"/>')
+            f.write(f"</{tag}>\n")
+        f.write("</spine>\n</sequence></project></event></library>\n</fcpxml>\n")
+
+    def _write_otio(self, f):
+        fps = self._fps()
+
+        def rt(value):
+            return {"OTIO_SCHEMA": "RationalTime.1", "rate": float(fps), "value": float(value)}
+
+        def time_range(start, duration):
+            return {"OTIO_SCHEMA": "TimeRange.1", "start_time": rt(start), "duration": rt(duration)}
+
+        tracks = []
+        for kind, track_type in (("Video", "video"), ("Audio", "audio")):
+            for index, track in enumerate(self._sorted_tracks(track_type), 1):
+                children = []
+                position = self._start_frame
+                for item in track:
+                    if item._start > position:
+                        children.append({"OTIO_SCHEMA": "Gap.1", "name": "",
+                                         "source_range": time_range(0, item._start - position)})
+                    children.append({"OTIO_SCHEMA": "Clip.2", "name": item._name,
+                                     "metadata": {"Resolve_OTIO": {"Clip Color": item._clip_color}},
+                                     "source_range": time_range(item._source_start, item._duration)})
+                    position = item._start + item._duration
+                tracks.append({"OTIO_SCHEMA": "Track.1", "name": f"{kind} {index}", "kind": kind,
+                               "children": children})
+        json.dump({"OTIO_SCHEMA": "Timeline.1", "name": self._name, "global_start_time": rt(self._start_frame),
+                   "tracks": {"OTIO_SCHEMA": "Stack.1", "name": "tracks", "children": tracks}}, f)
+
+    def place(self, media_pool_item, track_index, duration, record_frame=None, source_start=0,
+              track_type="video"):
+        tracks = self._tracks.setdefault(track_type, [])
+        while len(tracks) < track_index:
+            tracks.append([])
+        track = tracks[track_index - 1]
+        if record_frame is None:
+            record_frame = max((item._start + item._duration for item in track), default=self._start_frame)
+        item = FakeTimelineItem(self._recorder, self, media_pool_item,
+                                record_frame, duration, track_type, track_index, source_start)
+        track.append(item)
+        return item
+
+
+class FakeMediaPool(_FakeObject):
+    def __init__(self, recorder, project):
+        super().__init__(recorder)
+        self._id = _new_id("mediapool")
+        self._project = project
+        self._root = FakeFolder(recorder, "Master")
+        self._current_folder = self._root
+        # ImportTimelineFromFile / ImportFolderFromFile にかかる秒数
+        self._import_seconds = 0.0
+
+    def GetUniqueId(self):
+        return self._id
+
+    def GetRootFolder(self):
+        return self._root
+
+    def GetCurrentFolder(self):
+        return self._current_folder
+
+    def SetCurrentFolder(self, folder):
+        self._current_folder = folder
+        return True
+
+    def AddSubFolder(self, folder, name):
+        return folder.add_subfolder(name)
+
+    def CreateEmptyTimeline(self, name):
+        return self._create_timeline(name)
+
+    def AppendToTimeline(self, *clips):
+        return self._append(clips)
+
+    def CreateTimelineFromClips(self, name, *clips):
+        timeline = self._create_timeline(name)
+        self._append(clips)
+        return timeline
+
+    def _create_timeline(self, name):
+        timeline = FakeTimeline(self._recorder, name)
+        self._project._timelines.append(timeline)
+        self._project._current_timeline = timeline
+        return timeline
+
+    def _append(self, clips):
+        timeline = self._project._current_timeline
+        if timeline is None:
+            return []
+        if len(clips) == 1 and isinstance(clips[0], list):
+            clips = clips[0]
+        appended = []
+        for clip in clips:
+            if isinstance(clip, dict):
+                mpi = clip["mediaPoolItem"]
+                start = clip.get("startFrame", 0)
+                end = clip.get("endFrame", int(mpi._properties["Frames"]) - 1)
+                appended.append(timeline.place(mpi, clip.get("trackIndex", 1), end - start + 1,
+                                               clip.get("recordFrame"), start))
+            else:
+                appended.append(timeline.place(clip, 1, int(clip._properties["Frames"])))
+        return appended
+
+    def ImportMedia(self, items):
+        imported = []
+        for item in items:
+            path = item["FilePath"] if isinstance(item, dict) else item
+            name = path.replace("\\", "/").rsplit("/", 1)[-1]
+            clip = self._current_folder.add_clip(name, properties={"File Path": path})
+            imported.append(clip)
+        return imported
+
+    def ImportTimelineFromFile(self, filePath, importOptions=None):
+        try:
+            with open(filePath, "r", encoding="utf-8") as f:
+                f.readline()
+        except (OSError, UnicodeDecodeError):
+            return None
+        time.sleep(self._import_seconds)
+        name = (importOptions or {}).get("timelineName") or filePath.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        return self._create_timeline(name)
+
+    def ImportFolderFromFile(self, filePath, sourceClipsPath=""):
+        try:
+            with open(filePath, "r", encoding="utf-8") as f:
+                header = f.readline()
+        except (OSError, UnicodeDecodeError):
+            return False
+        if not header.startswith("DRB "):
+            return False
+        time.sleep(self._import_seconds)
+        self._root.add_subfolder(header[4:].strip())
+        return True
+
+    def DeleteClips(self, clips):
+        targets = {clip._id for clip in clips}
+        folders = [self._root]
+        while folders:
+            folder = folders.pop()
+            folder._clips = [clip for clip in folder._clips if clip._id not in targets]
+            folders.extend(folder._subfolders)
+        return True
+
+
+class FakeProject(_FakeObject):
+    def __init__(self, recorder, name):
+        super().__init__(recorder)
+        self._id = _new_id("project")
+        self._name = name
+        self._timelines = []
+        self._current_timeline = None
+        self._media_pool = FakeMediaPool(recorder, self)
+        self._render_settings = {}
+        self._render_jobs = {}
+        self._render_seconds = 2.0
+
+    def GetName(self):
+        return self._name
+
+    def GetUniqueId(self):
+        return self._id
+
+    def GetMediaPool(self):
+        return self._media_pool
+
+    def GetTimelineCount(self):
+        return len(self._timelines)
+
+    def GetTimelineByIndex(self, idx):
+        return self._timelines[idx - 1]
+
+    def GetCurrentTimeline(self):
+        return self._current_timeline
+
+    def SetCurrentTimeline(self, timeline):
+        self._current_timeline = timeline
+        return True
+
+    def RefreshLUTList(self):
+        return True
+
+    def LoadRenderPreset(self, presetName):
+        return presetName in ("H.264 Master", "YouTube - 1080p")
+
+    def SetRenderSettings(self, settings):
+        self._render_settings.update(settings)
+        return True
+
+    def AddRenderJob(self):
+        if self._current_timeline is None:
+            return None
+        job_id = _new_id("render")
+        self._render_jobs[job_id] = {
+            "JobId": job_id,
+            "TimelineName": self._current_timeline._name,
+            "TargetDir": self._render_settings.get("TargetDir", ""),
+            "OutputFilename": self._render_settings.get("CustomName", self._current_timeline._name) + ".mov",
+            "_started": None,
+            "_stopped": None,
+        }
+        return job_id
+
+    def DeleteRenderJob(self, jobId):
+        return self._render_jobs.pop(jobId, None) is not None
+
+    def GetRenderJobList(self):
+        return [{k: v for k, v in job.items() if not k.startswith("_")} for job in self._render_jobs.values()]
+
+    def StartRendering(self, *args, isInteractiveMode=False):
+        job_ids = args[0] if args and isinstance(args[0], list) else list(args)
+        job_ids = job_ids or list(self._render_jobs)
+        if any(job_id not in self._render_jobs for job_id in job_ids):
+            return False
+        now = time.monotonic()
+        for job_id in job_ids:
+            self._render_jobs[job_id].update(_started=now, _stopped=None)
+        return True
+
+    def StopRendering(self):
+        now = time.monotonic()
+        for job in self._render_jobs.values():
+            if job["_started"] is not None and job["_stopped"] is None and self._render_progress(job, now) < 100:
+                job["_stopped"] = now
+
+    def IsRenderingInProgress(self):
+        now = time.monotonic()
+        return any(self._render_status(job, now)["JobStatus"] == "Rendering" for job in self._render_jobs.values())
+
+    def GetRenderJobStatus(self, jobId):
+        job = self._render_jobs.get(jobId)
+        return self._render_status(job, time.monotonic()) if job is not None else {}
+
+    def _render_progress(self, job, now):
+        elapsed = (job["_stopped"] or now) - job["_started"]
+        return min(100, int(elapsed / self._render_seconds * 100))
+
+    def _render_status(self, job, now):
+        if job["_started"] is None:
+            return {"JobStatus": "Ready", "CompletionPercentage": 0}
+        progress = self._render_progress(job, now)
+        if job["_stopped"] is not None:
+            return {"JobStatus": "Cancelled", "CompletionPercentage": progress}
+        if progress >= 100:
+            return {"JobStatus": "Complete", "CompletionPercentage": 100,
+                    "TimeTakenToRenderInMs": int(self._render_seconds * 1000)}
+        remaining = int(self._render_seconds * 1000 * (100 - progress) / 100)
+        return {"JobStatus": "Rendering", "CompletionPercentage": progress,
+                "EstimatedTimeRemainingInMs": remaining}
+
+    def _set_closed(self, closed):
+        objects = [self, self._media_pool]
+        folders = [self._media_pool._root]
+        while folders:
+            folder = folders.pop()
+            objects.append(folder)
+            objects.extend(folder._clips)
+            folders.extend(folder._subfolders)
+        for timeline in self._timelines:
+            objects.append(timeline)
+            objects.extend(item for tracks in timeline._tracks.values() for track in tracks for item in track)
+        for obj in objects:
+            obj._closed = closed
+
+
+class FakeProjectManager(_FakeObject):
+    def __init__(self, recorder):
+        super().__init__(recorder)
+        self._projects = {}
+        self._current = None
+        # ExportProject / ImportProject などにかかる秒数
+        self._export_seconds = 0.0
+
+    def CreateProject(self, projectName, mediaLocationPath=None):
+        if projectName in self._projects:
+            return None
+        project = FakeProject(self._recorder, projectName)
+        self._projects[projectName] = project
+        self._switch(project)
+        return project
+
+    def LoadProject(self, projectName):
+        project = self._projects.get(projectName)
+        if project is not None:
+            self._switch(project)
+        return project
+
+    def CloseProject(self, project):
+        if project is self._current:
+            self._switch(None)
+        return True
+
+    def GetCurrentProject(self):
+        return self._current
+
+    def SaveProject(self):
+        return self._current is not None
+
+    def GetProjectListInCurrentFolder(self):
+        return list(self._projects)
+
+    def ExportProject(self, projectName, filePath, withStillsAndLUTs=True):
+        project = self._projects.get(projectName)
+        if project is None:
+            return False
+        _write_slowly(filePath, f"DRP {projectName}\n", self._export_seconds)
+        return True
+
+    def ArchiveProject(self, projectName, filePath, isArchiveSrcMedia=True, isArchiveRenderCache=True,
+                       isArchiveProxyMedia=False):
+        return self.ExportProject(projectName, filePath)
+
+    def ImportProject(self, filePath, projectName=None):
+        try:
+            with open(filePath, "r", encoding="utf-8") as f:
+                header = f.readline()
+        except OSError:
+            return False
+        if not header.startswith("DRP "):
+            return False
+        time.sleep(self._export_seconds)
+        name = projectName or filePath.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        if name in self._projects:
+            return False
+        self._projects[name] = FakeProject(self._recorder, name)
+        return True
+
+    def _switch(self, project):
+        # 切り替え前のプロジェクト配下のハンドルはResolveと同様に無効になる
+        if self._current is not None and self._current is not project:
+            self._current._set_closed(True)
+        if project is not None:
+            project._set_closed(False)
+        self._current = project
+
+
+class FakeResolve(_FakeObject):
+    EXPORT_EDL = EXPORT_EDL
+    EXPORT_FCPXML_1_10 = EXPORT_FCPXML_1_10
+    EXPORT_OTIO = EXPORT_OTIO
+    EXPORT_NONE = EXPORT_NONE
+
+    def __init__(self, latency=0.0, product_name="DaVinci Resolve Studio", version="20.2.0.0"):
+        recorder = CallRecorder(latency)
+        super().__init__(recorder)
+        self.recorder = recorder
+        self._product_name = product_name
+        self._version = version
+        self._project_manager = FakeProjectManager(recorder)
+        self._running = True
+
+    def GetProjectManager(self):
+        return self._project_manager if self._running else None
+
+    def GetProductName(self):
+        # 終了したResolveのスクリプトAPIはNoneを返す
+        return self._product_name if self._running else None
+
+    def GetVersionString(self):
+        return self._version if self._running else None
+
+    def Quit(self):
+        self._running = False
+        return True
+
+
+def build_demo_resolve(clip_count=100, latency=0.0, clip_names=("Solid Color",), timeline_items=0):
+    """
+    ベンチマーク/動作確認用のResolveを構築
+
+    Args:
+        clip_count: カレントフォルダに作成するクリップ数
+        latency: API呼び出し1回あたりの遅延(秒)
+        clip_names: 末尾に追加する既知の名前のクリップ
+        timeline_items: ビデオトラック1に並べるアイテム数
+
+    Returns:
+        FakeResolveインスタンス
+    """
+    resolve = FakeResolve(latency=latency)
+    project = resolve._project_manager._projects.setdefault("Demo Project", FakeProject(resolve.recorder, "Demo Project"))
+    resolve._project_manager._switch(project)
+    folder = project._media_pool._root
+    for i in range(clip_count):
+        folder.add_clip(f"Clip {i:05d}")
+    for name in clip_names:
+        folder.add_clip(name)
+    timeline = project._media_pool._create_timeline("Timeline 1")
+    filler = folder._clips[0] if folder._clips else None
+    for _ in range(timeline_items):
+        timeline.place(filler, 1, 24)
+    resolve.recorder.reset()
+    return resolve
+
+
+def build_demo_farm(names=("edit1", "edit2"), **kwargs):
+    """
+    接続プールの動作確認用に、独立したResolveを複数構築
+
+    Args:
+        names: 接続名
+        **kwargs: build_demo_resolve() の引数
+
+    Returns:
+        {接続名: FakeResolveインスタンス}（プロジェクト名は "Demo Project (接続名)"）
+    """
+    farm = {}
+    for name in names:
+        resolve = build_demo_resolve(**kwargs)
+        project = resolve._project_manager._current
+        project._name = f"Demo Project ({name})"
+        farm[name] = resolve
+    return farm
@@ -3,18 +3,38 @@ DaVinci Resolve MCP Server
 MCPサーバーのメインエントリーポイント
 """
 
+# 起動時間の計測を最初に開始
+from startup_profile import get_startup_profile
+startup_profile = get_startup_profile()
+
+import contextlib
+
 # DaVinci Resolve環境対応: stderr/stdoutをラップ
 from stream_wrapper import setup_stream_wrappers
 setup_stream_wrappers()
 
-from fastmcp import FastMCP
-from tools import register_tools, set_resolve_instance
+with startup_profile.measure("import fastmcp"):
+    from fastmcp import FastMCP
+with startup_profile.measure("import tools"):
+    from tools import register_tools, set_resolve_instance
+
+
+@contextlib.asynccontextmanager
+async def report_startup(server):
+    """待ち受け開始時に起動時間を出力するライフスパン"""
+    if startup_profile.ready_at is None:
+        startup_profile.mark_ready()
+        print(startup_profile.report())
+    yield
+
 
 # Create an MCP server
-mcp = FastMCP("Demo", json_response=True)
+mcp = FastMCP("Demo", json_response=True, lifespan=report_startup)
 
-# ツールを登録
-register_tools(mcp)
+# ツールを登録（/metrics でPrometheus形式のレイテンシ統計を公開）
+# 各カテゴリの実装モジュールは最初の呼び出し時に読み込まれる
+with startup_profile.measure("register tools"):
+    register_tools(mcp, metrics_route="/metrics")
 
 
 def run_server(resolve=None, transport="streamable-http"):
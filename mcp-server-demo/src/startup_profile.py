@@ -0,0 +1,90 @@
+"""
+MCPサーバー起動時間の計測
+
+モジュールのインポートやツール登録などの各段階の所要時間と、
+プロセス開始から待ち受け開始までの時間を記録します。
+計測自体が起動を遅くしないよう、標準ライブラリだけを使います。
+"""
+
+import contextlib
+import time
+
+
+class StartupProfile:
+    """起動の各段階の所要時間を記録するクラス"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []
+        self.ready_at = None
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """
+        with ブロックの所要時間を1つの段階として記録
+
+        Args:
+            name: 段階の名前（"import fastmcp" など）
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started, self.ready_at is not None))
+
+    def mark_ready(self):
+        """
+        待ち受けを開始したことを記録
+
+        Returns:
+            計測開始から待ち受け開始までの時間(秒)
+        """
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+        return self.ready_at - self.origin
+
+    def as_dict(self):
+        """
+        計測結果を取得
+
+        Returns:
+            起動前の段階、起動後に遅延実行された段階、待ち受けまでの時間(ミリ秒)の辞書
+        """
+        return {
+            "time_to_listening_ms": _ms(self.ready_at - self.origin) if self.ready_at else None,
+            "startup_phases_ms": {name: _ms(seconds) for name, seconds, deferred in self.phases if not deferred},
+            "deferred_phases_ms": {name: _ms(seconds) for name, seconds, deferred in self.phases if deferred},
+        }
+
+    def report(self):
+        """
+        起動時の出力用に整形した計測結果
+
+        Returns:
+            複数行の文字列
+        """
+        lines = ["Startup timing:"]
+        for name, seconds, deferred in self.phases:
+            if not deferred:
+                lines.append(f"  {name:<40} {_ms(seconds):>9.1f} ms")
+        if self.ready_at is not None:
+            lines.append(f"  {'time to listening':<40} {_ms(self.ready_at - self.origin):>9.1f} ms")
+        return "\n".join(lines)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+# プロセス全体で共有する計測結果（最初にインポートされた時刻が起点）
+startup_profile = StartupProfile()
+
+
+def get_startup_profile():
+    """
+    共有の起動時間の計測結果を取得
+
+    Returns:
+        StartupProfileインスタンス
+    """
+    return startup_profile
@@ -5,21 +5,27 @@ DaVinci Resolve MCP サーバーのツール統合モジュール
 MCPサーバーへの登録を一元管理します。
 """
 
-from .base import set_resolve_instance, get_resolve_instance
-from .project_tools import register_project_tools
-from .timeline_tools import register_timeline_tools
+from .base import set_resolve_instance, get_resolve_instance, get_resolve_context
+from .catalog import TOOL_CATEGORIES, register_categories
+from .change_feed_tools import register_change_feed_tools
+from .executor import get_executor
+from .metrics import get_metrics
+from .server_tools import register_server_tools
 
 
-def register_tools(mcp):
+def register_tools(mcp, metrics_route=None, lazy=True):
     """
     すべてのツールをMCPサーバーに登録
     
     Args:
         mcp: FastMCPインスタンス
+        metrics_route: Prometheus形式のメトリクスを公開するHTTPパス（Noneの場合は公開しない）
+        lazy: 各カテゴリの実装モジュールを最初の呼び出しまで読み込まないか
     """
-    # 各カテゴリのツールを登録
-    register_project_tools(mcp)
-    register_timeline_tools(mcp)
+    # 各カテゴリのツールを登録（カテゴリの一覧は catalog.TOOL_CATEGORIES）
+    register_categories(mcp, TOOL_CATEGORIES, lazy=lazy)
+    register_server_tools(mcp, metrics_route=metrics_route)
+    register_change_feed_tools(mcp)
 
 
 # 外部から使用できるようにエクスポート
@@ -27,4 +33,7 @@ __all__ = [
     'register_tools',
     'set_resolve_instance',
     'get_resolve_instance',
+    'get_resolve_context',
+    'get_executor',
+    'get_metrics',
 ]
@@ -0,0 +1,371 @@
+"""
+WAVファイルの音量解析（無音・立ち上がりの検出）
+
+auto_cut_from_audio のために、WAV (PCM / IEEE float、RF64 を含む) を mmap で開き、
+一定の長さのチャンクごとに短い区間 (ANALYSIS_WINDOW_SECONDS) のRMSを計算します。
+ファイル全体を読み込まないため、1時間のマルチトラックのファイルでも
+メモリ使用量はチャンクの大きさ (CHUNK_SAMPLES) と区間ごとの音量の配列だけです
+（読み終えたページは madvise で手放します）。24bit / 32bit の整数は上位16bitだけを読みます。
+
+区間の音量は全チャンネルのうち最も大きいチャンネルの値とし、
+すべてのチャンネルが閾値を下回る区間を無音とみなします。
+
+NumPyがあればチャンクを配列としてまとめて計算し、なければ 16bit / 32bit の
+ファイルだけを memoryview と math.sumprod で計算します（8bit / 24bit / 64bit はNumPyが必要）。
+"""
+
+import math
+import mmap
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 音量を計算する区間の長さ(秒)
+ANALYSIS_WINDOW_SECONDS = 0.01
+
+# 1チャンクあたりのサンプル数（全チャンネルの合計。float32で8MB）
+CHUNK_SAMPLES = 1 << 21
+
+# 立ち上がりの判定で比べる、何区間前の音量か
+ONSET_LAG_WINDOWS = 3
+
+AUDIO_CUT_MODES = ("silence", "onsets")
+
+# 無音とみなす音量の下限（0 の対数を避ける）
+_SILENCE_FLOOR_DB = -120.0
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (形式, ビット数) → (memoryview.cast の形式, 最大値)（NumPyがない場合に使う）
+_MEMORYVIEW_FORMATS = {
+    (_WAVE_FORMAT_PCM, 16): ("h", 32768.0),
+    (_WAVE_FORMAT_PCM, 32): ("i", 2147483648.0),
+    (_WAVE_FORMAT_IEEE_FLOAT, 32): ("f", 1.0),
+}
+
+
+class WavFile:
+    """
+    mmap で開いたWAVファイル
+
+    Args:
+        path: WAVファイルのパス
+
+    Raises:
+        OSError: ファイルを開けない場合
+        ValueError: WAVファイルでない、または対応していない形式の場合
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        try:
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_header(self):
+        data = self._map
+        if len(data) < 12 or data[0:4] not in (b"RIFF", b"RF64") or data[8:12] != b"WAVE":
+            raise ValueError(f"{self.path} is not a WAV file")
+        large_data_size = None
+        fmt = None
+        position = 12
+        while position + 8 <= len(data):
+            chunk_id = data[position:position + 4]
+            size, = struct.unpack_from("<I", data, position + 4)
+            body = position + 8
+            if chunk_id == b"ds64":
+                # RF64 の data チャンクの大きさは ds64 チャンクにある
+                _, large_data_size = struct.unpack_from("<QQ", data, body)
+            elif chunk_id == b"fmt ":
+                fmt = struct.unpack_from("<HHIIHH", data, body)
+                if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                    # WAVE_FORMAT_EXTENSIBLE はサブフォーマットのGUIDの先頭2バイトが実際の形式
+                    fmt = (struct.unpack_from("<H", data, body + 24)[0], *fmt[1:])
+            elif chunk_id == b"data":
+                if size == 0xFFFFFFFF and large_data_size is not None:
+                    size = large_data_size
+                # 書き込み途中のファイルなどでは大きさがファイルの残りを超えることがある
+                self.data_offset = body
+                self.data_size = min(size, len(data) - body)
+                break
+            position = body + size + (size & 1)
+        else:
+            raise ValueError(f"{self.path} has no audio data")
+        if fmt is None:
+            raise ValueError(f"{self.path} has no format chunk")
+
+        self.format, self.channels, self.sample_rate, _, self.block_align, self.bits = fmt
+        supported = {_WAVE_FORMAT_PCM: (8, 16, 24, 32), _WAVE_FORMAT_IEEE_FLOAT: (32, 64)}
+        if self.bits not in supported.get(self.format, ()):
+            raise ValueError(f"Unsupported WAV format ({self.format}, {self.bits} bit); "
+                             "only PCM 8/16/24/32 bit and float 32/64 bit are supported")
+        if not self.channels or not self.sample_rate or self.block_align != self.channels * self.bits // 8:
+            raise ValueError(f"{self.path} has an invalid format chunk")
+        self.frames = self.data_size // self.block_align
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def info(self):
+        return {
+            "path": self.path,
+            "duration": round(self.duration, 3),
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "bits": self.bits,
+            "float": self.format == _WAVE_FORMAT_IEEE_FLOAT,
+        }
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_numpy(self, start, count):
+        # mmap をコピーせずに参照し、[-1, 1] の float32 の (フレーム, チャンネル) 配列にする
+        offset = self.data_offset + start * self.block_align
+        samples = count * self.channels
+        if self.format == _WAVE_FORMAT_IEEE_FLOAT:
+            raw = np.frombuffer(self._map, dtype=f"<f{self.bits // 8}", count=samples, offset=offset)
+            block = raw.astype(np.float32)
+        elif self.bits == 8:
+            raw = np.frombuffer(self._map, dtype=np.uint8, count=samples, offset=offset)
+            block = (raw.astype(np.float32) - 128.0) / 128.0
+        else:
+            # 24bit / 32bit は上位2バイトだけを int16 として飛び飛びに参照する
+            # （音量の判定には16bitの精度で足り、24bit の値を組み立てるより大幅に速い）
+            width = self.bits // 8
+            raw = np.ndarray((samples,), dtype="<i2", buffer=self._map, offset=offset + width - 2, strides=(width,))
+            block = raw.astype(np.float32)
+            block *= 1.0 / 32768.0
+        return block.reshape(count, self.channels)
+
+    def _release(self, start, count):
+        # 読み終えた範囲のページを手放し、ファイルの大きさに比例してメモリ使用量が増えないようにする
+        if not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        begin = self.data_offset + start * self.block_align
+        end = begin + count * self.block_align
+        begin -= begin % mmap.PAGESIZE
+        end -= end % mmap.PAGESIZE
+        if end > begin:
+            self._map.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+
+    def envelope(self, window_seconds=ANALYSIS_WINDOW_SECONDS):
+        """
+        区間ごとの音量 (dBFS、最も大きいチャンネルのRMS) を計算
+
+        Args:
+            window_seconds: 区間の長さ(秒)
+
+        Returns:
+            区間ごとの音量（NumPyがあれば float32 の配列、なければリスト）
+
+        Raises:
+            ValueError: NumPyがなく、ファイルの形式を memoryview で読めない場合
+        """
+        window = max(1, int(round(self.sample_rate * window_seconds)))
+        windows = -(-self.frames // window)
+        if np is None:
+            return self._envelope_memoryview(window, windows)
+
+        envelope = np.empty(windows, dtype=np.float32)
+        chunk_windows = max(1, CHUNK_SAMPLES // (window * self.channels))
+        for first in range(0, windows, chunk_windows):
+            start = first * window
+            count = min(chunk_windows * window, self.frames - start)
+            block = self._read_numpy(start, count)
+            full = count // window
+            # 区間ごと・チャンネルごとの二乗平均を1回の einsum で計算
+            shaped = block[:full * window].reshape(full, window, self.channels)
+            levels = (np.einsum("wsc,wsc->wc", shaped, shaped) / window).max(axis=1)
+            if count > full * window:
+                # 末尾の短い区間
+                tail = block[full * window:]
+                levels = np.append(levels, (np.einsum("sc,sc->c", tail, tail) / len(tail)).max())
+            envelope[first:first + len(levels)] = levels
+            del block, shaped
+            self._release(start, count)
+        np.maximum(envelope, 10 ** (_SILENCE_FLOOR_DB / 10), out=envelope)
+        return 10 * np.log10(envelope)
+
+    def _envelope_memoryview(self, window, windows):
+        cast = _MEMORYVIEW_FORMATS.get((self.format, self.bits))
+        if cast is None:
+            raise ValueError(f"NumPy is required to analyze {self.bits} bit WAV files")
+        code, scale = cast
+        channels = self.channels
+        view = memoryview(self._map)[self.data_offset:self.data_offset + self.frames * self.block_align].cast(code)
+        envelope = []
+        try:
+            for index in range(windows):
+                start = index * window * channels
+                end = min(start + window * channels, len(view))
+                count = (end - start) // channels
+                loudest = 0.0
+                for channel in range(channels):
+                    samples = view[start + channel:end:channels]
+                    loudest = max(loudest, math.sumprod(samples, samples) / count)
+                level = loudest / (scale * scale)
+                envelope.append(10 * math.log10(level) if level > 0 else _SILENCE_FLOOR_DB)
+        finally:
+            view.release()
+        return envelope
+
+
+def find_silences(envelope, threshold_db, min_windows):
+    """
+    音量が閾値を下回り続ける区間を探す
+
+    Args:
+        envelope: WavFile.envelope() の結果
+        threshold_db: 無音とみなす音量 (dBFS)
+        min_windows: 無音とみなす最短の区間数
+
+    Returns:
+        [(開始区間, 終了区間)]（終了は含まない）
+    """
+    if np is not None:
+        quiet = np.concatenate(([False], np.asarray(envelope) < threshold_db, [False]))
+        edges = np.flatnonzero(quiet[1:] != quiet[:-1])
+        starts, ends = edges[0::2], edges[1::2]
+        keep = ends - starts >= min_windows
+        return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+    silences = []
+    start = None
+    for index, level in enumerate([*envelope, math.inf]):
+        if level < threshold_db:
+            if start is None:
+                start = index
+        elif start is not None:
+            if index - start >= min_windows:
+                silences.append((start, index))
+            start = None
+    return silences
+
+
+def find_onsets(envelope, threshold_db, rise_db, min_gap_windows):
+    """
+    音量が急に大きくなる位置（発話や拍の始まり）を探す
+
+    Args:
+        envelope: WavFile.envelope() の結果
+        threshold_db: これより小さい音は立ち上がりとみなさない (dBFS)
+        rise_db: ONSET_LAG_WINDOWS 区間前からの音量の増加がこれ以上の位置を立ち上がりとする
+        min_gap_windows: 立ち上がりの最短の間隔（区間数）
+
+    Returns:
+        立ち上がりの区間番号のリスト
+    """
+    lag = ONSET_LAG_WINDOWS
+    if np is not None:
+        levels = np.asarray(envelope)
+        rising = np.flatnonzero((levels[lag:] - levels[:-lag] >= rise_db) & (levels[lag:] >= threshold_db)) + lag
+        candidates = rising.tolist()
+    else:
+        candidates = [index for index in range(lag, len(envelope))
+                      if envelope[index] - envelope[index - lag] >= rise_db and envelope[index] >= threshold_db]
+    # 立ち上がりは連続した区間で検出されるため、間隔の短いものは最初の1つだけにする
+    onsets = []
+    for index in candidates:
+        if not onsets or index - onsets[-1] >= min_gap_windows:
+            onsets.append(index)
+    return onsets
+
+
+def keep_regions(silences, windows, padding_windows, min_windows):
+    """
+    無音区間を除いた残す区間を計算（無音の前後に padding_windows ずつ余白を残す）
+
+    Args:
+        silences: find_silences() の結果
+        windows: 全区間数
+        padding_windows: 残す区間の前後に付ける余白（区間数）
+        min_windows: これより短い残す区間は捨てる（区間数）
+
+    Returns:
+        [(開始区間, 終了区間)]（終了は含まない）
+    """
+    regions = []
+    position = 0
+    for start, end in silences:
+        # ファイルの先頭・末尾の無音には余白を付けない
+        cut_start = start + padding_windows if start > 0 else 0
+        cut_end = end - padding_windows if end < windows else windows
+        if cut_end <= cut_start:
+            continue
+        if cut_start - position >= min_windows:
+            regions.append((position, cut_start))
+        position = cut_end
+    if windows - position >= min_windows:
+        regions.append((position, windows))
+    return regions
+
+
+def analyze_audio(path, mode="silence", threshold_db=-40.0, min_silence=0.5, padding=0.1, min_segment=0.25,
+                  onset_db=9.0, min_onset_gap=0.25):
+    """
+    WAVファイルを解析して残す区間（秒）を計算（ワーカースレッドで実行）
+
+    Args:
+        path: WAVファイルのパス
+        mode: "silence" は無音を除いた区間、"onsets" は立ち上がりごとに区切った区間
+        threshold_db: 無音とみなす音量 (dBFS)
+        min_silence: 除く無音の最短の長さ(秒)
+        padding: 残す区間の前後に付ける余白(秒)
+        min_segment: これより短い区間は捨てる(秒)
+        onset_db: 立ち上がりとみなす音量の増加 (dB)
+        min_onset_gap: 立ち上がりの最短の間隔(秒)
+
+    Returns:
+        {"audio": ファイルの情報, "regions": [(開始秒, 終了秒)], "silences": 無音区間の数,
+         "onsets": 立ち上がりの数}
+
+    Raises:
+        OSError: ファイルを開けない場合
+        ValueError: 対応していないファイルの場合
+    """
+    with WavFile(path) as wav:
+        envelope = wav.envelope()
+        info = wav.info()
+        duration = wav.duration
+    windows = len(envelope)
+
+    def to_windows(seconds):
+        return max(0, int(round(seconds / ANALYSIS_WINDOW_SECONDS)))
+
+    silences = find_silences(envelope, threshold_db, max(1, to_windows(min_silence)))
+    result = {"audio": info, "silences": len(silences)}
+    if mode == "onsets":
+        onsets = find_onsets(envelope, threshold_db, onset_db, max(1, to_windows(min_onset_gap)))
+        bounds = [0, *(index for index in onsets if index > 0), windows]
+        regions = [(start, end) for start, end in zip(bounds, bounds[1:])
+                   if end - start >= to_windows(min_segment)]
+        result["onsets"] = len(onsets)
+    else:
+        regions = keep_regions(silences, windows, to_windows(padding), to_windows(min_segment))
+    result["regions"] = [(start * ANALYSIS_WINDOW_SECONDS, min(end * ANALYSIS_WINDOW_SECONDS, duration))
+                         for start, end in regions]
+    return result
@@ -2,6 +2,15 @@
 DaVinci Resolve MCP サーバーの基底クラスと共通機能
 """
 
+import asyncio
+import functools
+import inspect
+import json
+import threading
+import time
+
+from .metrics import instrument
+
 # グローバル変数としてresolveインスタンスを保持
 resolve_instance = None
 
@@ -10,11 +19,15 @@ def set_resolve_instance(resolve):
     """
     DaVinci Resolveインスタンスを設定
     
+    API呼び出しのレイテンシを計測するため、計測用プロキシで包んで保持します。
+    
     Args:
         resolve: DaVinci Resolveインスタンス
     """
     global resolve_instance
-    resolve_instance = resolve
+    resolve_instance = instrument(resolve)
+    # 接続先が変わるため、キャッシュしたツールの結果をすべて破棄
+    tool_cache.invalidate("project")
 
 
 def get_resolve_instance():
@@ -25,3 +38,377 @@ def get_resolve_instance():
         DaVinci Resolveインスタンス（存在しない場合はNone）
     """
     return resolve_instance
+
+
+class ResolveContext:
+    """
+    プロジェクト/タイムライン/メディアプール/フォルダのハンドルキャッシュ
+    
+    ツールの呼び出しごとに GetProjectManager() から辿り直す代わりに、
+    取得済みのハンドルを再利用します。begin_call() で呼び出しの開始を通知すると、
+    各ハンドルは最初にアクセスされたときに1回だけ検証されます。
+    
+    - プロジェクト: キャッシュ済みハンドルの GetUniqueId() が一致するか確認
+    - タイムライン: キャッシュ済みプロジェクトの GetCurrentTimeline() で取得し直す
+      （プロジェクトが切り替わって古いハンドルが無効になっていればNoneが返るため、
+      その場合はプロジェクトから取得し直す）
+    - メディアプール: プロジェクトが変わらない限り再利用
+    - カレントフォルダ: ユーザーが切り替えられるため毎回 GetCurrentFolder() で取得
+    
+    プロジェクトが切り替わった場合は配下のハンドルをすべて破棄します。
+    """
+    
+    def __init__(self, resolve):
+        self.resolve = resolve
+        self._project_manager = None
+        self.invalidate()
+    
+    def invalidate(self):
+        """キャッシュ済みのハンドルをすべて破棄"""
+        self._project = None
+        self._project_id = None
+        self._media_pool = None
+        self._timeline = None
+        self._timeline_id = None
+        self._folder = None
+        self._folder_id = None
+        self.begin_call()
+    
+    def begin_call(self):
+        """ツール呼び出しの開始を通知（次のアクセス時にハンドルを再検証させる）"""
+        self._project_checked = False
+        self._timeline_checked = False
+        self._folder_checked = False
+    
+    @property
+    def project_manager(self):
+        """ProjectManager（Resolveインスタンスごとに1回だけ取得）"""
+        if self._project_manager is None:
+            self._project_manager = self.resolve.GetProjectManager()
+        return self._project_manager
+    
+    @property
+    def project(self):
+        """現在のプロジェクト（開かれていない場合はNone）"""
+        if not self._project_checked:
+            if self._project is None or self._project.GetUniqueId() != self._project_id:
+                self._load_project()
+            self._project_checked = True
+        return self._project
+    
+    @property
+    def project_id(self):
+        """現在のプロジェクトの GetUniqueId()"""
+        return self._project_id if self.project is not None else None
+    
+    @property
+    def media_pool(self):
+        """現在のプロジェクトのメディアプール"""
+        project = self.project
+        if project is not None and self._media_pool is None:
+            self._media_pool = project.GetMediaPool()
+        return self._media_pool
+    
+    @property
+    def timeline(self):
+        """現在のタイムライン（開かれていない場合はNone）"""
+        if not self._timeline_checked:
+            timeline = None
+            if self._project is not None and not self._project_checked:
+                # キャッシュ済みプロジェクトが有効ならプロジェクトの検証も兼ねる
+                timeline = self._project.GetCurrentTimeline()
+                if timeline is not None:
+                    self._project_checked = True
+            if timeline is None and self.project is not None:
+                timeline = self._project.GetCurrentTimeline()
+            self._timeline = timeline
+            self._timeline_id = None
+            self._timeline_checked = True
+        return self._timeline
+    
+    @property
+    def timeline_id(self):
+        """現在のタイムラインの GetUniqueId()"""
+        timeline = self.timeline
+        if timeline is not None and self._timeline_id is None:
+            self._timeline_id = timeline.GetUniqueId()
+        return self._timeline_id
+    
+    @property
+    def current_folder(self):
+        """メディアプールで現在選択されているフォルダ"""
+        if not self._folder_checked:
+            media_pool = self.media_pool
+            self._folder = media_pool.GetCurrentFolder() if media_pool else None
+            self._folder_id = None
+            self._folder_checked = True
+        return self._folder
+    
+    def _load_project(self):
+        project = self.project_manager.GetCurrentProject()
+        project_id = project.GetUniqueId() if project else None
+        if project_id != self._project_id or project is None:
+            self.invalidate()
+        if project_id != self._project_id:
+            # プロジェクトが切り替わった場合はキャッシュしたツールの結果も破棄
+            tool_cache.invalidate("project")
+        self._project = project
+        self._project_id = project_id
+
+
+# resolveインスタンスに対応するハンドルキャッシュ
+resolve_context = None
+
+
+def get_resolve_context():
+    """
+    現在のresolveインスタンスに対応するハンドルキャッシュを取得
+    
+    Returns:
+        ResolveContextインスタンス（resolveインスタンスが存在しない場合はNone）
+    """
+    global resolve_context
+    if resolve_instance is None:
+        return None
+    if resolve_context is None or resolve_context.resolve is not resolve_instance:
+        resolve_context = ResolveContext(resolve_instance)
+    return resolve_context
+
+
+# キャッシュのスコープ → そのスコープを無効化したときに一緒に破棄するスコープ
+CACHE_SCOPES = {
+    "project": ("project", "timeline", "folder"),
+    "timeline": ("timeline",),
+    "folder": ("folder",),
+}
+
+# 結果を保持する既定の秒数
+DEFAULT_CACHE_TTL = 5.0
+
+# 保持する結果の上限
+MAX_CACHE_ENTRIES = 1024
+
+# キャッシュしない結果（Resolveに接続できない場合のメッセージ。混雑している場合は例外になる）
+_UNCACHED_PREFIXES = ("No Resolve instance available",)
+
+
+def _cacheable(value):
+    if isinstance(value, str):
+        return not value.startswith(_UNCACHED_PREFIXES)
+    if isinstance(value, dict):
+        return "error" not in value
+    return True
+
+
+class ToolCache:
+    """
+    読み取り専用ツールの結果のTTL付きキャッシュ
+    
+    結果は (ツール名, 引数) をキーとして、スコープ (project / timeline / folder) を付けて保持します。
+    
+    - 書き込みを行うツールは invalidate() でスコープの結果を破棄する（@invalidates）
+    - 同じキーの呼び出しが同時に来た場合は最初の1回だけを実行し、残りはその結果（例外を含む）を待つ
+    - 実行中に無効化されたスコープの結果は保持しない（無効化より前の状態の可能性があるため）
+    - Resolve上での直接の操作は検出できないため、TTLで古さの上限を決める
+    """
+    
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # キー → (有効期限, 結果, スコープ)
+        self._entries = {}
+        # キー → (実行中の呼び出しの結果を受け取る Future, スコープ)
+        self._inflight = {}
+        self._generations = {scope: 0 for scope in CACHE_SCOPES}
+        self._tools = {}
+        self.invalidations = {scope: 0 for scope in CACHE_SCOPES}
+    
+    async def get_or_call(self, key, scope, ttl, func):
+        """
+        キャッシュ済みの結果を返す。なければ func() を実行して結果を保持する
+        
+        Args:
+            key: (ツール名, 引数の文字列)
+            scope: CACHE_SCOPES のキー
+            ttl: 結果を保持する秒数
+            func: 結果を返すコルーチン関数
+        
+        Returns:
+            ツールの結果
+        """
+        while True:
+            with self._lock:
+                counters = self._tools.setdefault(key[0], {"hits": 0, "misses": 0, "coalesced": 0})
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    counters["hits"] += 1
+                    return entry[1]
+                flight = self._inflight.get(key)
+                if flight is None:
+                    counters["misses"] += 1
+                    generation = self._generations[scope]
+                    future = asyncio.get_running_loop().create_future()
+                    self._inflight[key] = (future, scope)
+                    break
+                counters["coalesced"] += 1
+            # 待っている側がキャンセルされても実行中の呼び出しは止めない
+            try:
+                return await asyncio.shield(flight[0])
+            except asyncio.CancelledError:
+                if not flight[0].cancelled():
+                    raise
+                # 実行していた呼び出しがキャンセルされた場合は自分で実行し直す
+        
+        try:
+            value = await func()
+        except BaseException as e:
+            self._finish(key, future)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # 待っている呼び出しがない場合に "never retrieved" の警告を出さない
+                future.exception()
+            raise
+        self._finish(key, future)
+        with self._lock:
+            if self._generations[scope] == generation and _cacheable(value):
+                self._store(key, (time.monotonic() + ttl, value, scope))
+        future.set_result(value)
+        return value
+    
+    def invalidate(self, scope):
+        """
+        スコープの結果を破棄（どのスレッドからでも呼び出せる）
+        
+        Args:
+            scope: CACHE_SCOPES のキー（"project" は timeline / folder も破棄）
+        """
+        scopes = CACHE_SCOPES[scope]
+        with self._lock:
+            self.invalidations[scope] += 1
+            for name in scopes:
+                self._generations[name] += 1
+            self._entries = {key: entry for key, entry in self._entries.items() if entry[2] not in scopes}
+            # 実行中の呼び出しの結果は無効化より前の状態の可能性があるため、以降の呼び出しは待たせない
+            self._inflight = {key: flight for key, flight in self._inflight.items() if flight[1] not in scopes}
+    
+    def stats(self):
+        """
+        ツールごとのヒット率などの統計情報を取得
+        
+        Returns:
+            統計情報の辞書
+        """
+        with self._lock:
+            tools = {}
+            for name, counters in sorted(self._tools.items()):
+                calls = counters["hits"] + counters["misses"] + counters["coalesced"]
+                tools[name] = dict(counters, hit_rate=round((calls - counters["misses"]) / calls, 3) if calls else 0.0)
+            hits = sum(c["hits"] for c in self._tools.values())
+            coalesced = sum(c["coalesced"] for c in self._tools.values())
+            calls = hits + coalesced + sum(c["misses"] for c in self._tools.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "in_flight": len(self._inflight),
+                "calls": calls,
+                "hit_rate": round((hits + coalesced) / calls, 3) if calls else 0.0,
+                "invalidations": dict(self.invalidations),
+                "tools": tools,
+            }
+    
+    def _finish(self, key, future):
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None and flight[0] is future:
+                del self._inflight[key]
+    
+    def _store(self, key, entry):
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            now = time.monotonic()
+            self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+            # 期限切れを除いても多い場合は古いものから破棄
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+
+# すべてのツールで共有するキャッシュ
+tool_cache = ToolCache()
+
+
+def get_tool_cache():
+    """
+    共有のツール結果キャッシュを取得
+    
+    Returns:
+        ToolCacheインスタンス
+    """
+    return tool_cache
+
+
+def cached(scope, ttl=DEFAULT_CACHE_TTL):
+    """
+    読み取り専用ツールの結果をキャッシュするデコレータ（@mcp.tool() の内側に付ける）
+    
+    Args:
+        scope: 結果が依存するスコープ ("project" / "timeline" / "folder")
+        ttl: 結果を保持する秒数
+    
+    Returns:
+        デコレータ
+    
+    Raises:
+        ValueError: 未知のスコープの場合
+    """
+    if scope not in CACHE_SCOPES:
+        raise ValueError(f"Unknown cache scope: {scope}")
+    
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__name__, json.dumps(bound.arguments, sort_keys=True, default=repr))
+            return await tool_cache.get_or_call(key, scope, ttl, lambda: func(*args, **kwargs))
+        
+        return wrapper
+    
+    return decorator
+
+
+def invalidates(*scopes):
+    """
+    書き込みを行うツールの実行後にスコープのキャッシュを破棄するデコレータ（@mcp.tool() の内側に付ける）
+    
+    失敗した場合も一部が書き込まれている可能性があるため、常に破棄します。
+    
+    Args:
+        *scopes: 破棄するスコープ ("project" / "timeline" / "folder")
+    
+    Returns:
+        デコレータ
+    
+    Raises:
+        ValueError: 未知のスコープの場合
+    """
+    unknown = [scope for scope in scopes if scope not in CACHE_SCOPES]
+    if unknown:
+        raise ValueError(f"Unknown cache scope: {', '.join(unknown)}")
+    
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                for scope in scopes:
+                    tool_cache.invalidate(scope)
+        
+        return wrapper
+    
+    return decorator
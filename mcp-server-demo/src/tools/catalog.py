@@ -0,0 +1,262 @@
+"""
+ツールカテゴリの記述子と遅延読み込み
+
+各カテゴリの実装モジュール (project_tools, timeline_tools など) は、
+最初にそのカテゴリのツールやリソースが呼び出されたときに読み込みます。
+起動時には、前回の起動時に保存したマニフェスト（ツール名・説明・パラメータの
+JSONスキーマ）から軽量な代理コンポーネントを登録するだけで済みます。
+
+マニフェストは実装モジュールのファイルの更新時刻とサイズ、tools パッケージの
+すべてのモジュールの更新時刻とサイズ（実装モジュールが読み込むヘルパーの変更も
+スキーマに影響するため）、FastMCPのバージョンで検証し、一致しないカテゴリは
+通常どおり読み込んでマニフェストを作り直します。
+"""
+
+import functools
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import threading
+
+import fastmcp
+from fastmcp.resources import Resource, ResourceTemplate
+from fastmcp.tools import Tool
+from pydantic import PrivateAttr
+
+from startup_profile import get_startup_profile
+
+# マニフェストの保存先（環境変数で変更可能）
+TOOL_MANIFEST_ENV = "DAVINCI_MCP_TOOL_MANIFEST"
+DEFAULT_TOOL_MANIFEST_PATH = os.path.join(os.path.expanduser("~"), ".davinci_mcp", "tool_manifest.json")
+
+# マニフェストの形式のバージョン（保存する項目を変えたら上げる）
+TOOL_MANIFEST_VERSION = 2
+
+
+@functools.lru_cache(maxsize=None)
+def _package_fingerprint():
+    """tools パッケージのすべてのモジュールの更新時刻とサイズのハッシュ（プロセスごとに1回だけ計算）"""
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            stat = os.stat(os.path.join(package_dir, name))
+            digest.update(f"{name}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return digest.hexdigest()
+
+
+class _ComponentCollector:
+    """
+    register_*_tools() に FastMCP の代わりに渡し、登録されるコンポーネントを集めるクラス
+
+    カテゴリのモジュールは mcp.tool() と mcp.resource() だけを使う前提です。
+    """
+
+    def __init__(self):
+        self.tools = {}
+        self.resources = {}
+        self.templates = {}
+
+    def tool(self, name=None, **kwargs):
+        def decorator(fn):
+            tool = Tool.from_function(fn, name=name, **kwargs)
+            self.tools[tool.name] = tool
+            return fn
+        return decorator
+
+    def resource(self, uri, **kwargs):
+        def decorator(fn):
+            if "{" in uri:
+                template = ResourceTemplate.from_function(fn, uri_template=uri, **kwargs)
+                self.templates[template.uri_template] = template
+            else:
+                resource = Resource.from_function(fn, uri=uri, **kwargs)
+                self.resources[str(resource.uri)] = resource
+            return fn
+        return decorator
+
+
+class ToolCategory:
+    """
+    ツールカテゴリの記述子
+
+    Args:
+        name: カテゴリ名
+        module: tools パッケージ内の実装モジュール名
+        register: 実装モジュール内の登録関数名
+    """
+
+    def __init__(self, name, module, register):
+        self.name = name
+        self.module = module
+        self.register = register
+        self._components = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._components is not None
+
+    def fingerprint(self):
+        """実装モジュールとパッケージ全体のファイルの更新時刻とサイズ（モジュールを読み込まずに取得）"""
+        spec = importlib.util.find_spec(f"{__package__}.{self.module}")
+        stat = os.stat(spec.origin)
+        return f"{fastmcp.__version__}:{stat.st_mtime_ns}:{stat.st_size}:{_package_fingerprint()}"
+
+    def load(self):
+        """
+        実装モジュールを読み込み、登録されるコンポーネントを集める
+
+        Returns:
+            _ComponentCollectorインスタンス
+        """
+        if self._components is None:
+            with self._lock:
+                if self._components is None:
+                    with get_startup_profile().measure(f"import {__package__}.{self.module}"):
+                        module = importlib.import_module(f"{__package__}.{self.module}")
+                        collector = _ComponentCollector()
+                        getattr(module, self.register)(collector)
+                    self._components = collector
+        return self._components
+
+    def manifest(self):
+        """
+        読み込み済みのコンポーネントからマニフェストのエントリを作成
+
+        Returns:
+            JSONに変換できる辞書
+        """
+        components = self.load()
+        return {
+            "fingerprint": self.fingerprint(),
+            "tools": [
+                tool.model_dump(mode="json", include={"name", "title", "description", "parameters",
+                                                      "output_schema", "annotations", "meta", "tags"})
+                for tool in components.tools.values()
+            ],
+            "resources": [
+                resource.model_dump(mode="json", include={"uri", "name", "title", "description", "mime_type"})
+                for resource in components.resources.values()
+            ],
+            "templates": [
+                template.model_dump(mode="json", include={"uri_template", "name", "title", "description",
+                                                          "mime_type", "parameters"})
+                for template in components.templates.values()
+            ],
+        }
+
+
+class LazyTool(Tool):
+    """最初の呼び出し時にカテゴリを読み込み、実装のツールに処理を委譲する代理ツール"""
+
+    _category: ToolCategory = PrivateAttr()
+
+    async def run(self, arguments):
+        return await self._category.load().tools[self.name].run(arguments)
+
+
+class LazyResource(Resource):
+    """最初の読み取り時にカテゴリを読み込む代理リソース"""
+
+    _category: ToolCategory = PrivateAttr()
+
+    async def read(self):
+        return await self._category.load().resources[str(self.uri)].read()
+
+
+class LazyResourceTemplate(ResourceTemplate):
+    """最初の読み取り時にカテゴリを読み込む代理リソーステンプレート"""
+
+    _category: ToolCategory = PrivateAttr()
+
+    async def create_resource(self, uri, params):
+        return await self._category.load().templates[self.uri_template].create_resource(uri, params)
+
+
+def _lazy(cls, category, fields):
+    component = cls(**fields)
+    component._category = category
+    return component
+
+
+# 登録するツールカテゴリ（新しいカテゴリはここに追加する）
+TOOL_CATEGORIES = (
+    ToolCategory("project", "project_tools", "register_project_tools"),
+    ToolCategory("media_pool", "media_pool_tools", "register_media_pool_tools"),
+    ToolCategory("timeline", "timeline_tools", "register_timeline_tools"),
+    ToolCategory("render", "render_tools", "register_render_tools"),
+    ToolCategory("color", "color_tools", "register_color_tools"),
+)
+
+
+def _manifest_path():
+    return os.environ.get(TOOL_MANIFEST_ENV) or DEFAULT_TOOL_MANIFEST_PATH
+
+
+def _load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != TOOL_MANIFEST_VERSION:
+        return {}
+    return manifest.get("categories", {})
+
+
+def _save_manifest(path, categories):
+    # 書き込み途中で壊れないよう一時ファイルから置き換える
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": TOOL_MANIFEST_VERSION, "categories": categories}, f)
+        os.replace(temp_path, path)
+    except OSError:
+        # 保存できなくても次回の起動が遅くなるだけなので無視する
+        pass
+
+
+def register_categories(mcp, categories=TOOL_CATEGORIES, lazy=True):
+    """
+    ツールカテゴリをMCPサーバーに登録
+
+    lazy=True の場合、マニフェストが最新のカテゴリは代理コンポーネントだけを登録し、
+    実装モジュールは最初の呼び出しまで読み込みません。
+
+    Args:
+        mcp: FastMCPインスタンス
+        categories: 登録するToolCategoryのリスト
+        lazy: 遅延読み込みを使うか
+    """
+    path = _manifest_path()
+    manifest = _load_manifest(path) if lazy else {}
+    stale = False
+
+    for category in categories:
+        entry = manifest.get(category.name)
+        if lazy and entry is not None and entry.get("fingerprint") == category.fingerprint():
+            for fields in entry["tools"]:
+                mcp.add_tool(_lazy(LazyTool, category, fields))
+            for fields in entry["resources"]:
+                mcp.add_resource(_lazy(LazyResource, category, fields))
+            for fields in entry["templates"]:
+                mcp.add_template(_lazy(LazyResourceTemplate, category, fields))
+            continue
+
+        components = category.load()
+        for tool in components.tools.values():
+            mcp.add_tool(tool)
+        for resource in components.resources.values():
+            mcp.add_resource(resource)
+        for template in components.templates.values():
+            mcp.add_template(template)
+        if lazy:
+            manifest[category.name] = category.manifest()
+            stale = True
+
+    if stale:
+        _save_manifest(path, manifest)
@@ -0,0 +1,66 @@
+"""
+タイムライン変更フィードのリソース
+
+フィードは読み出し専用（ポーリング）です。クライアントは davinci://timeline/changes/{since} を
+定期的に読んで、前回の連番以降のイベントだけを取得します。FastMCPにはリソース購読の
+公開APIがなく、購読の capability も広告されないため、更新の通知は送りません。
+
+ミドルウェアに実際のFastMCPインスタンスが必要なため、
+このモジュールは遅延読み込みのカテゴリではなく起動時に登録します。
+"""
+
+from fastmcp.server.middleware import Middleware
+
+from .timeline_changes import FEED_URI, TIMELINE_EDIT_TAG, get_change_feed
+
+
+class ChangeFeedMiddleware(Middleware):
+    """TIMELINE_EDIT_TAG 付きのツールの実行後に変更フィードへ差分の取得を依頼するミドルウェア"""
+
+    def __init__(self, mcp):
+        self.mcp = mcp
+
+    async def on_call_tool(self, context, call_next):
+        try:
+            return await call_next(context)
+        finally:
+            try:
+                tool = await self.mcp.get_tool(context.message.name)
+            except Exception:
+                tool = None
+            if tool is not None and TIMELINE_EDIT_TAG in tool.tags:
+                get_change_feed().notify_edit()
+
+
+def register_change_feed_tools(mcp):
+    """
+    変更フィードのリソースとミドルウェアをMCPサーバーに登録
+
+    Args:
+        mcp: FastMCPインスタンス
+    """
+    feed = get_change_feed()
+    mcp.add_middleware(ChangeFeedMiddleware(mcp))
+
+    @mcp.resource(FEED_URI)
+    def timeline_changes() -> dict:
+        """
+        Recent change events of the current timeline (added, removed, moved, modified, reset), keyed by
+        TimelineItem unique ID with a sequence number. Poll davinci://timeline/changes/{since} with the
+        last seen seq to get only new events (the feed keeps scanning while it is read at least every
+        5 minutes; there are no update notifications).
+        """
+        return feed.read()
+
+    @mcp.resource(FEED_URI + "/{since}")
+    def timeline_changes_since(since: int) -> dict:
+        """
+        Change events of the current timeline with seq greater than `since`. If `truncated` is true,
+        events were dropped from the history; re-read the timeline and continue from `latest_seq`.
+        """
+        return feed.read(since=since)
+
+    @mcp.resource("davinci://stats/timeline-changes")
+    def timeline_changes_stats() -> dict:
+        """Change feed poller state: scan count, current poll interval and tracked items"""
+        return feed.stats()
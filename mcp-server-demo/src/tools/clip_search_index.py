@@ -0,0 +1,484 @@
+"""
+メディアプール全体のクリップ検索インデックス
+
+ルートフォルダ以下のすべてのクリップについて、GetClipProperty() の主要な項目と
+GetMetadata() の値をトークンに分割し、トークン → クリップID の転置インデックスを作ります。
+検索はインデックスだけで行い、Resolve APIは呼び出しません。
+
+インデックスの構築・更新はイベントループ上のタスクで行い、フォルダ1つ（または
+クリップ CLIP_SEARCH_CHUNK_SIZE 件）ごとにエグゼキュータへ積むため、他のツールの
+呼び出しが割り込めます。2回目以降の更新では、フォルダごとのシグネチャ
+（クリップ数と先頭・末尾のクリップID）が変わったフォルダだけを読み直します。
+クリップ数の変わらないリネームなどは full=True の更新で反映されます。
+"""
+
+import asyncio
+import bisect
+import re
+import threading
+import time
+
+from .executor import get_executor
+from .media_pool_index import folder_signature
+
+# 最後の更新からこの時間(秒)が過ぎていれば、検索時にバックグラウンドで更新する
+CLIP_SEARCH_REFRESH_INTERVAL = 30.0
+
+# エグゼキュータの1回の呼び出しで読み込むクリップ数
+CLIP_SEARCH_CHUNK_SIZE = 200
+
+# インデックスする GetClipProperty() の項目（GetMetadata() はすべての項目）
+INDEXED_PROPERTIES = (
+    "Clip Name", "File Name", "File Path", "Reel Name", "Video Codec", "Audio Codec",
+    "Resolution", "Duration", "Frames", "FPS", "Keywords", "Type", "Format",
+    "Comments", "Description", "Scene", "Shot", "Take",
+)
+
+# 検索クエリで使える短いフィールド名
+FIELD_ALIASES = {
+    "name": "clip_name",
+    "file": "file_name",
+    "path": "file_path",
+    "reel": "reel_name",
+    "codec": "video_codec",
+    "keyword": "keywords",
+}
+
+# 数値で比較できる項目（field>value の形式。項目を省略した場合は duration）
+NUMERIC_FIELDS = ("duration", "fps", "width", "height", "frames")
+
+# 解像度の略称 → (項目, 演算子, 値)
+RESOLUTION_ALIASES = {
+    "8k": [("width", ">=", 7680)],
+    "6k": [("width", ">=", 6144)],
+    "4k": [("width", ">=", 3840)],
+    "uhd": [("width", ">=", 3840)],
+    "2160p": [("height", "=", 2160)],
+    "1080p": [("height", "=", 1080)],
+    "hd": [("height", "=", 1080)],
+    "720p": [("height", "=", 720)],
+}
+
+_DURATION_UNITS = {"": 1, "s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600}
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+_COMPARISON_RE = re.compile(r"(?:\b([a-z_]+)\s*)?(>=|<=|!=|>|<|=)\s*(\d+(?:\.\d+)?)([a-z]*)\b", re.IGNORECASE)
+_RESOLUTION_RE = re.compile(r"(\d+)\s*x\s*(\d+)")
+
+_OPERATORS = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+def _field_name(key):
+    # "Video Codec" → "video_codec"
+    return "_".join(_TOKEN_RE.findall(key.lower()))
+
+
+def tokenize(text):
+    """
+    テキストを検索用のトークン（小文字の英数字の並び）に分割
+
+    Args:
+        text: 対象のテキスト
+
+    Returns:
+        トークンのリスト
+    """
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _numbers(properties):
+    """クリッププロパティから数値で比較する項目を取り出す"""
+    numbers = {}
+    fps = _number(properties.get("FPS"))
+    frames = _number(properties.get("Frames"))
+    if fps:
+        numbers["fps"] = fps
+    if frames is not None:
+        numbers["frames"] = frames
+    if fps and frames is not None:
+        numbers["duration"] = frames / fps
+    elif fps and properties.get("Duration"):
+        # "HH:MM:SS:FF" 形式のタイムコード
+        parts = [_number(p) for p in re.split(r"[:;]", properties["Duration"])]
+        if len(parts) == 4 and None not in parts:
+            hours, minutes, seconds, frame = parts
+            numbers["duration"] = hours * 3600 + minutes * 60 + seconds + frame / fps
+    match = _RESOLUTION_RE.search(properties.get("Resolution") or "")
+    if match:
+        numbers["width"], numbers["height"] = float(match.group(1)), float(match.group(2))
+    return numbers
+
+
+class _ClipDocument:
+    """インデックスに登録する1クリップ分の情報"""
+
+    __slots__ = ("clip_id", "folder_id", "folder", "fields", "numbers", "tokens")
+
+    def __init__(self, clip_id, folder_id, folder, properties, metadata):
+        self.clip_id = clip_id
+        self.folder_id = folder_id
+        self.folder = folder
+        self.fields = {_field_name(key): str(properties[key]) for key in INDEXED_PROPERTIES if properties.get(key)}
+        for key, value in metadata.items():
+            if value:
+                self.fields.setdefault(_field_name(key), str(value))
+        self.numbers = _numbers(properties)
+        tokens = set()
+        for field, value in self.fields.items():
+            words = tokenize(value)
+            if len(words) > 1:
+                # "H.264" を "h264" でも検索できるよう、連結したトークンも登録
+                words.append("".join(words))
+            for token in words:
+                tokens.add(token)
+                tokens.add(f"{field}:{token}")
+        self.tokens = tokens
+
+    def to_dict(self):
+        duration = self.numbers.get("duration")
+        return {
+            "unique_id": self.clip_id,
+            "name": self.fields.get("clip_name", ""),
+            "folder": self.folder,
+            "video_codec": self.fields.get("video_codec", ""),
+            "resolution": self.fields.get("resolution", ""),
+            "fps": self.numbers.get("fps"),
+            "duration_seconds": round(duration, 3) if duration is not None else None,
+            "reel_name": self.fields.get("reel_name", ""),
+            "keywords": self.fields.get("keywords", ""),
+        }
+
+
+class _FolderEntry:
+    def __init__(self, path, signature, clip_ids):
+        self.path = path
+        self.signature = signature
+        self.clip_ids = clip_ids
+
+
+def parse_query(query):
+    """
+    検索クエリを条件のリストに分解
+
+    - 単語: いずれかの項目にその単語で始まるトークンがあるクリップ ("prores", "inter")
+    - 項目:単語: 指定した項目だけを対象にする ("codec:prores", "reel:a001")
+    - 比較: 数値の項目との比較 ("duration>10s", "fps>=50", "width>=3840")。
+      項目を省略した場合は duration（秒。m / h の単位も可）
+    - 解像度の略称: 4K, UHD, 6K, 8K, HD, 1080p, 720p, 2160p
+    カンマまたは空白で区切った条件はすべて満たす必要があります (AND)。
+
+    Args:
+        query: 検索クエリ（例: "ProRes, 4K, > 10s"）
+
+    Returns:
+        [("tokens", 項目名またはNone, [トークン]) または ("number", 項目名, 演算子, 値)] のリスト
+
+    Raises:
+        ValueError: 数値で比較できない項目や不明な単位が指定された場合
+    """
+    terms = []
+
+    def comparison(match):
+        field, op, value, unit = match.groups()
+        field = (field or "duration").lower()
+        unit = unit.lower()
+        if field not in NUMERIC_FIELDS and op == "=":
+            # "scene=12" のような数値でない項目は 項目:単語 と同じ扱い
+            field = _field_name(field)
+            terms.append(("tokens", FIELD_ALIASES.get(field, field), tokenize(value + unit)))
+            return " "
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"'{field}' cannot be compared as a number. "
+                             f"Numeric fields: {', '.join(NUMERIC_FIELDS)}")
+        value = float(value)
+        if field == "duration":
+            if unit not in _DURATION_UNITS:
+                raise ValueError(f"Unknown duration unit '{unit}' (use s, m or h)")
+            value *= _DURATION_UNITS[unit]
+        elif unit:
+            raise ValueError(f"'{field}' does not take a unit ('{unit}')")
+        terms.append(("number", field, op, value))
+        return " "
+
+    rest = _COMPARISON_RE.sub(comparison, query)
+    for word in re.split(r"[,\s]+", rest):
+        if not word:
+            continue
+        field, separator, value = word.partition(":")
+        if not separator:
+            field, value = None, word
+        if field is None and word.lower() in RESOLUTION_ALIASES:
+            terms.extend(("number", *condition) for condition in RESOLUTION_ALIASES[word.lower()])
+            continue
+        tokens = tokenize(value)
+        if tokens:
+            field = _field_name(field) if field else None
+            terms.append(("tokens", FIELD_ALIASES.get(field, field), tokens))
+    return terms
+
+
+class ClipSearchIndex:
+    """
+    現在のプロジェクトのメディアプール全体のクリップ検索インデックス
+
+    プロジェクトが切り替わった場合は次の更新でインデックス全体を作り直します。
+    """
+
+    def __init__(self, refresh_interval=CLIP_SEARCH_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.project_id = None
+        self._folders = {}
+        self._documents = {}
+        self._postings = {}
+        self._sorted_tokens = None
+        self._lock = threading.Lock()
+        self._task = None
+        self.refreshed_at = None
+        self.refreshes = 0
+        self.folders_read = 0
+        self.clips_read = 0
+        self.queries = 0
+        self.last_refresh_ms = None
+
+    async def ensure_ready(self, refresh=False):
+        """
+        検索の前にインデックスを用意
+
+        まだ構築されていない場合と refresh=True の場合は更新の完了を待ちます。
+        それ以外で最後の更新から refresh_interval が過ぎている場合は、
+        バックグラウンドで更新を開始して現在のインデックスで検索させます。
+
+        Args:
+            refresh: すべてのフォルダを読み直して完了を待つか
+
+        Raises:
+            ResolveBusyError: 構築中にエグゼキュータが混雑していた場合
+        """
+        if refresh or self.refreshed_at is None:
+            await self._start(full=refresh)
+        elif time.monotonic() - self.refreshed_at > self.refresh_interval:
+            self.request_refresh()
+
+    def request_refresh(self):
+        """バックグラウンドで更新を開始（すでに更新中の場合は何もしない）"""
+        task = self._start(full=False)
+        # 結果を待たないタスクの例外は次回の検索時に再試行する
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _start(self, full):
+        if self._task is None or self._task.done() or full:
+            previous = self._task if self._task is not None and not self._task.done() else None
+            self._task = asyncio.get_running_loop().create_task(self._refresh(full, previous))
+        return self._task
+
+    async def _refresh(self, full, previous):
+        if previous is not None:
+            # 実行中の更新が終わってから読み直す
+            await asyncio.gather(previous, return_exceptions=True)
+        started = time.perf_counter()
+        executor = get_executor()
+        root = await executor.call(_read_root)
+        if root is None:
+            with self._lock:
+                self._clear(None)
+            self.refreshed_at = time.monotonic()
+            return
+        project_id, root_folder = root
+        with self._lock:
+            if project_id != self.project_id:
+                self._clear(project_id)
+            known = {} if full else {folder_id: entry.signature for folder_id, entry in self._folders.items()}
+
+        seen = set()
+        pending = [(root_folder, "")]
+        while pending:
+            folder, parent = pending.pop(0)
+            info = await executor.call(_read_folder, project_id, folder, known)
+            if info is None:
+                # 更新中にプロジェクトが切り替わった場合は次の更新でやり直す
+                return
+            folder_id, name, signature, subfolders, clips = info
+            path = f"{parent}/{name}" if parent else name
+            seen.add(folder_id)
+            pending.extend((subfolder, path) for subfolder in subfolders)
+            self.folders_read += 1
+            if clips is None:
+                continue
+
+            documents = []
+            for offset in range(0, len(clips), CLIP_SEARCH_CHUNK_SIZE):
+                rows = await executor.call(_read_clips, project_id, clips[offset:offset + CLIP_SEARCH_CHUNK_SIZE])
+                if rows is None:
+                    return
+                documents.extend(_ClipDocument(clip_id, folder_id, path, properties, metadata)
+                                 for clip_id, properties, metadata in rows)
+            self.clips_read += len(documents)
+            with self._lock:
+                self._replace_folder(folder_id, _FolderEntry(path, signature, [d.clip_id for d in documents]),
+                                     documents)
+
+        with self._lock:
+            for folder_id in set(self._folders) - seen:
+                self._replace_folder(folder_id, None, [])
+        self.refreshes += 1
+        self.refreshed_at = time.monotonic()
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def search(self, terms, limit=50):
+        """
+        インデックスからクリップを検索（Resolve APIは呼び出さない）
+
+        Args:
+            terms: parse_query() の結果
+            limit: 返すクリップ数の上限
+
+        Returns:
+            (一致したクリップ数, クリップ情報の辞書のリスト)
+        """
+        with self._lock:
+            self.queries += 1
+            matches = None
+            numeric = []
+            for term in terms:
+                if term[0] == "number":
+                    numeric.append(term[1:])
+                    continue
+                _, field, tokens = term
+                for token in tokens:
+                    ids = self._prefix_ids(f"{field}:{token}" if field else token)
+                    matches = ids if matches is None else matches & ids
+            documents = (self._documents[clip_id] for clip_id in matches) if matches is not None \
+                else self._documents.values()
+            found = [
+                document for document in documents
+                if all(field in document.numbers and _OPERATORS[op](document.numbers[field], value)
+                       for field, op, value in numeric)
+            ]
+            found.sort(key=lambda d: (d.folder, d.fields.get("clip_name", "")))
+            return len(found), [document.to_dict() for document in found[:limit]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clips": len(self._documents),
+                "folders": len(self._folders),
+                "tokens": len(self._postings),
+                "age_seconds": round(time.monotonic() - self.refreshed_at, 3) if self.refreshed_at else None,
+                "refreshing": self._task is not None and not self._task.done(),
+                "refreshes": self.refreshes,
+                "last_refresh_ms": self.last_refresh_ms,
+                "folders_read": self.folders_read,
+                "clips_read": self.clips_read,
+                "queries": self.queries,
+            }
+
+    def _prefix_ids(self, prefix):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        tokens = self._sorted_tokens
+        ids = set()
+        for i in range(bisect.bisect_left(tokens, prefix), len(tokens)):
+            if not tokens[i].startswith(prefix):
+                break
+            ids |= self._postings[tokens[i]]
+        return ids
+
+    def _replace_folder(self, folder_id, entry, documents):
+        old = self._folders.pop(folder_id, None)
+        for clip_id in old.clip_ids if old else []:
+            document = self._documents.get(clip_id)
+            # 別のフォルダへ移動したクリップは移動先で登録し直し済みの場合がある
+            if document is not None and document.folder_id == folder_id:
+                self._remove_document(document)
+        if entry is not None:
+            self._folders[folder_id] = entry
+        for document in documents:
+            previous = self._documents.get(document.clip_id)
+            if previous is not None:
+                self._remove_document(previous)
+            self._documents[document.clip_id] = document
+            for token in document.tokens:
+                self._postings.setdefault(token, set()).add(document.clip_id)
+        self._sorted_tokens = None
+
+    def _remove_document(self, document):
+        del self._documents[document.clip_id]
+        for token in document.tokens:
+            ids = self._postings.get(token)
+            if ids is not None:
+                ids.discard(document.clip_id)
+                if not ids:
+                    del self._postings[token]
+
+    def _clear(self, project_id):
+        self.project_id = project_id
+        self._folders.clear()
+        self._documents.clear()
+        self._postings.clear()
+        self._sorted_tokens = None
+
+
+def _read_root(ctx):
+    """現在のプロジェクトIDとルートフォルダを取得（エグゼキュータ上で実行）"""
+    media_pool = ctx.media_pool if ctx is not None else None
+    if not media_pool:
+        return None
+    return ctx.project_id, media_pool.GetRootFolder()
+
+
+def _read_folder(ctx, project_id, folder, known):
+    """
+    フォルダの情報を取得（エグゼキュータ上で実行）
+
+    Returns:
+        (フォルダID, 名前, シグネチャ, サブフォルダ, クリップのリスト) のタプル。
+        シグネチャが known と同じ場合、クリップのリストはNone
+        （プロジェクトが切り替わっていた場合はNone）
+    """
+    if ctx is None or ctx.project_id != project_id:
+        return None
+    folder_id = folder.GetUniqueId()
+    clip_list = folder.GetClipList() or []
+    signature = folder_signature(clip_list)
+    clips = None if known.get(folder_id) == signature else clip_list
+    return folder_id, folder.GetName(), signature, folder.GetSubFolderList() or [], clips
+
+
+def _read_clips(ctx, project_id, clips):
+    """
+    クリップのプロパティとメタデータを取得（エグゼキュータ上で実行）
+
+    Returns:
+        [(クリップID, プロパティ, メタデータ)]（プロジェクトが切り替わっていた場合はNone）
+    """
+    if ctx is None or ctx.project_id != project_id:
+        return None
+    return [(clip.GetUniqueId(), clip.GetClipProperty() or {}, clip.GetMetadata() or {}) for clip in clips]
+
+
+# すべてのツールで共有するインデックス
+clip_search_index = ClipSearchIndex()
+
+
+def get_clip_search_index():
+    """
+    共有のクリップ検索インデックスを取得
+
+    Returns:
+        ClipSearchIndexインスタンス
+    """
+    return clip_search_index
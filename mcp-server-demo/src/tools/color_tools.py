@@ -0,0 +1,313 @@
+"""
+DaVinci Resolve カラー（グレード・LUT）関連のツール
+
+apply_grade は対象のアイテムを1回のトラック走査で選び、できるだけ少ない呼び出しで適用します。
+
+- DRX: Timeline.ApplyGradeFromDRX(path, mode, [items]) がある旧バージョンではチャンクごとに1回。
+  ない場合は最初の1件のノードグラフに適用し、TimelineItem.CopyGrades([items]) で残りに
+  まとめてコピーする（キーフレームを揃える gradeMode 1 / 2 はアイテムごとに適用）
+- LUT: アイテムごとに Graph.SetLUT。DRX と同時にコピーする場合はコピー元にだけ設定する
+
+適用はチャンク (GRADE_CHUNK_SIZE 件) ごとに別の呼び出しとしてエグゼキュータに投入するため、
+大きなリールへの適用中も他のツールの呼び出しがチャンクの間に実行されます。
+"""
+
+import fnmatch
+import os
+import time
+
+from fastmcp import Context
+
+from .executor import ResolveBusyError, call_resolve
+from .metrics import CallCounter
+
+# 1回のエグゼキュータ呼び出しで適用するアイテム数
+GRADE_CHUNK_SIZE = 50
+
+# ApplyGradeFromDRX の gradeMode: 0 - キーフレームなし, 1 - ソースタイムコードで揃える, 2 - 開始フレームで揃える
+GRADE_MODES = (0, 1, 2)
+
+# 結果に含める失敗したアイテムの数
+MAX_REPORTED_FAILURES = 50
+
+
+class _GradeJob:
+    """
+    apply_grade の1回分の状態（チャンクをまたいで使う。エグゼキュータ上で使用）
+
+    Args:
+        timeline_id: 対象を選んだときのタイムラインの GetUniqueId()
+        drx_path: DRXファイルのパス（Noneの場合はLUTだけ）
+        grade_mode: ApplyGradeFromDRX の gradeMode
+        lut_path: LUTのパス（Noneの場合はDRXだけ）
+        node_index: LUTを設定するノード番号
+    """
+
+    def __init__(self, timeline_id, drx_path, grade_mode, lut_path, node_index):
+        self.timeline_id = timeline_id
+        self.drx_path = drx_path
+        self.grade_mode = grade_mode
+        self.lut_path = lut_path
+        self.node_index = node_index
+        # グレードをコピーする元のアイテム（DRXとLUTを適用済み）
+        self.source = None
+        self.methods = {}
+        self.api_calls = 0
+
+    def run(self, ctx, chunk):
+        """
+        チャンクのアイテムに適用
+
+        Args:
+            ctx: ResolveContext
+            chunk: [(トラック番号, 開始フレーム, TimelineItem)]
+
+        Returns:
+            [(トラック番号, 開始フレーム, TimelineItem, エラーメッセージまたはNone)]、
+            またはエラーメッセージ（タイムラインが切り替わった場合）
+        """
+        with CallCounter() as counter:
+            try:
+                if ctx.timeline_id != self.timeline_id:
+                    return "The current timeline changed while applying the grade"
+                errors = self._apply(ctx.timeline, [item for _, _, item in chunk])
+            finally:
+                self.api_calls += counter.calls
+        return [(track, start, item, error) for (track, start, item), error in zip(chunk, errors)]
+
+    def _apply(self, timeline, items):
+        errors = [None] * len(items)
+        pending = list(range(len(items)))
+
+        if self.drx_path:
+            apply_list = getattr(timeline, "ApplyGradeFromDRX", None)
+            if callable(apply_list) and apply_list(self.drx_path, self.grade_mode, items):
+                self.methods["drx"] = "Timeline.ApplyGradeFromDRX"
+                pending = self._apply_luts(items, pending, errors)
+                return errors
+            if self.grade_mode == 0:
+                pending = self._copy_grades(items, pending, errors)
+            for i in pending:
+                errors[i] = self._apply_one(items[i])
+            self.methods.setdefault("drx", "Graph.ApplyGradeFromDRX")
+            return errors
+
+        self._apply_luts(items, pending, errors)
+        return errors
+
+    def _copy_grades(self, items, pending, errors):
+        # コピー元がまだなければ、適用できた最初のアイテムをコピー元にする
+        while self.source is None and pending:
+            i = pending.pop(0)
+            errors[i] = self._apply_one(items[i])
+            if errors[i] is None:
+                self.source = items[i]
+        if self.source is None or not pending:
+            return pending
+        if self.source.CopyGrades([items[i] for i in pending]):
+            self.methods["drx"] = "CopyGrades"
+            if self.lut_path:
+                # コピー元に設定済みのLUTもグレードと一緒にコピーされる
+                self.methods["lut"] = "CopyGrades"
+            return []
+        # どのアイテムが失敗したか分からないため、このチャンクは1件ずつ適用する
+        return pending
+
+    def _apply_one(self, item):
+        if self.lut_path:
+            self.methods.setdefault("lut", "Graph.SetLUT")
+        graph = item.GetNodeGraph()
+        if not graph:
+            return "the item has no node graph (not a video clip?)"
+        if self.drx_path and not graph.ApplyGradeFromDRX(self.drx_path, self.grade_mode):
+            return f"failed to apply {os.path.basename(self.drx_path)}"
+        if self.lut_path and not self._set_lut(item, graph):
+            return f"failed to set LUT on node {self.node_index}"
+        return None
+
+    def _apply_luts(self, items, pending, errors):
+        if self.lut_path:
+            self.methods["lut"] = "Graph.SetLUT"
+            for i in pending:
+                graph = items[i].GetNodeGraph()
+                if not self._set_lut(items[i], graph):
+                    errors[i] = f"failed to set LUT on node {self.node_index}"
+        return []
+
+    def _set_lut(self, item, graph):
+        if graph:
+            return graph.SetLUT(self.node_index, self.lut_path)
+        # ノードグラフのない旧バージョンでは TimelineItem.SetLUT を使う
+        return item.SetLUT(self.node_index, self.lut_path)
+
+
+def register_color_tools(mcp):
+    """
+    カラー関連ツールをMCPサーバーに登録
+
+    Args:
+        mcp: FastMCPインスタンス
+    """
+
+    @mcp.tool()
+    async def apply_grade(
+        context: Context,
+        drx_path: str | None = None,
+        lut_path: str | None = None,
+        grade_mode: int = 0,
+        node_index: int = 1,
+        track_indices: list[int] | None = None,
+        clip_name: str | None = None,
+        clip_color: str | None = None,
+        flag: str | None = None,
+        start_frame: int | None = None,
+        end_frame: int | None = None,
+        dry_run: bool = False,
+    ) -> dict:
+        """
+        Apply a DRX grade and/or a LUT to every video item of the current timeline that matches a filter
+
+        Targets are selected in one pass over the video tracks. A DRX grade is applied to the first
+        item and copied to the others in bulk (CopyGrades), so grading a 1,000-shot reel takes a few
+        dozen Resolve calls. Work is done in chunks of 50 items so other tools keep responding, and
+        progress notifications are sent per chunk.
+
+        Args:
+            drx_path: Grade still (.drx) to apply
+            lut_path: LUT to set (absolute, or relative to the LUT folders Resolve knows about)
+            grade_mode: DRX keyframe alignment: 0 no keyframes (default), 1 source timecode aligned,
+                        2 start frames aligned (1 and 2 are applied item by item)
+            node_index: Node that receives the LUT, starting at 1 (default: 1)
+            track_indices: Video tracks to include (all video tracks if omitted)
+            clip_name: Only items whose name matches this pattern (wildcards * and ?, case-insensitive)
+            clip_color: Only items with this clip color, e.g. "Orange"
+            flag: Only items with this flag color, e.g. "Blue"
+            start_frame: Only items starting at or after this frame (0 = timeline start)
+            end_frame: Only items starting before this frame
+            dry_run: Only list how many items match
+
+        Returns:
+            Counts of matched/applied/failed items per track, the API methods used, the number of
+            Resolve calls and the failed items (track, frame, name, reason)
+        """
+        if not drx_path and not lut_path:
+            return {"error": "Specify drx_path and/or lut_path"}
+        if grade_mode not in GRADE_MODES:
+            return {"error": "grade_mode must be 0, 1 or 2"}
+        if node_index < 1:
+            return {"error": "node_index must be >= 1"}
+        if drx_path and not os.path.isfile(drx_path):
+            return {"error": f"DRX file not found: {drx_path}"}
+        if any(index < 1 for index in track_indices or []):
+            return {"error": "track_indices must be >= 1"}
+        name_pattern = clip_name.casefold() if clip_name else None
+
+        def select(ctx):
+            with CallCounter() as counter:
+                selection = select_targets(ctx)
+            if isinstance(selection, dict):
+                selection["api_calls"] = counter.calls
+            return selection
+
+        def select_targets(ctx):
+            timeline = ctx.timeline
+            if not timeline:
+                if not ctx.project:
+                    return "No project is currently open"
+                return "No timeline is currently open. Please open or create a timeline first."
+            timeline_start = timeline.GetStartFrame()
+            tracks = track_indices or range(1, (timeline.GetTrackCount("video") or 0) + 1)
+            by_range = start_frame is not None or end_frame is not None
+            targets = []
+            for track in tracks:
+                for item in timeline.GetItemListInTrack("video", track) or []:
+                    # 指定された条件だけを読み、当てはまらなければ次の条件は読まない
+                    # （範囲の指定がなければ開始フレームは失敗したアイテムの分だけ後で読む）
+                    start = item.GetStart() - timeline_start if by_range else None
+                    if (start_frame is not None and start < start_frame) or (end_frame is not None
+                                                                             and start >= end_frame):
+                        continue
+                    if name_pattern and not fnmatch.fnmatchcase((item.GetName() or "").casefold(), name_pattern):
+                        continue
+                    if clip_color and (item.GetClipColor() or "").casefold() != clip_color.casefold():
+                        continue
+                    if flag and flag.casefold() not in {f.casefold() for f in item.GetFlagList() or []}:
+                        continue
+                    targets.append((track, start, item))
+            if lut_path and not dry_run:
+                # SetLUT は Resolve が認識済みのLUTにだけ成功する
+                ctx.project.RefreshLUTList()
+            return {"timeline": timeline.GetName(), "timeline_id": ctx.timeline_id,
+                    "timeline_start": timeline_start, "targets": targets}
+
+        started = time.perf_counter()
+        selection = await call_resolve(select)
+        if isinstance(selection, str):
+            return {"error": selection}
+        targets = selection["targets"]
+        by_track = {}
+        for track, _, _ in targets:
+            by_track.setdefault(track, {"matched": 0, "applied": 0, "failed": 0})["matched"] += 1
+        result = {
+            "timeline": selection["timeline"],
+            "matched": len(targets),
+            "dry_run": dry_run,
+        }
+        if dry_run or not targets:
+            return {**result, "tracks": by_track}
+
+        job = _GradeJob(selection["timeline_id"], drx_path, grade_mode, lut_path, node_index)
+        job.api_calls = selection["api_calls"]
+        failed = []
+        applied = 0
+        error = None
+        for offset in range(0, len(targets), GRADE_CHUNK_SIZE):
+            chunk = targets[offset:offset + GRADE_CHUNK_SIZE]
+            try:
+                outcome = await call_resolve(job.run, chunk)
+            except ResolveBusyError as e:
+                # 適用済みの件数を返すため、"Resolve busy" の結果にはしない
+                outcome = f"Resolve is busy: {e}"
+            if isinstance(outcome, str):
+                error = outcome
+                break
+            for track, start, item, item_error in outcome:
+                if item_error is None:
+                    applied += 1
+                    by_track[track]["applied"] += 1
+                else:
+                    by_track[track]["failed"] += 1
+                    failed.append((track, start, item, item_error))
+            done = offset + len(chunk)
+            await context.report_progress(done, len(targets), f"Graded {done} of {len(targets)} items")
+
+        reported = failed[:MAX_REPORTED_FAILURES]
+
+        def failure_details(ctx):
+            # 名前と開始フレームは結果に含める失敗したアイテムの分だけ読む
+            timeline_start = selection["timeline_start"]
+            with CallCounter() as counter:
+                details = [(item.GetName(), item.GetStart() - timeline_start if start is None else start)
+                           for _, start, item, _ in reported]
+            job.api_calls += counter.calls
+            return details
+
+        details = []
+        if reported:
+            try:
+                details = await call_resolve(failure_details)
+            except ResolveBusyError:
+                details = [(None, start) for _, start, _, _ in reported]
+        result.update({
+            "applied": applied,
+            "failed_count": len(failed),
+            "tracks": by_track,
+            "methods": job.methods,
+            "api_calls": job.api_calls,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+            "failed": [{"track": track, "frame": frame, "name": name, "error": item_error}
+                       for (track, _, _, item_error), (name, frame) in zip(reported, details)],
+        })
+        if error:
+            result["error"] = f"{error} after {applied} of {len(targets)} items"
+        return result
@@ -0,0 +1,219 @@
+"""
+ツールごとの期限と "Resolve busy" の結果
+
+Resolveが応答しない間もツールが待ち続けないよう、ツールの呼び出しごとに期限を設けます。
+期限は call_resolve() のタイムアウトの上限になり（キューで待っている呼び出しは取り消される）、
+Resolve以外の処理で期限を過ぎた場合もツールの完了を待たずに結果を返します。
+
+期限を過ぎた場合や ResolveBusyError が送出された場合（キューが満杯、サーキットブレーカーが
+開いている）は、isError を付けた構造化結果
+{"error", "busy": true, "reason", "tool", "deadline_seconds", "retry_after_seconds", "circuit"}
+を返します。
+
+期限は環境変数 DAVINCI_MCP_TOOL_DEADLINES で変更できます
+（例: "45" ですべての既定値を変更、"default=45,execute_batch=600,import_media=none"）。
+"none" と "0" は期限なし（呼び出しごとのタイムアウトだけを使う）を表します。
+解釈できない項目は警告を記録して無視します。
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+
+from fastmcp.exceptions import ToolError
+from fastmcp.server.middleware import Middleware
+from fastmcp.tools.tool import ToolResult
+from mcp.types import CallToolResult, TextContent
+
+from .executor import DEFAULT_CALL_TIMEOUT, ResolveBusyError, get_executor, tool_deadline
+from .resolve_pool import AUTO_TARGET, get_resolve_pool
+
+logger = logging.getLogger(__name__)
+
+TOOL_DEADLINES_ENV = "DAVINCI_MCP_TOOL_DEADLINES"
+
+# 既定の期限(秒)
+DEFAULT_TOOL_DEADLINE = DEFAULT_CALL_TIMEOUT
+
+# 既定と異なる期限(秒)。Noneは期限なし（呼び出しごとのタイムアウトだけを使う）
+TOOL_DEADLINES = {
+    "execute_batch": 300.0,
+    "sync_markers": 300.0,
+    "export_timeline_structure": 300.0,
+    "apply_item_properties": 300.0,
+    "auto_cut_from_audio": 300.0,
+    "build_timeline": 300.0,
+    # 進捗を通知しながらバッチごとに呼び出すため、全体の期限は設けない
+    "import_media": None,
+    "apply_grade": None,
+    # 待つ時間を引数で指定するため、期限は設けない
+    "wait_for_render_job": None,
+    "wait_for_project_job": None,
+}
+
+# 期限を過ぎてからツールの完了を待つ猶予(秒)。call_resolve() のタイムアウトを先に発生させる
+_DEADLINE_GRACE = 0.5
+
+# 期限なしを表す値
+_NO_DEADLINE_VALUES = ("none", "0")
+
+
+def parse_deadlines(value):
+    """
+    DAVINCI_MCP_TOOL_DEADLINES の値を解釈
+    
+    サーバーの起動を妨げないよう、解釈できない項目は警告を記録して無視します。
+    
+    Args:
+        value: "45" または "default=45,execute_batch=600,import_media=none"
+               （"none" と "0" は期限なし）
+    
+    Returns:
+        {ツール名または"default": 秒数またはNone（期限なし）}
+    """
+    deadlines = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, seconds = part.rpartition("=")
+        seconds = seconds.strip().lower()
+        if seconds in _NO_DEADLINE_VALUES:
+            deadlines[name.strip() or "default"] = None
+            continue
+        try:
+            parsed = float(seconds)
+        except ValueError:
+            parsed = math.nan
+        if not 0 < parsed < math.inf:
+            logger.warning("Ignoring invalid %s entry %r (expected seconds > 0, 0 or none)",
+                           TOOL_DEADLINES_ENV, part)
+            continue
+        deadlines[name.strip() or "default"] = parsed
+    return deadlines
+
+
+def _busy_error(error):
+    # FastMCPはツールの例外を ToolError で包むため、原因をたどる
+    while error is not None:
+        if isinstance(error, ResolveBusyError):
+            return error
+        error = error.__cause__
+    return None
+
+
+class _BusyLogFilter(logging.Filter):
+    """Resolveが混雑しているだけの呼び出しで、FastMCPがスタックトレースを記録しないようにするフィルタ"""
+
+    def filter(self, record):
+        return record.exc_info is None or _busy_error(record.exc_info[1]) is None
+
+
+class BusyToolResult(ToolResult):
+    """isError を付けて返す "Resolve busy" の構造化結果"""
+    
+    is_error = True
+    
+    def __init__(self, info):
+        super().__init__(content=[TextContent(type="text", text=json.dumps(info))], structured_content=info)
+    
+    def to_mcp_result(self):
+        # 出力スキーマのあるツールでも検証されないよう、エラーとして返す
+        return CallToolResult(content=self.content, structuredContent=self.structured_content, isError=True)
+
+
+class ToolDeadlineMiddleware(Middleware):
+    """
+    ツールの呼び出しに期限を設け、Resolveが応答しない場合は構造化された結果を返すFastMCPミドルウェア
+    
+    Args:
+        deadlines: {ツール名または"default": 秒数またはNone}（省略時は環境変数と TOOL_DEADLINES）
+    """
+    
+    def __init__(self, deadlines=None):
+        if deadlines is None:
+            deadlines = parse_deadlines(os.environ.get(TOOL_DEADLINES_ENV))
+        self.default = deadlines.pop("default", DEFAULT_TOOL_DEADLINE)
+        self.deadlines = dict(TOOL_DEADLINES, **deadlines)
+        self.expired = 0
+        self.busy = 0
+        tool_logger = logging.getLogger("fastmcp.tools.tool_manager")
+        if not any(isinstance(f, _BusyLogFilter) for f in tool_logger.filters):
+            tool_logger.addFilter(_BusyLogFilter())
+    
+    def deadline_for(self, tool_name):
+        """
+        ツールの期限(秒)を取得
+        
+        Args:
+            tool_name: ツール名
+        
+        Returns:
+            秒数（期限なしの場合はNone）
+        """
+        return self.deadlines.get(tool_name, self.default)
+    
+    async def on_call_tool(self, context, call_next):
+        tool_name = context.message.name
+        seconds = self.deadline_for(tool_name)
+        token = tool_deadline.set(time.monotonic() + seconds if seconds is not None else None)
+        try:
+            if seconds is None:
+                return await call_next(context)
+            return await asyncio.wait_for(call_next(context), seconds + _DEADLINE_GRACE)
+        except (ResolveBusyError, ToolError) as e:
+            busy = _busy_error(e)
+            if busy is None:
+                raise
+            self.busy += 1
+            return self._busy_result(tool_name, seconds, busy.reason, str(busy), busy.retry_after,
+                                     busy.target or _requested_target(context))
+        except asyncio.TimeoutError:
+            self.expired += 1
+            return self._busy_result(tool_name, seconds, "deadline",
+                                     f"{tool_name} did not finish within {seconds:g} seconds", None,
+                                     _requested_target(context))
+        finally:
+            tool_deadline.reset(token)
+    
+    def stats(self):
+        return {
+            "default_seconds": self.default,
+            "deadlines": dict(sorted(self.deadlines.items())),
+            "busy_results": self.busy,
+            "expired": self.expired,
+        }
+    
+    def _busy_result(self, tool_name, seconds, reason, message, retry_after, target):
+        breaker = _executor_for(target).breaker
+        circuit = breaker.stats()
+        if retry_after is None:
+            retry_after = breaker.probe_interval if circuit["state"] == "open" else 1.0
+        return BusyToolResult({
+            "error": f"Resolve busy: {message}",
+            "busy": True,
+            "reason": reason,
+            "tool": tool_name,
+            "deadline_seconds": seconds,
+            "retry_after_seconds": retry_after,
+            "circuit": circuit["state"],
+        })
+
+
+def _requested_target(context):
+    # "auto" はどの接続が選ばれたか分からないため、既定の接続として扱う
+    target = (context.message.arguments or {}).get("target")
+    return target if isinstance(target, str) and target != AUTO_TARGET else None
+
+
+def _executor_for(target):
+    """接続名に対応するエグゼキュータ（None や不明な接続名の場合は既定のエグゼキュータ）"""
+    if target is not None:
+        try:
+            return get_resolve_pool().select(target).executor
+        except ValueError:
+            pass
+    return get_executor()
@@ -0,0 +1,440 @@
+"""
+DaVinci Resolve API 専用の実行スレッド
+
+Resolveインスタンスを扱うのは1本のワーカースレッドだけにし、
+ツールからの呼び出しは上限付きのキューに積んで順番に処理します。
+ツールハンドラは async 関数として結果を待つため、Resolveの処理が
+遅い間もイベントループ（他のMCPクライアント）はブロックされません。
+
+Resolveがレンダリングやモーダルダイアログで応答しない間はAPI呼び出しが戻らないため、
+タイムアウトが続いた場合はサーキットブレーカーを開き、新しい呼び出しをすぐに
+失敗させます。ブレーカーが開いている間は GetProductName / GetVersionString による
+ヘルスチェックを定期的に行い、成功したら閉じます。
+
+プロジェクトの書き出しのように数分かかることが分かっている呼び出しは exclusive を付けて実行します。
+実行中に来た他の呼び出しはキューで待たせず、すぐに ResolveBusyError (reason="exclusive") に
+します。その間のタイムアウトはResolveが応答しないためではないので、ブレーカーには数えません。
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import functools
+import queue
+import threading
+import time
+
+from .base import get_resolve_context
+
+# キューに積める呼び出しの上限
+DEFAULT_QUEUE_SIZE = 64
+
+# 1回の呼び出しの既定のタイムアウト(秒)。キュー待ち時間も含む
+DEFAULT_CALL_TIMEOUT = 30.0
+
+# set_resolve_instance() で設定したインスタンスの接続名
+DEFAULT_TARGET = "default"
+
+# 連続してこの回数タイムアウトしたらブレーカーを開く
+CIRCUIT_FAILURE_THRESHOLD = 3
+
+# ブレーカーが開いている間のヘルスチェックの間隔(秒)
+CIRCUIT_PROBE_INTERVAL = 5.0
+
+# ヘルスチェックのタイムアウト(秒)
+CIRCUIT_PROBE_TIMEOUT = 2.0
+
+# exclusive な呼び出しの実行中に断った呼び出しへ返す、再試行までの目安(秒)
+EXCLUSIVE_RETRY_AFTER = 1.0
+
+# 実行中のツールの期限 (time.monotonic() の値)。call_resolve() のタイムアウトはこれを超えない
+tool_deadline = contextvars.ContextVar("tool_deadline", default=None)
+
+
+class ResolveBusyError(Exception):
+    """
+    キューが満杯、タイムアウト、ブレーカーが開いている、または長い呼び出しの実行中であることを示す例外
+    
+    Attributes:
+        reason: "queue_full" / "timeout" / "deadline" / "circuit_open" / "exclusive"
+        retry_after: 再試行までの目安の秒数（不明な場合はNone）
+        target: 呼び出し先の接続名（call_resolve() が設定する。不明な場合はNone）
+    """
+    
+    def __init__(self, message, reason="timeout", retry_after=None, target=None):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.target = target
+
+
+def probe_resolve(context):
+    """
+    軽いAPIでResolveの応答を確認（エグゼキュータ上で実行。プロジェクトやタイムラインには触れない）
+
+    Args:
+        context: ResolveContext（未接続の場合はNone）
+
+    Returns:
+        (GetProductName(), GetVersionString())（未接続の場合はNone）
+    """
+    if context is None:
+        return None
+    return context.resolve.GetProductName(), context.resolve.GetVersionString()
+
+
+class CircuitBreaker:
+    """
+    タイムアウトが続いたらResolveへの新しい呼び出しを止めるサーキットブレーカー
+    
+    - closed: 通常どおり実行する
+    - open: 連続 failure_threshold 回タイムアウトした。新しい呼び出しはすぐに失敗させ、
+      probe_interval 秒ごとにヘルスチェックをキューに積む
+    - ヘルスチェックが成功したら closed に戻る
+    
+    イベントループ上からだけ操作します。
+    """
+    
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, probe_interval=CIRCUIT_PROBE_INTERVAL,
+                 probe_timeout=CIRCUIT_PROBE_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.probes = 0
+        self.short_circuited = 0
+        self.last_probe = None
+        self._probe_task = None
+    
+    def check(self, executor):
+        """
+        呼び出しを実行してよいか確認
+        
+        Args:
+            executor: ヘルスチェックを実行する ResolveExecutor
+        
+        Raises:
+            ResolveBusyError: ブレーカーが開いている場合
+        """
+        if self.state == "closed":
+            return
+        self._ensure_probing(executor)
+        self.short_circuited += 1
+        raise ResolveBusyError(
+            f"Resolve has not responded for {time.monotonic() - self.opened_at:.0f} seconds "
+            f"({self.trips} trips); waiting for a health check to succeed",
+            reason="circuit_open", retry_after=self.probe_interval)
+    
+    def record_success(self):
+        """呼び出しが成功したことを記録"""
+        self.consecutive_failures = 0
+    
+    def record_timeout(self, executor):
+        """
+        呼び出しがタイムアウトしたことを記録（続いた場合はブレーカーを開く）
+        
+        Args:
+            executor: ヘルスチェックを実行する ResolveExecutor
+        """
+        self.consecutive_failures += 1
+        if self.state == "closed" and self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            self._ensure_probing(executor)
+    
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_timeouts": self.consecutive_failures,
+            "open_seconds": round(time.monotonic() - self.opened_at, 3) if self.state == "open" else 0.0,
+            "trips": self.trips,
+            "probes": self.probes,
+            "short_circuited": self.short_circuited,
+            "last_probe": self.last_probe,
+        }
+    
+    def _ensure_probing(self, executor):
+        loop = asyncio.get_running_loop()
+        task = self._probe_task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._probe_task = loop.create_task(self._probe_until_healthy(executor))
+    
+    async def _probe_until_healthy(self, executor):
+        while self.state == "open":
+            await asyncio.sleep(self.probe_interval)
+            self.probes += 1
+            try:
+                future = executor.submit(probe_resolve)
+                result = await asyncio.wait_for(asyncio.wrap_future(future), self.probe_timeout)
+            except (ResolveBusyError, asyncio.TimeoutError):
+                continue
+            except Exception as e:
+                # 例外でも応答はあったため、呼び出しを再開する
+                result = f"{type(e).__name__}: {e}"
+            self.last_probe = {"time": time.time(), "result": list(result) if isinstance(result, tuple) else result}
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+
+class ResolveExecutor:
+    """
+    Resolve APIを1本のワーカースレッドで直列に実行するエグゼキュータ
+
+    submit() で積まれた関数はハンドルキャッシュ (ResolveContext) を第1引数として
+    ワーカースレッド上で呼び出されます。
+
+    Args:
+        queue_size: キューに積める呼び出しの上限
+        context_provider: 呼び出しごとにハンドルキャッシュを返す関数
+                          （省略時は set_resolve_instance() で設定したインスタンスのもの）
+        name: ワーカースレッドの名前に付ける接続名
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, context_provider=None, name=None):
+        self._context_provider = context_provider or get_resolve_context
+        self.name = name
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._recent_waits = collections.deque(maxlen=256)
+        self.queue_size = queue_size
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.exclusive_rejected = 0
+        self.breaker = CircuitBreaker()
+        # 実行中の exclusive な呼び出し (説明, 開始時刻 time.monotonic())
+        self._exclusive = None
+
+    def submit(self, func, *args):
+        """
+        関数をキューに積む
+
+        Args:
+            func: func(context, *args) の形で呼び出される関数
+            *args: 追加の引数
+
+        Returns:
+            結果を受け取る concurrent.futures.Future
+
+        Raises:
+            ResolveBusyError: キューが満杯の場合
+        """
+        self._ensure_started()
+        future = concurrent.futures.Future()
+        try:
+            self._queue.put_nowait((func, args, future, time.perf_counter()))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise ResolveBusyError(f"Resolve request queue is full ({self.queue_size} pending calls)",
+                                   reason="queue_full")
+        with self._stats_lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return future
+
+    async def call(self, func, *args, timeout=DEFAULT_CALL_TIMEOUT, exclusive=None):
+        """
+        関数をワーカースレッドで実行し、結果を待つ
+
+        Args:
+            func: func(context, *args) の形で呼び出される関数
+            *args: 追加の引数
+            timeout: キュー待ちを含めたタイムアウト(秒)。Noneの場合は無制限
+            exclusive: 長くかかる呼び出しの説明（例: "exporting project 'A'"）。指定した場合は
+                       実行中に来た他の呼び出しをすぐに断る
+
+        Returns:
+            func の戻り値
+
+        Raises:
+            ResolveBusyError: キューが満杯、タイムアウトした、ブレーカーが開いている、
+                              または exclusive な呼び出しの実行中の場合
+        """
+        self.breaker.check(self)
+        running = self._exclusive
+        if running is not None:
+            with self._stats_lock:
+                self.exclusive_rejected += 1
+            raise ResolveBusyError(
+                f"Resolve is {running[0]} (for {time.monotonic() - running[1]:.0f} seconds)",
+                reason="exclusive", retry_after=EXCLUSIVE_RETRY_AFTER)
+        if exclusive is not None:
+            func = functools.partial(self._run_exclusive, exclusive, func)
+        future = self.submit(func, *args)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # まだキューで待っている場合は実行自体を取り消す
+            future.cancel()
+            with self._stats_lock:
+                self.timeouts += 1
+            if self._exclusive is None:
+                self.breaker.record_timeout(self)
+            raise ResolveBusyError(f"Resolve call did not finish within {timeout:.1f} seconds")
+        self.breaker.record_success()
+        return result
+
+    @property
+    def exclusive(self):
+        """実行中の exclusive な呼び出しの説明（ない場合はNone）"""
+        running = self._exclusive
+        return running[0] if running is not None else None
+
+    @property
+    def pending(self):
+        """キューで待っている呼び出しと実行中の呼び出しの数"""
+        with self._stats_lock:
+            return max(0, self.submitted - self.completed - self.cancelled)
+
+    def stats(self):
+        """
+        キューの深さや待ち時間などの統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        with self._stats_lock:
+            waits = sorted(self._recent_waits)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self.queue_size,
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "cancelled": self.cancelled,
+                "avg_wait_ms": _ms(self.total_wait / self.completed) if self.completed else 0.0,
+                "p95_wait_ms": _ms(waits[int(len(waits) * 0.95)]) if waits else 0.0,
+                "max_wait_ms": _ms(self.max_wait),
+                "avg_run_ms": _ms(self.total_run / self.completed) if self.completed else 0.0,
+                "exclusive": self.exclusive,
+                "exclusive_rejected": self.exclusive_rejected,
+                "circuit": self.breaker.stats(),
+            }
+
+    def _run_exclusive(self, description, func, context, *args):
+        # ワーカースレッドで実行。キューで待っている間は他の呼び出しを断らない
+        self._exclusive = (description, time.monotonic())
+        try:
+            return func(context, *args)
+        finally:
+            self._exclusive = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread_name = f"resolve-executor-{self.name}" if self.name else "resolve-executor"
+                self._thread = threading.Thread(target=self._run, name=thread_name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            func, args, future, enqueued_at = self._queue.get()
+            # タイムアウトで取り消された呼び出しは実行しない（処理待ちの数からは外す）
+            if not future.set_running_or_notify_cancel():
+                with self._stats_lock:
+                    self.cancelled += 1
+                continue
+            started_at = time.perf_counter()
+            try:
+                context = self._context_provider()
+                if context is not None:
+                    context.begin_call()
+                result = func(context, *args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finished_at = time.perf_counter()
+
+            wait = started_at - enqueued_at
+            with self._stats_lock:
+                self.completed += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_run += finished_at - started_at
+                self._recent_waits.append(wait)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+# すべてのツールで共有するエグゼキュータ
+resolve_executor = ResolveExecutor()
+
+
+def get_executor():
+    """
+    共有のエグゼキュータを取得
+
+    Returns:
+        ResolveExecutorインスタンス
+    """
+    return resolve_executor
+
+
+async def call_resolve(func, *args, timeout=DEFAULT_CALL_TIMEOUT, target=None):
+    """
+    Resolveの処理をワーカースレッドで実行するツール用ヘルパー
+
+    Resolveインスタンスが未設定の場合や接続先が不明な場合は従来のツールと同じ形式の
+    メッセージを返します。キューが満杯・タイムアウト・ブレーカーが開いている場合は
+    ResolveBusyError を送出し、ToolDeadlineMiddleware が構造化された "Resolve busy" の
+    結果に変換します。タイムアウトは実行中のツールの期限 (tool_deadline) を超えません。
+
+    Args:
+        func: func(context, *args) の形で呼び出される関数
+        *args: 追加の引数
+        timeout: キュー待ちを含めたタイムアウト(秒)
+        target: 接続名（None は既定の接続、"auto" は最も空いている接続。resolve_pool を参照）
+
+    Returns:
+        func の戻り値、またはエラーメッセージ
+
+    Raises:
+        ResolveBusyError: Resolveが応答しない、またはツールの期限を過ぎた場合
+    """
+    # resolve_pool はこのモジュールの ResolveExecutor を使うため、循環importを避けて呼び出し時に読み込む
+    from .resolve_pool import get_resolve_pool
+
+    try:
+        connection = get_resolve_pool().select(target)
+    except ValueError as e:
+        return str(e)
+    deadline = tool_deadline.get()
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ResolveBusyError("The tool deadline expired before Resolve could be called", reason="deadline",
+                                   target=connection.name)
+        if timeout is None or remaining < timeout:
+            timeout = remaining
+    if not await connection.ensure_connected(timeout):
+        if connection.name == DEFAULT_TARGET:
+            return "No Resolve instance available"
+        return f"No Resolve instance available for target '{connection.name}'"
+    try:
+        return await connection.executor.call(func, *args, timeout=timeout)
+    except ResolveBusyError as e:
+        # "Resolve busy" の結果に呼び出し先の接続の状態を載せるため、接続名を記録する
+        e.target = connection.name
+        raise
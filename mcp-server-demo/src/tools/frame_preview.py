@@ -0,0 +1,280 @@
+"""
+フレームのプレビュー画像の作成とキャッシュ
+
+Timeline.GetCurrentClipThumbnailImage() が返すbase64のRGB画像を、
+- コピーせずに参照して（NumPyがあれば frombuffer、なければ memoryview）
+- ワーカースレッドで縮小し
+- PNG（Pillowがあれば JPEG も可）に圧縮して
+返します。結果は (タイムラインID, アイテムID, フレーム, サイズ, 形式) をキーとした
+バイト数上限付きのLRUキャッシュに保持します。
+
+NumPy・Pillow はどちらも任意の依存です。NumPyがない場合は間引きによる縮小、
+Pillowがない場合はPNGだけになります。
+"""
+
+import base64
+import collections
+import concurrent.futures
+import io
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+# キャッシュに保持する画像の合計バイト数の上限
+PREVIEW_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# 既定の最大の幅・高さ(ピクセル)
+DEFAULT_PREVIEW_SIZE = 320
+
+# JPEGの品質
+JPEG_QUALITY = 80
+
+# 縮小・圧縮に使うワーカースレッド数
+PREVIEW_WORKERS = min(4, os.cpu_count() or 1)
+
+PREVIEW_FORMATS = ("auto", "jpeg", "png")
+
+
+def frames_to_timecode(frames, fps):
+    """
+    フレーム番号をタイムコード (HH:MM:SS:FF, ノンドロップ) に変換
+
+    Args:
+        frames: 絶対フレーム番号
+        fps: タイムラインのフレームレート（整数に丸めて使う）
+
+    Returns:
+        タイムコードの文字列
+    """
+    fps = max(1, int(round(fps)))
+    seconds, frame = divmod(int(frames), fps)
+    minutes, second = divmod(seconds, 60)
+    hours, minute = divmod(minutes, 60)
+    return f"{hours:02d}:{minute:02d}:{second:02d}:{frame:02d}"
+
+
+def timecode_to_frames(timecode, fps):
+    """
+    タイムコード (HH:MM:SS:FF または HH:MM:SS;FF) をフレーム番号に変換
+
+    Args:
+        timecode: タイムコードの文字列
+        fps: タイムラインのフレームレート（整数に丸めて使う）
+
+    Returns:
+        絶対フレーム番号
+
+    Raises:
+        ValueError: タイムコードの形式が不正な場合
+    """
+    hours, minutes, seconds, frames = (int(part) for part in timecode.replace(";", ":").split(":"))
+    return ((hours * 60 + minutes) * 60 + seconds) * max(1, int(round(fps))) + frames
+
+
+def resolve_format(image_format):
+    """
+    要求された画像形式を実際に使う形式に変換（JPEGはPillowがある場合だけ）
+
+    Args:
+        image_format: "auto", "jpeg", "png"
+
+    Returns:
+        "jpeg" または "png"
+    """
+    if image_format in ("auto", "jpeg") and PILImage is not None:
+        return "jpeg"
+    return "png"
+
+
+def _downsample_numpy(pixels, width, height, factor):
+    image = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 3)
+    if factor == 1:
+        return image
+    out_height, out_width = height // factor, width // factor
+    # factor×factor の画素の平均（ボックスフィルタ）
+    blocks = image[:out_height * factor, :out_width * factor].reshape(out_height, factor, out_width, factor, 3)
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(np.uint8)
+
+
+def _downsample_memoryview(pixels, width, height, factor):
+    # NumPyがない場合は factor 画素ごとに間引く（スライスはC実装なので画素ごとのループはしない）
+    view = memoryview(pixels)
+    out_width = width // factor
+    stride = width * 3
+    rows = []
+    for y in range(0, (height // factor) * factor, factor):
+        row = view[y * stride:y * stride + out_width * factor * 3]
+        out = bytearray(out_width * 3)
+        for channel in range(3):
+            out[channel::3] = row[channel::3 * factor]
+        rows.append(bytes(out))
+    return rows
+
+
+def _encode_png(rows, width, height):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # 各行の先頭にフィルタ種別 0 (None) を付けて圧縮
+    raw = b"".join(b"\x00" + row for row in rows)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+
+def render_preview(thumbnail, max_size, image_format):
+    """
+    サムネイルを縮小して圧縮（ワーカースレッドで実行）
+
+    Args:
+        thumbnail: GetCurrentClipThumbnailImage() の結果
+        max_size: 縮小後の幅・高さの上限
+        image_format: resolve_format() の結果
+
+    Returns:
+        (画像のバイト列, 幅, 高さ)
+
+    Raises:
+        ValueError: 画像のサイズとデータの長さが一致しない場合
+    """
+    width, height = int(thumbnail["width"]), int(thumbnail["height"])
+    pixels = base64.b64decode(thumbnail["data"])
+    if len(pixels) != width * height * 3:
+        raise ValueError(f"Unexpected thumbnail data ({len(pixels)} bytes for {width}x{height} RGB)")
+
+    # 整数倍の縮小にして、補間なしで幅・高さを上限以下にする
+    factor = max(1, -(-max(width, height) // max_size))
+    out_width, out_height = width // factor, height // factor
+
+    if np is not None:
+        image = _downsample_numpy(pixels, width, height, factor)
+        if image_format == "jpeg":
+            return _encode_jpeg(image.tobytes(), out_width, out_height), out_width, out_height
+        return _encode_png([row.tobytes() for row in image], out_width, out_height), out_width, out_height
+
+    rows = _downsample_memoryview(pixels, width, height, factor)
+    if image_format == "jpeg":
+        return _encode_jpeg(b"".join(rows), out_width, out_height), out_width, out_height
+    return _encode_png(rows, out_width, out_height), out_width, out_height
+
+
+def _encode_jpeg(data, width, height):
+    buffer = io.BytesIO()
+    PILImage.frombuffer("RGB", (width, height), data, "raw", "RGB", 0, 1).save(buffer, "JPEG", quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+class PreviewCache:
+    """
+    合計バイト数に上限のあるプレビュー画像のLRUキャッシュ
+
+    Args:
+        max_bytes: 保持する画像の合計バイト数の上限
+    """
+
+    def __init__(self, max_bytes=PREVIEW_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        キャッシュ済みのプレビューを取得
+
+        Args:
+            key: (タイムラインID, アイテムID, フレーム, サイズ, 形式)
+
+        Returns:
+            (画像のバイト列, 幅, 高さ)（キャッシュにない場合はNone）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """
+        プレビューを保持（上限を超える場合は古いものから破棄）
+
+        Args:
+            key: (タイムラインID, アイテムID, フレーム, サイズ, 形式)
+            entry: (画像のバイト列, 幅, 高さ)
+        """
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous[0])
+            self._entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted[0])
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "numpy": np is not None,
+                "jpeg": PILImage is not None,
+            }
+
+
+# すべてのツールで共有するキャッシュ
+preview_cache = PreviewCache()
+
+# 縮小・圧縮用のワーカースレッド（最初の使用時に作成）
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_preview_cache():
+    """
+    共有のプレビューキャッシュを取得
+
+    Returns:
+        PreviewCacheインスタンス
+    """
+    return preview_cache
+
+
+def get_preview_pool():
+    """
+    縮小・圧縮用のスレッドプールを取得
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutorインスタンス
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ThreadPoolExecutor(max_workers=PREVIEW_WORKERS,
+                                                          thread_name_prefix="frame-preview")
+        return _pool
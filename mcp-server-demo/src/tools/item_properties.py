@@ -0,0 +1,383 @@
+"""
+タイムラインアイテムのプロパティの一括計算
+
+apply_item_properties のルールから、アイテムごとの新しいプロパティ値を計算します。
+
+- fit: クリップを指定したアスペクト比 (例: "9:16") の枠いっぱいに拡大し、
+  bias で枠に入れる位置を選ぶ (ZoomX / ZoomY / Pan / Tilt、crop=True で枠の外を Crop*)
+- set: すべてのアイテムに同じ値を設定
+- expressions: プロパティごとの式 (例: {"ZoomX": "ZoomX * 1.1", "Pan": "(index % 2) * 40"})
+
+NumPyがあれば全アイテムを配列としてまとめて計算し、なければ1件ずつ計算します。
+式は ast で解析し、四則演算・比較・許可した関数だけを評価します (eval は使わない)。
+数値と変数はすべて浮動小数点数として計算します。
+
+fit はプロジェクトの既定の "Scale entire image to fit" でクリップがタイムラインに
+収まっている状態 (ZoomX = ZoomY = 1.0) を基準にします。
+"""
+
+import ast
+import math
+import operator
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 変化したとみなす差の下限（これ以下の差は書き込まない）
+CHANGE_TOLERANCE = 1e-4
+
+# 式で使える変数（プロパティ名以外）
+EXPRESSION_VARIABLES = ("index", "count", "track", "start", "end", "duration", "width", "height",
+                        "clip_width", "clip_height", "pi")
+
+# bias の名前 → 値 (-1 は左/上、1 は右/下を枠に入れる)
+BIAS_NAMES = {"center": 0.0, "left": -1.0, "right": 1.0, "top": -1.0, "bottom": 1.0}
+
+_ASPECT_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*[:x/]\s*(\d+(?:\.\d+)?)\s*$")
+_RESOLUTION_RE = re.compile(r"(\d+)\s*x\s*(\d+)")
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_COMPARE_OPERATORS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+
+class _ScalarMath:
+    """NumPyがない場合に1件ずつ計算するための、NumPyと同じ名前の関数"""
+
+    maximum = staticmethod(max)
+    minimum = staticmethod(min)
+    abs = staticmethod(abs)
+    round = staticmethod(round)
+    sqrt = staticmethod(math.sqrt)
+    sin = staticmethod(math.sin)
+    cos = staticmethod(math.cos)
+
+    @staticmethod
+    def clip(value, low, high):
+        return min(max(value, low), high)
+
+    @staticmethod
+    def where(condition, a, b):
+        return a if condition else b
+
+
+def _functions(m):
+    return {
+        "abs": m.abs, "min": m.minimum, "max": m.maximum, "clip": m.clip, "round": m.round,
+        "sqrt": m.sqrt, "sin": m.sin, "cos": m.cos, "where": m.where,
+    }
+
+
+def parse_aspect(value):
+    """
+    "9:16" / "4x5" / 0.5625 などのアスペクト比を幅/高さの値にする
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    if isinstance(value, (int, float)) and value > 0:
+        return float(value)
+    match = _ASPECT_RE.match(str(value))
+    if not match or float(match.group(2)) == 0 or float(match.group(1)) == 0:
+        raise ValueError(f"fit must be an aspect ratio such as '9:16' (got {value!r})")
+    return float(match.group(1)) / float(match.group(2))
+
+
+def parse_bias(value):
+    """
+    bias を -1.0 〜 1.0 の値にする ("center" / "left" / "right" / "top" / "bottom" または数値)
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    if value is None:
+        return 0.0
+    if isinstance(value, str):
+        if value.lower() not in BIAS_NAMES:
+            raise ValueError(f"bias must be a number from -1 to 1 or one of: {', '.join(BIAS_NAMES)}")
+        return BIAS_NAMES[value.lower()]
+    bias = float(value)
+    if not -1.0 <= bias <= 1.0:
+        raise ValueError("bias must be between -1 and 1")
+    return bias
+
+
+def parse_resolution(value):
+    """
+    クリップの "Resolution" ("3840x2160") を (幅, 高さ) にする（読めない場合はNone）
+    """
+    match = _RESOLUTION_RE.search(str(value or ""))
+    if not match or not int(match.group(1)) or not int(match.group(2)):
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def compile_expression(text):
+    """
+    式を解析し、使っている変数名を調べる
+
+    Args:
+        text: 式の文字列
+
+    Returns:
+        (解析した式, 使っている変数名の集合)
+
+    Raises:
+        ValueError: 構文エラー、または許可していない構文・関数を使っている場合
+    """
+    try:
+        tree = ast.parse(str(text), mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression {text!r}: {e.msg}")
+    names = set()
+    allowed_functions = _functions(_ScalarMath)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in allowed_functions or node.keywords:
+                raise ValueError(f"Invalid expression {text!r}: only {', '.join(allowed_functions)} can be called")
+        elif isinstance(node, ast.Name):
+            if node.id not in allowed_functions:
+                names.add(node.id)
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+                raise ValueError(f"Invalid expression {text!r}: only numbers are allowed")
+        elif isinstance(node, ast.Compare):
+            if len(node.ops) != 1 or type(node.ops[0]) not in _COMPARE_OPERATORS:
+                raise ValueError(f"Invalid expression {text!r}: use a single comparison such as 'start < 100'")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _BINARY_OPERATORS:
+                raise ValueError(f"Invalid expression {text!r}: unsupported operator")
+        elif isinstance(node, ast.UnaryOp):
+            if type(node.op) not in _UNARY_OPERATORS:
+                raise ValueError(f"Invalid expression {text!r}: unsupported operator")
+        elif not isinstance(node, (ast.Load, ast.expr_context, ast.operator, ast.unaryop, ast.cmpop)):
+            raise ValueError(f"Invalid expression {text!r}: {type(node).__name__} is not allowed")
+    return tree, names
+
+
+def _evaluate(node, variables, functions):
+    if isinstance(node, ast.Constant):
+        # 整数のままだと "9**9**9" のような巨大な整数の計算が終わらないため、浮動小数点数にする
+        # （大きすぎる累乗はすぐに OverflowError になる）
+        return float(node.value)
+    if isinstance(node, ast.Name):
+        return variables[node.id]
+    if isinstance(node, ast.BinOp):
+        return _BINARY_OPERATORS[type(node.op)](_evaluate(node.left, variables, functions),
+                                                _evaluate(node.right, variables, functions))
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, variables, functions))
+    if isinstance(node, ast.Compare):
+        return _COMPARE_OPERATORS[type(node.ops[0])](_evaluate(node.left, variables, functions),
+                                                     _evaluate(node.comparators[0], variables, functions))
+    return functions[node.func.id](*(_evaluate(arg, variables, functions) for arg in node.args))
+
+
+def _fit(m, width, height, clip_width, clip_height, aspect, bias_x, bias_y, crop):
+    # 枠（タイムラインの中央に置いた aspect の矩形）
+    window_width = min(width, height * aspect)
+    window_height = min(height, width / aspect)
+    # ZoomX = ZoomY = 1.0 のときの表示サイズ（タイムラインに収まるよう縮小・拡大した大きさ）
+    base_scale = m.minimum(width / clip_width, height / clip_height)
+    shown_width = clip_width * base_scale
+    shown_height = clip_height * base_scale
+    zoom = m.maximum(window_width / shown_width, window_height / shown_height)
+    # 拡大した画像を枠の中でずらせる量の半分。bias=1 で右端（下端）を枠に入れる
+    slack_x = (shown_width * zoom - window_width) / 2
+    slack_y = (shown_height * zoom - window_height) / 2
+    values = {"ZoomX": zoom, "ZoomY": zoom, "Pan": -bias_x * slack_x, "Tilt": bias_y * slack_y}
+    if crop:
+        # 枠からはみ出す部分を隠す（Crop はズーム前の大きさで、Pan / Tilt でずらした分も含める）
+        values["CropLeft"] = slack_x * (1 + bias_x) / zoom
+        values["CropRight"] = slack_x * (1 - bias_x) / zoom
+        values["CropTop"] = slack_y * (1 + bias_y) / zoom
+        values["CropBottom"] = slack_y * (1 - bias_y) / zoom
+    return values
+
+
+class PropertyRule:
+    """
+    apply_item_properties のルールを検証したもの
+
+    Args:
+        rule: {"fit", "bias", "vertical_bias", "crop", "set", "expressions"}
+        property_names: 変更できるプロパティ名（GetProperty() のキー）
+
+    Raises:
+        ValueError: ルールが不正な場合
+    """
+
+    def __init__(self, rule, property_names):
+        unknown_keys = set(rule) - {"fit", "bias", "vertical_bias", "crop", "set", "expressions"}
+        if unknown_keys:
+            raise ValueError(f"Unknown rule keys: {', '.join(sorted(unknown_keys))}")
+        self.aspect = parse_aspect(rule["fit"]) if rule.get("fit") is not None else None
+        self.bias_x = parse_bias(rule.get("bias"))
+        self.bias_y = parse_bias(rule.get("vertical_bias"))
+        self.crop = bool(rule.get("crop", False))
+        constants = dict(rule.get("set") or {})
+        # 数値は配列として計算し、それ以外（FlipX などの真偽値）はそのまま比較する
+        self.numbers = {key: float(value) for key, value in constants.items()
+                        if isinstance(value, (int, float)) and not isinstance(value, bool)}
+        self.constants = {key: value for key, value in constants.items() if key not in self.numbers}
+        self.expressions = {}
+        names = set()
+        for key, text in (rule.get("expressions") or {}).items():
+            tree, used = compile_expression(text)
+            self.expressions[key] = tree
+            names |= used
+        if self.aspect is None and not constants and not self.expressions:
+            raise ValueError("The rule must contain fit, set or expressions")
+
+        targets = set(constants) | set(self.expressions)
+        if self.aspect is not None:
+            targets |= {"ZoomX", "ZoomY", "Pan", "Tilt"} | ({"CropLeft", "CropRight", "CropTop", "CropBottom"}
+                                                           if self.crop else set())
+        unknown = sorted(targets - set(property_names))
+        if unknown:
+            raise ValueError(f"Unknown properties: {', '.join(unknown)}")
+        unknown = sorted(names - set(property_names) - set(EXPRESSION_VARIABLES))
+        if unknown:
+            raise ValueError(f"Unknown names in expressions: {', '.join(unknown)} "
+                             f"(use property names or {', '.join(EXPRESSION_VARIABLES)})")
+        self.targets = sorted(targets)
+        self.variables = names
+
+    @property
+    def needs_clip_size(self):
+        return self.aspect is not None or bool(self.variables & {"clip_width", "clip_height"})
+
+    @property
+    def needs_timing(self):
+        return bool(self.variables & {"start", "end", "duration"})
+
+    def compute(self, rows, width, height):
+        """
+        新しいプロパティ値を計算し、変化した値だけを返す
+
+        Args:
+            rows: アイテムごとの辞書（"properties", "track", "start", "end", "duration",
+                  "clip_width", "clip_height"）
+            width: タイムラインの幅
+            height: タイムラインの高さ
+
+        Returns:
+            [{プロパティ名: 新しい値}]（rows と同じ順。変化がないアイテムは空の辞書）
+
+        Raises:
+            ValueError: 式の評価に失敗した場合（数値でないプロパティを使った場合など）
+        """
+        if not rows:
+            return []
+        if np is not None:
+            return self._compute_vectorized(rows, width, height)
+        return [self._compute_one(row, i, len(rows), width, height) for i, row in enumerate(rows)]
+
+    def _numeric_names(self):
+        return (set(self.targets) | self.variables) - set(EXPRESSION_VARIABLES) - set(self.constants)
+
+    def _compute_vectorized(self, rows, width, height):
+        count = len(rows)
+        try:
+            current = {name: np.array([_number(row["properties"].get(name)) for row in rows], dtype=np.float64)
+                       for name in self._numeric_names()}
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Properties used by the rule must be numeric: {e}")
+        variables = dict(current)
+        variables.update({
+            "index": np.arange(count, dtype=np.float64),
+            "count": float(count),
+            "width": float(width),
+            "height": float(height),
+            "pi": math.pi,
+        })
+        for name in ("track", "start", "end", "duration", "clip_width", "clip_height"):
+            if name in rows[0]:
+                variables[name] = np.array([row[name] for row in rows], dtype=np.float64)
+
+        new_values = {}
+        if self.aspect is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                new_values.update(_fit(np, float(width), float(height), variables["clip_width"],
+                                       variables["clip_height"], self.aspect, self.bias_x, self.bias_y, self.crop))
+        new_values.update({key: np.full(count, value) for key, value in self.numbers.items()})
+        variables.update(new_values)
+        functions = _functions(np)
+        for key, tree in self.expressions.items():
+            try:
+                with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                    value = _evaluate(tree, variables, functions)
+            except (TypeError, ValueError, ZeroDivisionError, OverflowError) as e:
+                raise ValueError(f"Failed to evaluate the expression for {key}: {e}")
+            new_values[key] = variables[key] = np.broadcast_to(np.asarray(value, dtype=np.float64), (count,))
+
+        changes = [{} for _ in rows]
+        for key, values in new_values.items():
+            old = current.get(key)
+            valid = np.isfinite(values)
+            changed = valid if old is None else valid & ~(np.abs(values - old) <= CHANGE_TOLERANCE)
+            for i in np.flatnonzero(changed):
+                changes[i][key] = round(float(values[i]), 6)
+        self._apply_constants(rows, changes)
+        return changes
+
+    def _compute_one(self, row, index, count, width, height):
+        properties = row["properties"]
+        try:
+            current = {name: _number(properties.get(name)) for name in self._numeric_names()}
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Properties used by the rule must be numeric: {e}")
+        variables = dict(current, index=float(index), count=float(count), width=float(width),
+                         height=float(height), pi=math.pi)
+        for name in ("track", "start", "end", "duration", "clip_width", "clip_height"):
+            if name in row:
+                variables[name] = float(row[name])
+
+        new_values = {}
+        if self.aspect is not None:
+            try:
+                new_values.update(_fit(_ScalarMath, width, height, row["clip_width"], row["clip_height"],
+                                       self.aspect, self.bias_x, self.bias_y, self.crop))
+            except ZeroDivisionError:
+                pass
+        new_values.update(self.numbers)
+        variables.update(new_values)
+        functions = _functions(_ScalarMath)
+        for key, tree in self.expressions.items():
+            try:
+                new_values[key] = variables[key] = float(_evaluate(tree, variables, functions))
+            except ZeroDivisionError:
+                continue
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(f"Failed to evaluate the expression for {key}: {e}")
+
+        changes = {}
+        for key, value in new_values.items():
+            if not math.isfinite(value):
+                continue
+            old = current.get(key)
+            if old is None or abs(value - old) > CHANGE_TOLERANCE:
+                changes[key] = round(value, 6)
+        self._apply_constants([row], [changes])
+        return changes
+
+    def _apply_constants(self, rows, changes):
+        for row, change in zip(rows, changes):
+            for key, value in self.constants.items():
+                if key not in self.expressions and row["properties"].get(key) != value:
+                    change[key] = value
+
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        raise TypeError(f"{value!r} is not a number")
+    return float(value)
@@ -0,0 +1,209 @@
+"""
+マーカーの一括同期
+
+望ましいマーカーの集合と GetMarkers() の結果を比較し、必要最小限の
+DeleteMarkerAtFrame / UpdateMarkerCustomData / AddMarker だけを実行します。
+マーカーの同一性は customData で判断し、customData のないマーカーはフレームで判断します。
+
+Resolve APIにはマーカーの名前や色を変更するAPIがないため、内容の変わった
+マーカーは削除してから追加し直します。内容が同じで customData だけが異なる
+マーカーは UpdateMarkerCustomData() で付け替えます。
+"""
+
+# 省略された項目の既定値
+MARKER_DEFAULTS = {"color": "Blue", "name": "", "note": "", "duration": 1}
+
+# 同期しない既存マーカーの扱い
+PRUNE_MODES = ("managed", "all", "none")
+
+_COMPARED_FIELDS = ("color", "name", "note", "duration")
+
+
+def normalize_markers(markers):
+    """
+    望ましいマーカーの指定を検証し、既定値を補う
+
+    Args:
+        markers: [{"frame", "color", "name", "note", "duration", "custom_data"}] のリスト
+
+    Returns:
+        正規化したマーカーのリスト
+
+    Raises:
+        ValueError: フレームや customData が重複している、または値が不正な場合
+    """
+    normalized = []
+    frames = set()
+    custom_data = set()
+    for i, marker in enumerate(markers):
+        if "frame" not in marker:
+            raise ValueError(f"markers[{i}]: frame is required")
+        spec = {key: marker.get(key, default) for key, default in MARKER_DEFAULTS.items()}
+        spec["frame"] = int(marker["frame"])
+        spec["duration"] = int(spec["duration"])
+        spec["custom_data"] = str(marker.get("custom_data") or "")
+        if spec["duration"] <= 0:
+            raise ValueError(f"markers[{i}]: duration must be positive")
+        if spec["frame"] in frames:
+            raise ValueError(f"markers[{i}]: more than one marker at frame {spec['frame']}")
+        if spec["custom_data"] and spec["custom_data"] in custom_data:
+            raise ValueError(f"markers[{i}]: custom_data '{spec['custom_data']}' is used more than once")
+        frames.add(spec["frame"])
+        custom_data.add(spec["custom_data"])
+        normalized.append(spec)
+    return normalized
+
+
+class MarkerIndex:
+    """
+    GetMarkers() の結果をフレームと customData で引けるようにしたインデックス
+
+    Args:
+        markers: GetMarkers() の結果 ({フレーム: {"color", "duration", "note", "name", "customData"}})
+    """
+
+    def __init__(self, markers):
+        self.by_frame = {int(frame): marker for frame, marker in (markers or {}).items()}
+        self.by_custom_data = {}
+        for frame in sorted(self.by_frame):
+            custom_data = self.by_frame[frame].get("customData") or ""
+            if custom_data:
+                self.by_custom_data.setdefault(custom_data, frame)
+
+    def same(self, frame, spec):
+        """フレームのマーカーが spec と同じ内容か（customData は比較しない）"""
+        marker = self.by_frame[frame]
+        return all(marker.get(key) == spec[key] for key in _COMPARED_FIELDS)
+
+
+class MarkerSyncPlan:
+    """
+    同期のために実行するAPI呼び出しの計画
+
+    Attributes:
+        deletes: 削除するフレーム
+        relabels: customData を付け替える (フレーム, customData)
+        adds: 追加するマーカー
+        conflicts: 既存のマーカーが残るため追加できないマーカー
+        counts: unchanged / added / updated / moved / deleted の件数
+    """
+
+    def __init__(self):
+        self.deletes = []
+        self.relabels = []
+        self.adds = []
+        self.conflicts = []
+        self.counts = {"unchanged": 0, "added": 0, "updated": 0, "moved": 0, "deleted": 0}
+
+    @property
+    def writes(self):
+        return len(self.deletes) + len(self.relabels) + len(self.adds)
+
+
+def plan_marker_sync(index, desired, prune="managed"):
+    """
+    既存のマーカーを望ましい集合に揃えるための最小限の操作を計画
+
+    Args:
+        index: 既存マーカーの MarkerIndex
+        desired: normalize_markers() の結果
+        prune: 望ましい集合にない既存マーカーの扱い。"managed" は customData のある
+               マーカーだけを削除、"all" はすべて削除、"none" は削除しない
+
+    Returns:
+        MarkerSyncPlanインスタンス
+    """
+    plan = MarkerSyncPlan()
+    by_frame = index.by_frame
+    desired_ids = {spec["custom_data"] for spec in desired if spec["custom_data"]}
+    claimed = set()
+    unmatched = []
+    # (追加するマーカー, 削除して移すフレームまたはNone, 件数の種類)
+    pending = []
+
+    for spec in desired:
+        if spec["custom_data"]:
+            frame = index.by_custom_data.get(spec["custom_data"])
+        else:
+            # customData のないマーカーは同じフレームの customData のないマーカーと対応付ける
+            marker = by_frame.get(spec["frame"])
+            frame = spec["frame"] if marker is not None and not marker.get("customData") else None
+        if frame is None:
+            unmatched.append(spec)
+            continue
+        claimed.add(frame)
+        same = index.same(frame, spec)
+        if frame == spec["frame"] and same:
+            plan.counts["unchanged"] += 1
+            continue
+        plan.deletes.append(frame)
+        pending.append((spec, frame, "moved" if same else "updated"))
+
+    for spec in unmatched:
+        frame = spec["frame"]
+        marker = by_frame.get(frame)
+        if (marker is not None and frame not in claimed and index.same(frame, spec)
+                and (marker.get("customData") or "") not in desired_ids):
+            # 内容が同じマーカーは customData の付け替えだけで済ませる
+            claimed.add(frame)
+            plan.relabels.append((frame, spec["custom_data"]))
+            plan.counts["updated"] += 1
+        else:
+            pending.append((spec, None, "added"))
+
+    for frame, marker in by_frame.items():
+        if frame in claimed:
+            continue
+        if prune == "all" or (prune == "managed" and marker.get("customData")):
+            plan.deletes.append(frame)
+            plan.counts["deleted"] += 1
+
+    # 削除されずに残るマーカーと同じフレームには追加できない。
+    # 移動できないマーカーは元のフレームに残すため、空くはずのフレームが減れば確認し直す
+    deleted = set(plan.deletes)
+    changed = True
+    while changed:
+        changed = False
+        remaining = []
+        for spec, source, kind in pending:
+            if spec["frame"] in by_frame and spec["frame"] not in deleted:
+                plan.conflicts.append(spec)
+                if source is not None:
+                    deleted.discard(source)
+                    changed = True
+            else:
+                remaining.append((spec, source, kind))
+        pending = remaining
+    plan.deletes = [frame for frame in plan.deletes if frame in deleted]
+    plan.adds = [spec for spec, _, _ in pending]
+    for _, _, kind in pending:
+        plan.counts[kind] += 1
+    return plan
+
+
+def apply_marker_sync(target, plan):
+    """
+    計画した操作を実行（エグゼキュータ上で実行）
+
+    削除を先に行い、移動先のフレームを空けてから追加します。
+
+    Args:
+        target: マーカーを持つTimeline / TimelineItem / MediaPoolItem
+        plan: MarkerSyncPlanインスタンス
+
+    Returns:
+        失敗した操作のリスト
+    """
+    failed = []
+    for frame in plan.deletes:
+        if not target.DeleteMarkerAtFrame(frame):
+            failed.append({"frame": frame, "error": "failed to delete marker"})
+    for frame, custom_data in plan.relabels:
+        if not target.UpdateMarkerCustomData(frame, custom_data):
+            failed.append({"frame": frame, "custom_data": custom_data, "error": "failed to update custom data"})
+    for spec in plan.adds:
+        if not target.AddMarker(spec["frame"], spec["color"], spec["name"], spec["note"], spec["duration"],
+                                spec["custom_data"]):
+            failed.append({"frame": spec["frame"], "custom_data": spec["custom_data"],
+                           "error": "failed to add marker"})
+    return failed
@@ -0,0 +1,215 @@
+"""
+メディア一括取り込み用のファイル走査と取り込み済みインデックス
+
+- scan_media_files: ディレクトリをスレッドプールで並列に走査し、拡張子で絞り込む
+- ImportIndex: 取り込み済みファイルを (パス, サイズ, 更新時刻, メディアID) で
+  プロジェクトごとに記録し、JSONファイルに永続化する（保存はツールの呼び出しごとに1回）。
+  メディアプールから削除されたクリップのファイルは、メディアIDの照合で未取り込みに戻る
+
+変更のないカードを再度取り込む場合は、ディレクトリ走査とインデックスの照合だけで
+取り込み対象が空になるため、ImportMedia() は呼び出されません。
+"""
+
+import concurrent.futures
+import json
+import os
+import threading
+
+# 既定で取り込む拡張子
+DEFAULT_MEDIA_EXTENSIONS = (
+    ".mov", ".mp4", ".m4v", ".mxf", ".avi", ".mkv", ".mts", ".m2ts",
+    ".braw", ".r3d", ".ari", ".crm", ".dng", ".dpx", ".exr", ".tif", ".tiff",
+    ".png", ".jpg", ".jpeg", ".wav", ".aif", ".aiff", ".mp3", ".m4a", ".flac",
+)
+
+# ディレクトリ走査の既定のスレッド数
+DEFAULT_SCAN_WORKERS = 8
+
+# インデックスファイルの保存先（環境変数で変更可能）
+IMPORT_INDEX_ENV = "DAVINCI_MCP_IMPORT_INDEX"
+DEFAULT_IMPORT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".davinci_mcp", "import_index.json")
+
+
+def _scan_directory(path, extensions):
+    files = []
+    subdirs = []
+    errors = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                        stat = entry.stat()
+                        files.append((os.path.abspath(entry.path), stat.st_size, stat.st_mtime_ns))
+                except OSError as e:
+                    errors.append(f"{entry.path}: {e}")
+    except OSError as e:
+        errors.append(f"{path}: {e}")
+    return files, subdirs, errors
+
+
+def scan_media_files(paths, extensions=DEFAULT_MEDIA_EXTENSIONS, recursive=True, workers=DEFAULT_SCAN_WORKERS):
+    """
+    ディレクトリをスレッドプールで並列に走査してメディアファイルを列挙
+
+    Args:
+        paths: ディレクトリまたはファイルのパスのリスト
+        extensions: 対象とする拡張子（".mov" のような小文字の形式）
+        recursive: サブディレクトリも走査するか
+        workers: 走査に使うスレッド数
+
+    Returns:
+        ([(絶対パス, サイズ, 更新時刻ns)] をパス順に並べたリスト, エラーメッセージのリスト) のタプル
+    """
+    extensions = {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions}
+    files = []
+    errors = []
+    directories = []
+    for path in paths:
+        if os.path.isdir(path):
+            directories.append(path)
+        elif os.path.isfile(path):
+            stat = os.stat(path)
+            files.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+        else:
+            errors.append(f"{path}: not found")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_directory, d, extensions) for d in directories}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                found, subdirs, scan_errors = future.result()
+                files.extend(found)
+                errors.extend(scan_errors)
+                if recursive:
+                    pending.update(pool.submit(_scan_directory, d, extensions) for d in subdirs)
+
+    # 重複指定されたパスを除いてパス順に並べる
+    unique = {path: (path, size, mtime) for path, size, mtime in files}
+    return [unique[path] for path in sorted(unique)], errors
+
+
+class ImportIndex:
+    """
+    取り込み済みファイルの永続インデックス
+
+    プロジェクトの GetUniqueId() ごとに {パス: [サイズ, 更新時刻ns, メディアID]} を保持します。
+    サイズか更新時刻が変わったファイルと、メディアIDがメディアプールにないファイルは
+    未取り込みとして扱います。record() と filter_new() はメモリ上の記録だけを変更するため、
+    変更は save() で保存します。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get(IMPORT_INDEX_ENV) or DEFAULT_IMPORT_INDEX_PATH
+        self._lock = threading.Lock()
+        self._projects = None
+        self._dirty = False
+
+    def _load(self):
+        if self._projects is not None:
+            return self._projects
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._projects = json.load(f).get("projects", {})
+        except (OSError, ValueError):
+            # 未作成または壊れている場合は空から始める
+            self._projects = {}
+        return self._projects
+
+    def filter_new(self, project_id, files, media_ids=None):
+        """
+        未取り込みのファイルだけを取り出す
+
+        Args:
+            project_id: 取り込み先プロジェクトの GetUniqueId()
+            files: [(パス, サイズ, 更新時刻ns)]
+            media_ids: メディアプールにあるクリップの GetMediaId() の集合。指定した場合、
+                       記録したメディアIDがこれに含まれないファイルは記録から外して未取り込みとする
+
+        Returns:
+            未取り込み（または内容が変わった）ファイルのリスト
+        """
+        with self._lock:
+            entries = self._load().get(project_id, {})
+            new_files = []
+            for path, size, mtime in files:
+                entry = entries.get(path)
+                if entry is not None and media_ids is not None and entry[2] is not None \
+                        and entry[2] not in media_ids:
+                    # メディアプールから削除されたクリップ
+                    del entries[path]
+                    self._dirty = True
+                    entry = None
+                if entry is None or entry[0] != size or entry[1] != mtime:
+                    new_files.append((path, size, mtime))
+            return new_files
+
+    def record(self, project_id, imported):
+        """
+        取り込んだファイルを記録（ファイルへの保存は save() で行う）
+
+        Args:
+            project_id: 取り込み先プロジェクトの GetUniqueId()
+            imported: [(パス, サイズ, 更新時刻ns, メディアID)]
+        """
+        with self._lock:
+            entries = self._load().setdefault(project_id, {})
+            for path, size, mtime, media_id in imported:
+                entries[path] = [size, mtime, media_id]
+                self._dirty = True
+
+    def save(self):
+        """記録に変更があればファイルに保存"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def forget(self, project_id=None):
+        """
+        記録を破棄（project_idを省略した場合はすべて）
+
+        Args:
+            project_id: 対象のプロジェクトの GetUniqueId()
+        """
+        with self._lock:
+            projects = self._load()
+            if project_id is None:
+                projects.clear()
+            else:
+                projects.pop(project_id, None)
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            projects = self._load()
+            return {
+                "path": self.path,
+                "projects": len(projects),
+                "files": sum(len(entries) for entries in projects.values()),
+            }
+
+    def _save(self):
+        # 書き込み途中で壊れないよう一時ファイルから置き換える
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "projects": self._projects}, f)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+
+
+# すべてのツールで共有するインデックス
+import_index = ImportIndex()
+
+
+def get_import_index():
+    """
+    共有の取り込み済みインデックスを取得
+
+    Returns:
+        ImportIndexインスタンス
+    """
+    return import_index
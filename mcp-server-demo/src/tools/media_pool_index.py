@@ -0,0 +1,201 @@
+"""
+メディアプールのクリップ名インデックス
+
+クリップ名 → MediaPoolItem の対応をフォルダ単位 (Folder.GetUniqueId()) で
+キャッシュし、クリップ検索のたびに GetClipProperty を全クリップ分
+呼び出すことを避けます。
+"""
+
+import threading
+
+
+class _FolderEntry:
+    """
+    1フォルダ分のインデックス
+
+    Args:
+        signature: 構築時のシグネチャ
+        clips_by_name: {クリップ名: MediaPoolItem}
+        rescanned: 名前が見つからなかったために再構築したか（同じシグネチャの間は再構築しない）
+    """
+
+    def __init__(self, signature, clips_by_name, rescanned=False):
+        self.signature = signature
+        self.clips_by_name = clips_by_name
+        self.rescanned = rescanned
+
+
+class ClipIndex:
+    """
+    フォルダ単位のクリップ名インデックス
+
+    フォルダごとに (クリップ数, 先頭クリップID, 末尾クリップID) を
+    シグネチャとして保持し、検索時に GetClipList() の結果と比較します。
+    シグネチャが変わった場合はそのフォルダだけを再構築します。
+    クリップ数の変わらないリネームはシグネチャに現れないため、ヒットしたクリップの名前を
+    再確認し、見つからない名前があった場合もそのフォルダを再構築します。見つからないことに
+    よる再構築はシグネチャが変わるまでフォルダごとに1回だけです（サブフォルダのクリップを
+    再帰的に検索するたびに親フォルダを読み直さないため）。その後にリネームされたクリップは、
+    シグネチャが変わるか invalidate() を呼ぶまで見つかりません。
+    """
+
+    def __init__(self):
+        self._folders = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def find_clip(self, folder, clip_name, recursive=False):
+        """
+        クリップ名で MediaPoolItem を検索
+
+        Args:
+            folder: 検索を開始するメディアプールフォルダ
+            clip_name: 検索するクリップ名 ('Clip Name' と完全一致)
+            recursive: Trueの場合、GetSubFolderList() でサブフォルダも検索
+
+        Returns:
+            見つかった MediaPoolItem（見つからない場合はNone）
+        """
+        with self._lock:
+            pending = [folder]
+            while pending:
+                current = pending.pop(0)
+                clip = self._find_in_folder(current, clip_name)
+                if clip is not None:
+                    self.hits += 1
+                    return clip
+                if recursive:
+                    pending.extend(current.GetSubFolderList() or [])
+            self.misses += 1
+            return None
+
+    def find_clips(self, folder, clip_names, recursive=False):
+        """
+        複数のクリップ名をまとめて検索（各フォルダの GetClipList() は1回だけ呼び出す）
+
+        Args:
+            folder: 検索を開始するメディアプールフォルダ
+            clip_names: 検索するクリップ名
+            recursive: Trueの場合、GetSubFolderList() でサブフォルダも検索
+
+        Returns:
+            {クリップ名: MediaPoolItem}（見つからないクリップ名は含まない）
+        """
+        remaining = set(clip_names)
+        found = {}
+        with self._lock:
+            pending = [folder]
+            while pending and remaining:
+                current = pending.pop(0)
+                folder_id = current.GetUniqueId()
+                clip_list = current.GetClipList() or []
+                signature = folder_signature(clip_list)
+                entry = self._folders.get(folder_id)
+                rebuilt = entry is None or entry.signature != signature
+                if rebuilt:
+                    entry = self._build(folder_id, clip_list, signature)
+                hits = {name: entry.clips_by_name[name] for name in remaining if name in entry.clips_by_name}
+                # クリップ数が変わらないリネームを検出するため、ヒットしたものを再確認し、
+                # 見つからない名前があればシグネチャごとに1回だけ再構築
+                if not rebuilt and ((len(hits) < len(remaining) and not entry.rescanned) or any(
+                        clip.GetClipProperty('Clip Name') != name for name, clip in hits.items())):
+                    entry = self._build(folder_id, clip_list, signature, rescanned=True)
+                    hits = {name: entry.clips_by_name[name] for name in remaining if name in entry.clips_by_name}
+                found.update(hits)
+                remaining.difference_update(hits)
+                if recursive and remaining:
+                    pending.extend(current.GetSubFolderList() or [])
+            self.hits += len(found)
+            self.misses += len(remaining)
+        return found
+
+    def invalidate(self, folder=None):
+        """
+        インデックスを破棄
+
+        Args:
+            folder: 対象フォルダ（Noneの場合はすべてのフォルダ）
+        """
+        with self._lock:
+            if folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(folder.GetUniqueId(), None)
+
+    def stats(self):
+        """
+        ヒット/ミス数などの統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "folders": len(self._folders),
+                "clips": sum(len(e.clips_by_name) for e in self._folders.values()),
+            }
+
+    def _find_in_folder(self, folder, clip_name):
+        folder_id = folder.GetUniqueId()
+        clip_list = folder.GetClipList() or []
+        signature = folder_signature(clip_list)
+
+        entry = self._folders.get(folder_id)
+        if entry is None or entry.signature != signature:
+            entry = self._build(folder_id, clip_list, signature)
+            return entry.clips_by_name.get(clip_name)
+
+        # クリップ数が変わらないリネームはシグネチャに現れないため、ヒットした1件を再確認し、
+        # 見つからない場合も（別のクリップがこの名前にリネームされた可能性があるため）シグネチャごとに1回だけ再構築
+        clip = entry.clips_by_name.get(clip_name)
+        if clip is None:
+            if entry.rescanned:
+                return None
+        elif clip.GetClipProperty('Clip Name') == clip_name:
+            return clip
+        entry = self._build(folder_id, clip_list, signature, rescanned=True)
+        return entry.clips_by_name.get(clip_name)
+
+    def _build(self, folder_id, clip_list, signature, rescanned=False):
+        clips_by_name = {}
+        for clip in clip_list:
+            # 同名クリップは従来の線形検索と同じく先頭のものを優先
+            clips_by_name.setdefault(clip.GetClipProperty('Clip Name'), clip)
+        entry = _FolderEntry(signature, clips_by_name, rescanned)
+        self._folders[folder_id] = entry
+        self.rebuilds += 1
+        return entry
+
+
+def folder_signature(clip_list):
+    """
+    フォルダのシグネチャ（クリップ数, 先頭クリップID, 末尾クリップID）を作成
+
+    Args:
+        clip_list: GetClipList() の結果
+
+    Returns:
+        シグネチャのタプル
+    """
+    if not clip_list:
+        return (0, None, None)
+    return (len(clip_list), clip_list[0].GetUniqueId(), clip_list[-1].GetUniqueId())
+
+
+# すべてのツールで共有するインデックス
+clip_index = ClipIndex()
+
+
+def get_clip_index():
+    """
+    共有のクリップ名インデックスを取得
+
+    Returns:
+        ClipIndexインスタンス
+    """
+    return clip_index
@@ -0,0 +1,245 @@
+"""
+DaVinci Resolve メディアプール関連のツール
+"""
+
+import asyncio
+
+from fastmcp import Context
+
+from .base import get_resolve_instance, invalidates
+from .clip_search_index import get_clip_search_index, parse_query
+from .executor import ResolveBusyError, call_resolve
+from .media_import_index import DEFAULT_MEDIA_EXTENSIONS, get_import_index, scan_media_files
+
+# ImportMedia() 1回あたりの既定のファイル数
+DEFAULT_IMPORT_BATCH_SIZE = 200
+
+# search_clips が返すクリップ数の上限
+MAX_SEARCH_RESULTS = 500
+
+
+def _import_batch(ctx, batch, project_id):
+    """
+    1バッチ分のファイルを ImportMedia() で取り込む（エグゼキュータ上で実行）
+
+    Args:
+        ctx: ResolveContext
+        batch: [(パス, サイズ, 更新時刻ns)]
+        project_id: 取り込み開始時のプロジェクトの GetUniqueId()
+
+    Returns:
+        [(パス, サイズ, 更新時刻ns, メディアID)] のリスト、またはエラーメッセージ
+    """
+    if ctx.project_id != project_id:
+        return "Error: The current project changed during import"
+    media_pool = ctx.media_pool
+
+    items = media_pool.ImportMedia([path for path, _, _ in batch]) or []
+    if len(items) == len(batch):
+        # すべて取り込めた場合は入力と同じ順序で返される
+        return [(path, size, mtime, item.GetMediaId()) for (path, size, mtime), item in zip(batch, items)]
+
+    # 一部が取り込めなかった場合はファイルパスで対応付ける
+    files = {path: (size, mtime) for path, size, mtime in batch}
+    imported = []
+    for item in items:
+        path = item.GetClipProperty("File Path")
+        if path in files:
+            imported.append((path, *files[path], item.GetMediaId()))
+    return imported
+
+
+def _read_media_ids(ctx, project_id, folder):
+    """
+    1フォルダ分のクリップのメディアIDとサブフォルダを読む（エグゼキュータ上で実行）
+
+    Args:
+        ctx: ResolveContext
+        project_id: 取り込み開始時のプロジェクトの GetUniqueId()
+        folder: 読むフォルダ（Noneの場合はルートフォルダ）
+
+    Returns:
+        (GetMediaId() の集合, サブフォルダのリスト) のタプル、またはエラーメッセージ
+    """
+    if ctx.project_id != project_id:
+        return "Error: The current project changed during import"
+    if folder is None:
+        folder = ctx.media_pool.GetRootFolder()
+    media_ids = {clip.GetMediaId() for clip in folder.GetClipList() or []}
+    return media_ids, folder.GetSubFolderList() or []
+
+
+async def _pool_media_ids(project_id):
+    """
+    メディアプールのすべてのクリップのメディアIDを読む
+
+    他のツールの呼び出しが割り込めるよう、フォルダ1つごとにエグゼキュータへ積みます。
+
+    Args:
+        project_id: 取り込み開始時のプロジェクトの GetUniqueId()
+
+    Returns:
+        GetMediaId() の集合、またはエラーメッセージ
+    """
+    media_ids = set()
+    pending = [None]
+    while pending:
+        result = await call_resolve(_read_media_ids, project_id, pending.pop())
+        if isinstance(result, str):
+            return result
+        folder_ids, subfolders = result
+        media_ids.update(folder_ids)
+        pending.extend(subfolders)
+    return media_ids
+
+
+def register_media_pool_tools(mcp):
+    """
+    メディアプール関連ツールをMCPサーバーに登録
+
+    Args:
+        mcp: FastMCPインスタンス
+    """
+
+    @mcp.resource("davinci://stats/import-index")
+    def import_index_stats() -> dict:
+        """Location and size of the persistent index of already imported media files"""
+        return get_import_index().stats()
+
+    @mcp.resource("davinci://stats/clip-search")
+    def clip_search_stats() -> dict:
+        """Size, age and refresh counters of the media pool clip search index"""
+        return get_clip_search_index().stats()
+
+    @mcp.tool()
+    @invalidates("folder")
+    async def import_media(
+        paths: list[str],
+        context: Context,
+        extensions: list[str] | None = None,
+        recursive: bool = True,
+        skip_imported: bool = True,
+        batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+    ) -> str:
+        """
+        Import media files from directories (e.g. camera cards or shoot folders) into
+        the current media pool folder. Directories are scanned in parallel, files are
+        filtered by extension, and files already imported into this project (same path,
+        size and modification time, and the clip is still in the media pool) are skipped.
+        Sends MCP progress notifications per batch.
+
+        Args:
+            paths: Directories and/or files to import
+            extensions: File extensions to include, e.g. [".mov", ".wav"] (common video, image and audio formats if omitted)
+            recursive: Also scan subdirectories (default: True)
+            skip_imported: Skip files recorded as already imported into this project (default: True)
+            batch_size: Number of files per ImportMedia call (default: 200)
+        """
+        if batch_size <= 0:
+            return "Error: batch_size must be a positive integer"
+
+        files, errors = await asyncio.to_thread(
+            scan_media_files, paths, extensions or DEFAULT_MEDIA_EXTENSIONS, recursive)
+        error_text = f" ({len(errors)} paths could not be read, first: {errors[0]})" if errors else ""
+        if not files:
+            return f"No media files found{error_text}"
+
+        def get_project_id(ctx):
+            if not ctx.project:
+                return "No project is currently open"
+            return (ctx.project_id,)
+
+        result = await call_resolve(get_project_id)
+        if isinstance(result, str):
+            return result
+        project_id, = result
+
+        index = get_import_index()
+        try:
+            new_files = files
+            if skip_imported:
+                new_files = index.filter_new(project_id, files)
+                if len(new_files) < len(files):
+                    # 記録上は取り込み済みのファイルがある場合だけ、クリップがメディアプールに残っているか確かめる
+                    media_ids = await _pool_media_ids(project_id)
+                    if isinstance(media_ids, str):
+                        return media_ids
+                    new_files = index.filter_new(project_id, files, media_ids)
+            skipped = len(files) - len(new_files)
+            if not new_files:
+                return f"All {len(files)} media files are already imported; nothing to do{error_text}"
+
+            imported_count = 0
+            for offset in range(0, len(new_files), batch_size):
+                batch = new_files[offset:offset + batch_size]
+                try:
+                    imported = await call_resolve(_import_batch, batch, project_id)
+                except ResolveBusyError as e:
+                    # 取り込み済みの件数を返すため、"Resolve busy" の結果にはしない
+                    imported = f"Resolve is busy: {e}"
+                if isinstance(imported, str):
+                    return (f"{imported} after importing {imported_count} of {len(new_files)} files "
+                            f"({skipped} already imported){error_text}")
+
+                index.record(project_id, imported)
+                imported_count += len(imported)
+                if imported:
+                    get_clip_search_index().request_refresh()
+                done = offset + len(batch)
+                await context.report_progress(done, len(new_files), f"Imported {imported_count} of {len(new_files)} files")
+        finally:
+            # 途中で失敗した場合も取り込めた分は記録に残す（保存はツールの呼び出しごとに1回）
+            await asyncio.to_thread(index.save)
+
+        failed = len(new_files) - imported_count
+        message = f"Imported {imported_count} of {len(new_files)} new media files ({skipped} already imported"
+        if failed:
+            message += f", {failed} failed to import"
+        return message + f"){error_text}"
+
+    @mcp.tool()
+    async def search_clips(query: str = "", limit: int = 50, refresh: bool = False) -> dict:
+        """
+        Search clips in every folder of the media pool by name, reel, codec, resolution,
+        duration, keywords and metadata. Searches an index built in the background, so
+        queries return immediately without reading each clip from Resolve.
+
+        Query syntax (all conditions must match, separated by commas or spaces):
+        - words match any field by prefix: "interview", "pro" (matches ProRes)
+        - field:word limits the match to one field: "codec:prores", "reel:a001", "name:take",
+          or any clip property / metadata name such as "camera:a", "scene:12"
+        - comparisons on duration (seconds, or with s/m/h), fps, width, height, frames:
+          "> 10s", "duration<2m", "fps>=50", "width>=3840"
+        - resolution shorthands: 4K, UHD, 6K, 8K, HD, 1080p, 720p, 2160p
+        Example: "ProRes, 4K, > 10s"
+
+        Args:
+            query: Search query (empty returns all clips)
+            limit: Maximum number of clips to return (default: 50, max: 500)
+            refresh: Re-read every folder from Resolve before searching (default: False)
+
+        Returns:
+            Number of matching clips and the first `limit` clips with their folder path
+        """
+        if not 1 <= limit <= MAX_SEARCH_RESULTS:
+            return {"error": f"limit must be between 1 and {MAX_SEARCH_RESULTS}"}
+        try:
+            terms = parse_query(query)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        if get_resolve_instance() is None:
+            return {"error": "No Resolve instance available"}
+        search_index = get_clip_search_index()
+        await search_index.ensure_ready(refresh)
+        if search_index.project_id is None:
+            return {"error": "No project is currently open"}
+
+        total, clips = search_index.search(terms, limit)
+        stats = search_index.stats()
+        return {
+            "query": query,
+            "total": total,
+            "clips": clips,
+            "index": {key: stats[key] for key in ("clips", "folders", "age_seconds", "refreshing")},
+        }
@@ -0,0 +1,344 @@
+"""
+ツール呼び出しとResolve API呼び出しのレイテンシ計測
+
+- InstrumentedProxy: set_resolve_instance() に渡されたResolveインスタンスを包み、
+  メソッド呼び出しを「クラス名.メソッド名」単位で計測する透過プロキシ
+- ToolTimingMiddleware: register_tools() で登録されたすべてのツールの実行時間を計測
+- MetricsRegistry: 計測値をヒストグラムとして保持し、JSON/Prometheus形式で出力
+- CallCounter: 1つのツールの中で呼び出したResolve APIの回数を数える（スレッドごと）
+"""
+
+import bisect
+import threading
+import time
+
+from fastmcp.server.middleware import Middleware
+
+# ヒストグラムのバケット境界(秒)
+BUCKET_BOUNDS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# メソッドの戻り値がどのクラスのオブジェクトかの対応表（プロキシのクラス名に使用）
+RETURN_CLASSES = {
+    "GetProjectManager": "ProjectManager",
+    "GetMediaStorage": "MediaStorage",
+    "GetCurrentProject": "Project",
+    "LoadProject": "Project",
+    "CreateProject": "Project",
+    "GetMediaPool": "MediaPool",
+    "GetGallery": "Gallery",
+    "GetRootFolder": "Folder",
+    "GetCurrentFolder": "Folder",
+    "AddSubFolder": "Folder",
+    "GetSubFolderList": "Folder",
+    "GetCurrentTimeline": "Timeline",
+    "GetTimelineByIndex": "Timeline",
+    "CreateEmptyTimeline": "Timeline",
+    "CreateTimelineFromClips": "Timeline",
+    "ImportTimelineFromFile": "Timeline",
+    "DuplicateTimeline": "Timeline",
+    "GetClipList": "MediaPoolItem",
+    "GetSelectedClips": "MediaPoolItem",
+    "ImportMedia": "MediaPoolItem",
+    "AddItemListToMediaPool": "MediaPoolItem",
+    "GetMediaPoolItem": "MediaPoolItem",
+    "GetItemListInTrack": "TimelineItem",
+    "AppendToTimeline": "TimelineItem",
+    "GetCurrentVideoItem": "TimelineItem",
+    "GetLinkedItems": "TimelineItem",
+    "GetNodeGraph": "Graph",
+}
+
+_PLAIN_TYPES = (str, bytes, int, float, bool, dict, type(None))
+
+
+class Histogram:
+    """固定バケットのレイテンシヒストグラム"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """バケットの上限値による分位点の概算(秒)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.buckets):
+            cumulative += n
+            if cumulative >= rank:
+                return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "total_ms": round(self.total * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """ツール単位・Resolve API単位のヒストグラムを保持するレジストリ"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = {}
+        self._resolve_calls = {}
+
+    def observe_tool(self, tool_name, seconds, error=False):
+        with self._lock:
+            self._tools.setdefault(tool_name, Histogram()).observe(seconds, error)
+
+    def observe_resolve_call(self, class_name, method_name, seconds, error=False):
+        with self._lock:
+            key = (class_name, method_name)
+            self._resolve_calls.setdefault(key, Histogram()).observe(seconds, error)
+
+    def reset(self):
+        with self._lock:
+            self._tools.clear()
+            self._resolve_calls.clear()
+
+    def snapshot(self):
+        """
+        計測値の要約を取得
+
+        Returns:
+            ツール名/「クラス名.メソッド名」ごとの要約。Resolve APIは合計時間の降順
+        """
+        with self._lock:
+            resolve_calls = sorted(self._resolve_calls.items(), key=lambda kv: kv[1].total, reverse=True)
+            return {
+                "tools": {name: h.summary() for name, h in sorted(self._tools.items())},
+                "resolve_calls": {f"{c}.{m}": h.summary() for (c, m), h in resolve_calls},
+            }
+
+    def prometheus_text(self, gauges=None):
+        """
+        Prometheusのテキスト形式で出力
+
+        Args:
+            gauges: 追加で出力するゲージ {メトリクス名: 値}
+
+        Returns:
+            テキスト形式のメトリクス
+        """
+        lines = []
+        with self._lock:
+            _append_histograms(lines, "davinci_mcp_tool_duration_seconds",
+                               "Duration of MCP tool calls",
+                               [({"tool": name}, h) for name, h in sorted(self._tools.items())])
+            _append_histograms(lines, "davinci_mcp_resolve_call_duration_seconds",
+                               "Duration of DaVinci Resolve scripting API calls",
+                               [({"class": c, "method": m}, h) for (c, m), h in sorted(self._resolve_calls.items())])
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _append_histograms(lines, metric, help_text, series):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for labels, histogram in series:
+        label_text = _labels(labels)
+        cumulative = 0
+        for bound, n in zip(BUCKET_BOUNDS + (float("inf"),), histogram.buckets):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{metric}_bucket{{{label_text},le="{le}"}} {cumulative}')
+        lines.append(f"{metric}_sum{{{label_text}}} {histogram.total}")
+        lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+
+    errors_metric = metric.replace("_duration_seconds", "_errors_total")
+    lines.append(f"# HELP {errors_metric} Number of failed calls")
+    lines.append(f"# TYPE {errors_metric} counter")
+    for labels, histogram in series:
+        lines.append(f"{errors_metric}{{{_labels(labels)}}} {histogram.errors}")
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# スレッドごとの実行中の CallCounter
+_counters = threading.local()
+
+
+class CallCounter:
+    """
+    with ブロックの中でこのスレッドが呼び出したResolve APIの回数を数えるクラス
+
+    エグゼキュータのスレッドで使うため、同時に実行される他のツールの呼び出しは数えません。
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_counters, "current", None)
+        _counters.current = self
+        return self
+
+    def __exit__(self, *exc):
+        _counters.current = self._previous
+        if self._previous is not None:
+            self._previous.calls += self.calls
+
+
+class InstrumentedProxy:
+    """
+    Resolveオブジェクトの透過プロキシ
+
+    メソッド呼び出しの時間を計測し、戻り値のResolveオブジェクトも
+    同じくプロキシで包みます。Resolveに渡す引数に含まれるプロキシは
+    元のオブジェクトに戻してから呼び出します。
+    """
+
+    __slots__ = ("_target", "_class_name", "_metrics")
+
+    def __init__(self, target, class_name, metrics):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_class_name", class_name)
+        object.__setattr__(self, "_metrics", metrics)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        class_name = self._class_name
+        metrics = self._metrics
+
+        def timed_call(*args, **kwargs):
+            started = time.perf_counter()
+            error = True
+            try:
+                result = attr(*_unwrap(args), **_unwrap(kwargs))
+                error = False
+            finally:
+                metrics.observe_resolve_call(class_name, name, time.perf_counter() - started, error)
+                counter = getattr(_counters, "current", None)
+                if counter is not None:
+                    counter.calls += 1
+            return _wrap(result, RETURN_CLASSES.get(name, "Object"), metrics)
+
+        return timed_call
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __bool__(self):
+        return bool(self._target)
+
+    def __eq__(self, other):
+        return self._target == unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"<InstrumentedProxy {self._class_name} {self._target!r}>"
+
+
+def _wrap(value, class_name, metrics):
+    if isinstance(value, _PLAIN_TYPES) or isinstance(value, InstrumentedProxy):
+        return value
+    if isinstance(value, list):
+        return [_wrap(v, class_name, metrics) for v in value]
+    return InstrumentedProxy(value, class_name, metrics)
+
+
+def _unwrap(value):
+    if isinstance(value, InstrumentedProxy):
+        return object.__getattribute__(value, "_target")
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    return value
+
+
+def unwrap(value):
+    """
+    プロキシを取り除いた元のオブジェクトを取得
+
+    Args:
+        value: プロキシまたは任意の値（リスト/辞書の中のプロキシも対象）
+
+    Returns:
+        プロキシを取り除いた値
+    """
+    return _unwrap(value)
+
+
+def instrument(resolve, metrics=None):
+    """
+    Resolveインスタンスを計測用プロキシで包む
+
+    Args:
+        resolve: DaVinci Resolveインスタンス
+        metrics: 計測値の記録先（省略時は共有レジストリ）
+
+    Returns:
+        InstrumentedProxyインスタンス（resolveがNoneまたはプロキシ済みの場合はそのまま）
+    """
+    if resolve is None or isinstance(resolve, InstrumentedProxy):
+        return resolve
+    return InstrumentedProxy(resolve, "Resolve", metrics or metrics_registry)
+
+
+class ToolTimingMiddleware(Middleware):
+    """すべてのツール呼び出しの実行時間を計測するFastMCPミドルウェア"""
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics or metrics_registry
+
+    async def on_call_tool(self, context, call_next):
+        started = time.perf_counter()
+        error = True
+        try:
+            result = await call_next(context)
+            error = bool(getattr(result, "is_error", False))
+            return result
+        finally:
+            self.metrics.observe_tool(context.message.name, time.perf_counter() - started, error)
+
+
+# すべてのツールで共有するレジストリ
+metrics_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """
+    共有のメトリクスレジストリを取得
+
+    Returns:
+        MetricsRegistryインスタンス
+    """
+    return metrics_registry
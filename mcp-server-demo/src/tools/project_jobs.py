@@ -0,0 +1,361 @@
+"""
+プロジェクトの書き出し・取り込みなど時間のかかる処理をバックグラウンドで実行するジョブキュー
+
+ProjectManager.ExportProject や Folder.Export (DRB) は大きなプロジェクトでは数分戻りません。
+ツールはジョブをキューに積んでジョブIDをすぐに返し、処理はイベントループ上のタスクが
+接続のエグゼキュータで exclusive な呼び出しとして実行します。実行中に来た他のツールの
+呼び出しは待たずに "Resolve busy" の結果になり、他の接続やResolveを使わない処理は通常どおり動きます。
+
+- 同時に実行するジョブは全体で max_running 件まで、1つの接続では1件まで（残りは順番待ち）
+- 順番待ちのジョブは取り消せる。実行中の呼び出しはResolveに中断の手段がないため、
+  複数のステップ（ファイル）からなるジョブだけが次のステップの前で止まる
+- ステップの間に断られた呼び出しがあれば、次のステップの前に少し待って他の呼び出しを通す
+- ジョブの一覧は接続やMCPセッションに依存しないモジュールのシングルトンに保持するため、
+  クライアントや接続が切り替わっても同じジョブIDで状態を読める（読むときにResolveへの問い合わせはない）
+"""
+
+import asyncio
+import itertools
+import os
+import time
+
+from .base import get_tool_cache
+from .executor import DEFAULT_TARGET, EXCLUSIVE_RETRY_AFTER, ResolveBusyError
+from .resolve_pool import get_resolve_pool
+
+# 同時に実行するジョブの上限（接続ごとには常に1件）
+PROJECT_JOBS_MAX_RUNNING = 2
+
+# 順番待ちにできるジョブの上限
+MAX_QUEUED_PROJECT_JOBS = 32
+
+# 保持する終了済みのジョブの上限（古いものから破棄する）
+MAX_FINISHED_PROJECT_JOBS = 100
+
+# ステップの間に、断った呼び出しを通すために待つ秒数
+PROJECT_JOB_STEP_GAP = EXCLUSIVE_RETRY_AFTER
+
+# これ以上状態が変わらないジョブの状態
+FINISHED_JOB_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobStep:
+    """
+    ジョブの1ステップ（1回のエグゼキュータ呼び出し）
+
+    Args:
+        label: 状態に表示する説明（例: ファイル名）
+        func: func(context, *args) の形で呼び出される関数。成功した場合は結果の辞書、
+              失敗した場合はエラーメッセージを返す
+        *args: 追加の引数
+    """
+
+    def __init__(self, label, func, *args):
+        self.label = label
+        self.func = func
+        self.args = args
+
+
+class ProjectJob:
+    """キューに積まれたジョブ1件分の状態"""
+
+    def __init__(self, job_id, kind, description, steps, target=DEFAULT_TARGET, output_path=None,
+                 invalidates=()):
+        self.job_id = job_id
+        self.kind = kind
+        self.description = description
+        self.steps = steps
+        self.target = target
+        self.output_path = output_path
+        self.invalidates = invalidates
+        self.status = "queued"
+        self.current_step = None
+        self.results = []
+        self.error = None
+        self.cancel_requested = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_JOB_STATUSES
+
+    @property
+    def failed_steps(self):
+        return sum(1 for result in self.results if "error" in result)
+
+    def elapsed(self):
+        """実行を始めてからの秒数（未開始の場合はNone）"""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def output_bytes(self):
+        """書き出し先のファイルの現在のサイズ（書き出し中の進捗の目安。ない場合はNone）"""
+        if not self.output_path:
+            return None
+        try:
+            return os.path.getsize(self.output_path) if os.path.isfile(self.output_path) else None
+        except OSError:
+            return None
+
+    def to_dict(self):
+        elapsed = self.elapsed()
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "description": self.description,
+            "target": self.target,
+            "status": self.status,
+            "steps_done": len(self.results),
+            "steps_total": len(self.steps),
+            "failed_steps": self.failed_steps,
+            "current_step": self.current_step,
+            "output_path": self.output_path,
+            "output_bytes": self.output_bytes(),
+            "cancel_requested": self.cancel_requested,
+            "error": self.error,
+            "results": self.results,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+        }
+
+
+class ProjectJobQueue:
+    """
+    プロジェクト関連の長い処理のジョブキュー
+
+    Args:
+        max_running: 同時に実行するジョブの上限
+        max_queued: 順番待ちにできるジョブの上限
+        max_finished: 保持する終了済みのジョブの上限
+    """
+
+    def __init__(self, max_running=PROJECT_JOBS_MAX_RUNNING, max_queued=MAX_QUEUED_PROJECT_JOBS,
+                 max_finished=MAX_FINISHED_PROJECT_JOBS):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.submitted = 0
+        self.rejected = 0
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._tasks = set()
+        self._updated = None
+
+    def submit(self, kind, description, steps, target=DEFAULT_TARGET, output_path=None, invalidates=()):
+        """
+        ジョブをキューに積み、実行できる場合はすぐに開始する
+
+        Args:
+            kind: ジョブの種類（ツール名）
+            description: 状態と "Resolve busy" の結果に表示する説明（例: "exporting project 'A'"）
+            steps: JobStep のリスト
+            target: 実行する接続名
+            output_path: 書き出し先のファイル（サイズを進捗の目安として表示する）
+            invalidates: 終了時に破棄するツール結果キャッシュのスコープ
+
+        Returns:
+            ProjectJobインスタンス
+
+        Raises:
+            ValueError: 順番待ちのジョブが上限に達している場合
+        """
+        if sum(1 for job in self._jobs.values() if job.status == "queued") >= self.max_queued:
+            self.rejected += 1
+            raise ValueError(f"The project job queue is full ({self.max_queued} queued jobs); "
+                             "wait for running jobs to finish or cancel some")
+        job = ProjectJob(f"job-{next(self._ids)}", kind, description, steps, target, output_path, invalidates)
+        self._jobs[job.job_id] = job
+        self.submitted += 1
+        self._trim()
+        self._dispatch()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def active_count(self, target):
+        """接続で順番待ちまたは実行中のジョブ数"""
+        return sum(1 for job in self._jobs.values() if job.target == target and not job.finished)
+
+    def queue_position(self, job):
+        """順番待ちのジョブの順番（1から。順番待ちでない場合はNone）"""
+        if job.status != "queued":
+            return None
+        queued = [j for j in self._jobs.values() if j.status == "queued"]
+        return queued.index(job) + 1
+
+    def cancel(self, job_id):
+        """
+        ジョブを取り消す
+
+        順番待ちのジョブはすぐに取り消し、実行中のジョブは次のステップの前で止める。
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            結果のメッセージ
+
+        Raises:
+            ValueError: ジョブが見つからない場合
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown project job '{job_id}'")
+        if job.finished:
+            return f"Project job '{job_id}' already {job.status}"
+        job.cancel_requested = True
+        if job.status == "queued":
+            self._finish(job, "cancelled")
+            self._dispatch()
+            return f"Project job '{job_id}' cancelled before it started"
+        remaining = len(job.steps) - len(job.results) - 1
+        if remaining > 0:
+            return (f"Project job '{job_id}' will stop after the current step "
+                    f"({remaining} remaining step(s) will be skipped)")
+        return (f"Project job '{job_id}' is in its last step, which Resolve cannot interrupt; "
+                "it will finish but is marked as cancel requested")
+
+    async def wait_for_update(self, timeout):
+        """
+        いずれかのジョブの状態が変わるまで待つ
+
+        Args:
+            timeout: 待ち時間の上限(秒)
+
+        Returns:
+            更新があった場合はTrue、タイムアウトした場合はFalse
+        """
+        event = self._update_event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self):
+        counts = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "jobs": counts,
+        }
+
+    def _update_event(self):
+        # イベントは作成したイベントループに紐づくため、ループごとに作り直す
+        loop = asyncio.get_running_loop()
+        if self._updated is None or self._updated[0] is not loop:
+            self._updated = (loop, asyncio.Event())
+        return self._updated[1]
+
+    def _notify(self):
+        event = self._update_event()
+        self._updated = (self._updated[0], asyncio.Event())
+        event.set()
+
+    def _dispatch(self):
+        running = [job for job in self._jobs.values() if job.status == "running"]
+        busy_targets = {job.target for job in running}
+        loop = asyncio.get_running_loop()
+        for job in list(self._jobs.values()):
+            if len(running) >= self.max_running:
+                break
+            if job.status != "queued" or job.target in busy_targets:
+                continue
+            job.status = "running"
+            job.started_at = time.time()
+            running.append(job)
+            busy_targets.add(job.target)
+            task = loop.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._notify()
+
+    async def _run(self, job):
+        try:
+            try:
+                connection = get_resolve_pool().select(job.target)
+                connected = await connection.ensure_connected()
+            except (ValueError, ResolveBusyError) as e:
+                job.error = str(e)
+                self._finish(job, "failed")
+                return
+            if not connected:
+                job.error = f"No Resolve instance available for target '{job.target}'"
+                self._finish(job, "failed")
+                return
+
+            executor = connection.executor
+            rejected = executor.exclusive_rejected
+            for index, step in enumerate(job.steps):
+                if job.cancel_requested:
+                    self._finish(job, "cancelled")
+                    return
+                if index and executor.exclusive_rejected != rejected:
+                    # 前のステップの間に断った呼び出しが再試行できるよう、少し空ける
+                    await asyncio.sleep(PROJECT_JOB_STEP_GAP)
+                rejected = executor.exclusive_rejected
+                job.current_step = step.label
+                self._notify()
+                try:
+                    outcome = await executor.call(step.func, *step.args, timeout=None,
+                                                  exclusive=f"{job.description} (project job {job.job_id})")
+                except ResolveBusyError as e:
+                    outcome = f"Resolve is busy: {e}"
+                except Exception as e:
+                    outcome = f"{type(e).__name__}: {e}"
+                if isinstance(outcome, str):
+                    job.results.append({"step": step.label, "error": outcome})
+                else:
+                    job.results.append({"step": step.label, **(outcome or {})})
+                self._notify()
+
+            failed = job.failed_steps
+            if failed:
+                job.error = (job.results[-1]["error"] if len(job.results) == 1
+                             else f"{failed} of {len(job.results)} steps failed")
+            self._finish(job, "failed" if failed == len(job.results) else "completed")
+        finally:
+            if not job.finished:
+                self._finish(job, "failed")
+            # 取り込みなどで変わった可能性があるため、ステップの成否にかかわらず破棄する
+            for scope in job.invalidates:
+                get_tool_cache().invalidate(scope)
+            self._dispatch()
+
+    def _finish(self, job, status):
+        job.status = status
+        job.current_step = None
+        job.finished_at = time.time()
+        self._notify()
+
+    def _trim(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.job_id]
+
+
+# すべてのツールで共有するジョブキュー
+project_jobs = ProjectJobQueue()
+
+
+def get_project_jobs():
+    """
+    共有のプロジェクトジョブキューを取得
+
+    Returns:
+        ProjectJobQueueインスタンス
+    """
+    return project_jobs
@@ -1,8 +1,143 @@
 """
 DaVinci Resolve プロジェクト関連のツール
+
+プロジェクトの書き出し・アーカイブ・取り込み、DRBの書き出し・取り込み、タイムラインファイルの
+取り込みは数分かかることがあるため、ジョブキュー (project_jobs) に積んでジョブIDをすぐに返します。
+状態の確認や完了待ちはジョブキューの状態を読むだけで、Resolveへの問い合わせはありません。
 """
 
-from .base import get_resolve_instance
+import os
+import time
+
+from fastmcp import Context
+
+from .base import cached
+from .executor import call_resolve
+from .project_jobs import JobStep, get_project_jobs
+from .resolve_pool import get_resolve_pool
+
+# get_project_name の結果を保持する秒数（Resolve上でプロジェクトを切り替えた場合の古さの上限）
+PROJECT_NAME_CACHE_TTL = 2.0
+
+# 接続を選ぶときに、未完了のジョブ1件を処理待ちの呼び出し何件分とみなすか
+PROJECT_JOB_LOAD = 10
+
+# wait_for_project_job が書き出し中のファイルサイズを確認し直す間隔(秒)
+PROJECT_JOB_PROGRESS_INTERVAL = 2.0
+
+
+def _export_project(ctx, project_name, file_path, with_stills_and_luts):
+    """ProjectManager.ExportProject（エグゼキュータ上で実行）"""
+    if not ctx.project_manager.ExportProject(project_name, file_path, with_stills_and_luts):
+        return f"Failed to export project '{project_name}' (does it exist in the current project folder?)"
+    return {"file_path": file_path}
+
+
+def _archive_project(ctx, project_name, file_path, source_media, render_cache, proxy_media):
+    """ProjectManager.ArchiveProject（エグゼキュータ上で実行）"""
+    if not ctx.project_manager.ArchiveProject(project_name, file_path, source_media, render_cache, proxy_media):
+        return f"Failed to archive project '{project_name}'"
+    return {"file_path": file_path}
+
+
+def _import_project(ctx, file_path, project_name):
+    """ProjectManager.ImportProject（エグゼキュータ上で実行）"""
+    if not ctx.project_manager.ImportProject(file_path, project_name):
+        return f"Failed to import project from {file_path}"
+    return {"project": project_name or os.path.splitext(os.path.basename(file_path))[0]}
+
+
+def _find_folder(media_pool, folder_path):
+    """
+    "Master/Footage/Day 1" 形式のパスでメディアプールのフォルダを探す（先頭のルートフォルダ名は省略可）
+
+    Returns:
+        Folder（見つからない場合はNone）
+    """
+    folder = media_pool.GetRootFolder()
+    names = [name for name in folder_path.replace("\\", "/").split("/") if name]
+    if names and names[0] == folder.GetName():
+        names = names[1:]
+    for name in names:
+        folder = next((sub for sub in folder.GetSubFolderList() or [] if sub.GetName() == name), None)
+        if folder is None:
+            return None
+    return folder
+
+
+def _export_folder(ctx, folder_path, file_path):
+    """Folder.Export（DRB、エグゼキュータ上で実行）"""
+    media_pool = ctx.media_pool
+    if not media_pool:
+        return "No project is currently open"
+    folder = _find_folder(media_pool, folder_path)
+    if folder is None:
+        return f"Media pool folder '{folder_path}' not found"
+    if not folder.Export(file_path):
+        return f"Failed to export folder '{folder_path}' to {file_path}"
+    return {"file_path": file_path}
+
+
+def _import_folder(ctx, file_path, source_clips_path):
+    """MediaPool.ImportFolderFromFile（DRB、エグゼキュータ上で実行）"""
+    media_pool = ctx.media_pool
+    if not media_pool:
+        return "No project is currently open"
+    if not media_pool.ImportFolderFromFile(file_path, source_clips_path):
+        return f"Failed to import folder from {file_path}"
+    return {}
+
+
+def _import_timeline(ctx, file_path, options):
+    """MediaPool.ImportTimelineFromFile（エグゼキュータ上で実行）"""
+    media_pool = ctx.media_pool
+    if not media_pool:
+        return "No project is currently open"
+    timeline = media_pool.ImportTimelineFromFile(file_path, options)
+    if not timeline:
+        return f"Failed to import a timeline from {file_path}"
+    return {"timeline": timeline.GetName()}
+
+
+def _format_job(job):
+    """ProjectJob を1行の文字列に整形"""
+    text = f"Project job '{job.job_id}' ({job.kind}): {job.status}"
+    if job.status == "queued":
+        text += f" (position {get_project_jobs().queue_position(job)})"
+    if len(job.steps) > 1:
+        text += f", {len(job.results)}/{len(job.steps)} steps"
+    elapsed = job.elapsed()
+    if elapsed is not None:
+        text += f", {elapsed:.1f}s"
+    written = job.output_bytes()
+    if written is not None:
+        text += f", {written / 1e6:.1f} MB written"
+    text += f" - {job.description}"
+    if job.current_step and len(job.steps) > 1:
+        text += f" (now: {job.current_step})"
+    if job.error:
+        text += f"; error: {job.error}"
+    if job.cancel_requested and job.status == "running":
+        text += "; cancel requested"
+    return text
+
+
+def _output_dir_error(file_path):
+    directory = os.path.dirname(os.path.abspath(file_path))
+    if not os.path.isdir(directory):
+        return f"Error: Output directory does not exist: {directory}"
+    return None
+
+
+def _submit(kind, description, steps, target, output_path=None, invalidates=()):
+    # "auto" はここで接続名に解決する（接続ごとに1件ずつ実行するため）
+    jobs = get_project_jobs()
+    try:
+        connection = get_resolve_pool().select(target, load=lambda c: jobs.active_count(c.name) * PROJECT_JOB_LOAD)
+        job = jobs.submit(kind, description, steps, connection.name, output_path, invalidates)
+    except ValueError as e:
+        return f"Error: {e}"
+    return f"{_format_job(job)}. Track it with get_project_job_status or wait_for_project_job"
 
 
 def register_project_tools(mcp):
@@ -14,14 +149,245 @@ def register_project_tools(mcp):
     """
 
     @mcp.tool()
-    def get_project_name() -> str:
-        """Get current DaVinci Resolve project name"""
-        resolve = get_resolve_instance()
-        if resolve is None:
-            return "No Resolve instance available"
+    @cached("project", ttl=PROJECT_NAME_CACHE_TTL)
+    async def get_project_name(target: str | None = None) -> str:
+        """
+        Get current DaVinci Resolve project name
+        
+        Args:
+            target: Resolve instance to ask when several are connected (a name from
+                    davinci://resolve/targets, or "auto"; default instance if omitted)
+        """
+        def get_name(ctx):
+            current_project = ctx.project
+            if current_project:
+                return current_project.GetName()
+            return "No project opened"
         
-        project_manager = resolve.GetProjectManager()
-        current_project = project_manager.GetCurrentProject()
-        if current_project:
-            return current_project.GetName()
-        return "No project opened"
+        return await call_resolve(get_name, target=target)
+
+    @mcp.resource("davinci://project/jobs")
+    def project_jobs() -> dict:
+        """Status of all background project jobs (export/archive/import) and the job queue"""
+        jobs = get_project_jobs()
+        return {
+            "queue": jobs.stats(),
+            "jobs": [job.to_dict() for job in jobs.jobs()],
+        }
+
+    @mcp.resource("davinci://project/jobs/{job_id}")
+    def project_job(job_id: str) -> dict:
+        """Status of a single background project job"""
+        job = get_project_jobs().get(job_id)
+        if job is None:
+            return {"job_id": job_id, "error": "Unknown project job"}
+        return job.to_dict()
+
+    @mcp.tool()
+    async def export_project(
+        project_name: str,
+        file_path: str,
+        with_stills_and_luts: bool = True,
+        target: str | None = None,
+    ) -> str:
+        """
+        Export a project to a .drp file in the background.
+        Returns immediately with a job id; while the export runs, other tools that need the same
+        Resolve instance return a "Resolve busy" result instead of hanging.
+
+        Args:
+            project_name: Project in the current project manager folder
+            file_path: Destination .drp file
+            with_stills_and_luts: Include stills and LUTs (default: True)
+            target: Resolve instance to use when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        """
+        error = _output_dir_error(file_path)
+        if error:
+            return error
+        return _submit("export_project", f"exporting project '{project_name}' to {file_path}",
+                       [JobStep(project_name, _export_project, project_name, file_path, with_stills_and_luts)],
+                       target, output_path=file_path)
+
+    @mcp.tool()
+    async def archive_project(
+        project_name: str,
+        file_path: str,
+        archive_source_media: bool = True,
+        archive_render_cache: bool = True,
+        archive_proxy_media: bool = False,
+        target: str | None = None,
+    ) -> str:
+        """
+        Archive a project (optionally with its media) to a .dra folder in the background.
+        Returns immediately with a job id.
+
+        Args:
+            project_name: Project in the current project manager folder
+            file_path: Destination archive path
+            archive_source_media: Copy the source media (default: True)
+            archive_render_cache: Copy the render cache (default: True)
+            archive_proxy_media: Copy proxy media (default: False)
+            target: Resolve instance to use when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        """
+        error = _output_dir_error(file_path)
+        if error:
+            return error
+        return _submit("archive_project", f"archiving project '{project_name}' to {file_path}",
+                       [JobStep(project_name, _archive_project, project_name, file_path, archive_source_media,
+                                archive_render_cache, archive_proxy_media)],
+                       target)
+
+    @mcp.tool()
+    async def import_project(file_path: str, project_name: str | None = None, target: str | None = None) -> str:
+        """
+        Import a project from a .drp file in the background. Returns immediately with a job id.
+
+        Args:
+            file_path: Project file to import
+            project_name: Name for the imported project (the file's name if omitted)
+            target: Resolve instance to use when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        """
+        if not os.path.isfile(file_path):
+            return f"Error: File not found: {file_path}"
+        return _submit("import_project", f"importing project from {file_path}",
+                       [JobStep(os.path.basename(file_path), _import_project, file_path, project_name)],
+                       target, invalidates=("project",))
+
+    @mcp.tool()
+    async def export_folder_drb(folder_path: str, file_path: str, target: str | None = None) -> str:
+        """
+        Export a media pool folder of the current project to a .drb file in the background.
+        Returns immediately with a job id.
+
+        Args:
+            folder_path: Media pool folder, e.g. "Master/Footage" (the root folder name may be omitted)
+            file_path: Destination .drb file
+            target: Resolve instance to use when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        """
+        error = _output_dir_error(file_path)
+        if error:
+            return error
+        return _submit("export_folder_drb", f"exporting media pool folder '{folder_path}' to {file_path}",
+                       [JobStep(folder_path, _export_folder, folder_path, file_path)],
+                       target, output_path=file_path)
+
+    @mcp.tool()
+    async def import_folder_drb(file_path: str, source_clips_path: str = "", target: str | None = None) -> str:
+        """
+        Import a .drb folder into the media pool of the current project in the background.
+        Returns immediately with a job id.
+
+        Args:
+            file_path: .drb file to import
+            source_clips_path: Where to search for source clips whose original path is offline (optional)
+            target: Resolve instance to use when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        """
+        if not os.path.isfile(file_path):
+            return f"Error: File not found: {file_path}"
+        return _submit("import_folder_drb", f"importing media pool folder from {file_path}",
+                       [JobStep(os.path.basename(file_path), _import_folder, file_path, source_clips_path)],
+                       target, invalidates=("folder",))
+
+    @mcp.tool()
+    async def import_timeline_files(
+        file_paths: list[str],
+        import_source_clips: bool = True,
+        source_clips_path: str | None = None,
+        target: str | None = None,
+    ) -> str:
+        """
+        Import timelines from AAF/EDL/XML/FCPXML/DRT/ADL/OTIO files in the background, one file
+        per step. Returns immediately with a job id; cancelling stops before the next file.
+
+        Args:
+            file_paths: Timeline files to import (each becomes a timeline named after its file)
+            import_source_clips: Import the source clips into the media pool (default: True)
+            source_clips_path: Where to search for source clips whose original path is offline (optional)
+            target: Resolve instance to use when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        """
+        if not file_paths:
+            return "Error: file_paths is empty"
+        missing = [path for path in file_paths if not os.path.isfile(path)]
+        if missing:
+            return f"Error: Files not found: {', '.join(missing)}"
+        options = {"importSourceClips": import_source_clips}
+        if source_clips_path:
+            options["sourceClipsPath"] = source_clips_path
+        steps = [JobStep(os.path.basename(path), _import_timeline, path, options) for path in file_paths]
+        return _submit("import_timeline_files", f"importing {len(file_paths)} timeline file(s)", steps,
+                       target, invalidates=("timeline", "folder"))
+
+    @mcp.tool()
+    async def get_project_job_status(job_id: str = "") -> str:
+        """
+        Get the status of background project jobs (export/archive/import).
+        Reads the job registry only and never waits for Resolve, so it is cheap to poll,
+        even while a job is running.
+
+        Args:
+            job_id: Job id (all known jobs if empty)
+        """
+        jobs = get_project_jobs()
+        if not job_id:
+            if not jobs.jobs():
+                return "No project jobs"
+            return "\n".join(_format_job(job) for job in jobs.jobs())
+        job = jobs.get(job_id)
+        if job is None:
+            return f"Error: Unknown project job '{job_id}'"
+        text = _format_job(job)
+        failures = [result for result in job.results if "error" in result]
+        if failures and len(job.steps) > 1:
+            text += "\n" + "\n".join(f"  {result['step']}: {result['error']}" for result in failures)
+        return text
+
+    @mcp.tool()
+    async def wait_for_project_job(job_id: str, context: Context, timeout_seconds: float = 60.0) -> str:
+        """
+        Wait until a background project job finishes or the timeout expires, sending MCP
+        progress notifications per finished step. Waiting does not call Resolve.
+
+        Args:
+            job_id: Job id returned when the job was queued
+            timeout_seconds: Maximum time to wait before returning the current status (default: 60)
+        """
+        jobs = get_project_jobs()
+        job = jobs.get(job_id)
+        if job is None:
+            return f"Error: Unknown project job '{job_id}'"
+
+        deadline = time.monotonic() + max(0.0, timeout_seconds)
+        reported = None
+        while not job.finished:
+            state = (job.status, len(job.results), job.output_bytes())
+            if state != reported:
+                reported = state
+                await context.report_progress(len(job.results), len(job.steps), _format_job(job))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return f"Timed out waiting; {_format_job(job)}"
+            # 書き出し中のファイルサイズは状態の変化として通知されないため、一定間隔でも確認する
+            await jobs.wait_for_update(min(remaining, PROJECT_JOB_PROGRESS_INTERVAL))
+
+        await context.report_progress(len(job.results), len(job.steps), job.status)
+        return _format_job(job)
+
+    @mcp.tool()
+    async def cancel_project_job(job_id: str) -> str:
+        """
+        Cancel a background project job. Queued jobs are removed from the queue; a running
+        job stops before its next step (Resolve cannot interrupt an export or import in progress).
+
+        Args:
+            job_id: Job id
+        """
+        try:
+            return get_project_jobs().cancel(job_id)
+        except ValueError as e:
+            return f"Error: {e}"
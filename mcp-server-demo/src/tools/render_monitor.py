@@ -0,0 +1,268 @@
+"""
+レンダージョブの進捗をバックグラウンドで監視する共有ポーラー
+
+レンダーは数分以上かかるため、ツールの中で GetRenderJobStatus() を
+ループで呼ぶ代わりに、監視対象のジョブをこのモジュールに登録します。
+ポーラーはイベントループ上の1つのタスクとして動き、監視中のすべてのジョブの
+状態を1回のエグゼキュータ呼び出しでまとめて取得します。
+進捗が動いている間は短い間隔で、止まっている間は間隔を延ばして問い合わせます。
+
+ツールやリソースはキャッシュ済みの状態を読むだけなので、
+何人のクライアントが何個のジョブを見ていてもResolveへの問い合わせは増えません。
+複数のResolveに接続している場合は、接続ごとに並行して問い合わせます。
+"""
+
+import asyncio
+import time
+
+from .executor import DEFAULT_TARGET
+from .resolve_pool import get_resolve_pool
+
+# ポーリング間隔の下限・上限(秒)
+RENDER_POLL_MIN_INTERVAL = 0.5
+RENDER_POLL_MAX_INTERVAL = 5.0
+
+# 進捗の変化の有無に応じて間隔を伸縮させる倍率
+RENDER_POLL_BACKOFF = 1.5
+
+# これ以上状態が変わらないジョブの状態
+FINISHED_STATUSES = ("Complete", "Failed", "Cancelled")
+
+
+class RenderJob:
+    """監視中のレンダージョブ1件分の状態"""
+
+    def __init__(self, job_id, project_id, info=None, target=DEFAULT_TARGET):
+        self.job_id = job_id
+        self.project_id = project_id
+        self.target = target
+        self.info = dict(info or {})
+        self.status = "Ready"
+        self.progress = 0
+        self.details = {}
+        self.detached = False
+        self.started_at = time.time()
+        self.updated_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def update(self, status_info):
+        """
+        GetRenderJobStatus() の結果で状態を更新
+
+        Returns:
+            状態または進捗が変化した場合はTrue
+        """
+        status = status_info.get("JobStatus", self.status)
+        progress = int(status_info.get("CompletionPercentage", self.progress) or 0)
+        changed = status != self.status or progress != self.progress
+        self.status = status
+        self.progress = progress
+        self.details = {k: v for k, v in status_info.items() if k not in ("JobStatus", "CompletionPercentage")}
+        self.updated_at = time.time()
+        if self.finished and self.finished_at is None:
+            self.finished_at = self.updated_at
+        return changed
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "target": self.target,
+            "status": self.status,
+            "progress": self.progress,
+            "details": self.details,
+            "info": self.info,
+            "detached": self.detached,
+            "started_at": self.started_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _poll_jobs(ctx, jobs):
+    """
+    監視中のジョブの状態をまとめて取得（エグゼキュータ上で実行）
+
+    Args:
+        ctx: ResolveContext
+        jobs: [(ジョブID, プロジェクトID)]
+
+    Returns:
+        ({ジョブID: 状態辞書}, 現在のプロジェクトで取得できなかったジョブIDのリスト)
+    """
+    project = ctx.project if ctx is not None else None
+    project_id = ctx.project_id if project is not None else None
+    statuses = {}
+    detached = []
+    for job_id, job_project_id in jobs:
+        if project is None or job_project_id != project_id:
+            detached.append(job_id)
+            continue
+        statuses[job_id] = project.GetRenderJobStatus(job_id) or {}
+    return statuses, detached
+
+
+class RenderMonitor:
+    """
+    すべてのレンダージョブで共有するポーラー
+
+    watch() でジョブを登録するとポーリングタスクが起動し、
+    監視中のジョブがすべて終了すると停止します。
+    """
+
+    def __init__(self, min_interval=RENDER_POLL_MIN_INTERVAL, max_interval=RENDER_POLL_MAX_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.polls = 0
+        self._jobs = {}
+        self._task = None
+        self._updated = None
+
+    def watch(self, job_id, project_id, info=None, target=DEFAULT_TARGET):
+        """
+        ジョブを監視対象に登録し、ポーラーを起動する
+
+        Args:
+            job_id: AddRenderJob() が返したジョブID
+            project_id: ジョブを追加したプロジェクトの GetUniqueId()
+            info: GetRenderJobList() の情報など、一緒に保持する付加情報
+            target: ジョブを追加したResolveの接続名
+
+        Returns:
+            RenderJobインスタンス
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = RenderJob(job_id, project_id, info, target)
+        elif info:
+            job.info.update(info)
+        job.detached = False
+        self.interval = self.min_interval
+        self._ensure_running()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def forget(self, job_id):
+        return self._jobs.pop(job_id, None) is not None
+
+    def active_count(self, target):
+        """接続でレンダー中（監視中で未完了）のジョブ数"""
+        return sum(1 for job in self._jobs.values() if job.target == target and not job.finished and not job.detached)
+
+    async def wait_for_update(self, timeout):
+        """
+        次のポーリング結果が反映されるまで待つ
+
+        Args:
+            timeout: 待ち時間の上限(秒)
+
+        Returns:
+            更新があった場合はTrue、タイムアウトした場合はFalse
+        """
+        event = self._update_event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self):
+        active = [job for job in self._jobs.values() if not job.finished and not job.detached]
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": round(self.interval, 3),
+            "polls": self.polls,
+            "active_jobs": len(active),
+            "jobs": len(self._jobs),
+        }
+
+    def _update_event(self):
+        # イベントは作成したイベントループに紐づくため、ループごとに作り直す
+        loop = asyncio.get_running_loop()
+        if self._updated is None or self._updated[0] is not loop:
+            self._updated = (loop, asyncio.Event())
+        return self._updated[1]
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            active = [job for job in self._jobs.values() if not job.finished and not job.detached]
+            if not active:
+                return
+
+            changed = False
+            remaining_ms = []
+            by_target = {}
+            for job in active:
+                by_target.setdefault(job.target, []).append((job.job_id, job.project_id))
+            results = await asyncio.gather(*(self._poll(target, jobs) for target, jobs in by_target.items()))
+            for statuses, detached in results:
+                for job_id, status_info in statuses.items():
+                    job = self._jobs.get(job_id)
+                    if job is not None and job.update(status_info):
+                        changed = True
+                    if "EstimatedTimeRemainingInMs" in status_info:
+                        remaining_ms.append(status_info["EstimatedTimeRemainingInMs"])
+                for job_id in detached:
+                    # プロジェクトが切り替わったジョブは、再度 watch() されるまで監視しない
+                    if job_id in self._jobs:
+                        self._jobs[job_id].detached = True
+                        changed = True
+
+            # 変化があれば間隔を縮め、なければ延ばす（長いレンダーでは1%進むのに数秒かかる）
+            if changed:
+                self.interval = max(self.min_interval, self.interval / RENDER_POLL_BACKOFF)
+            else:
+                self.interval = min(self.max_interval, self.interval * RENDER_POLL_BACKOFF)
+            if remaining_ms:
+                # 終了予定時刻を過ぎて待ち続けないよう、残り時間で間隔を頭打ちにする
+                self.interval = max(self.min_interval, min(self.interval, min(remaining_ms) / 1000))
+
+            # 待機中のクライアントに更新を通知
+            event = self._update_event()
+            self._updated = (self._updated[0], asyncio.Event())
+            event.set()
+
+            await asyncio.sleep(self.interval)
+
+    async def _poll(self, target, jobs):
+        try:
+            connection = get_resolve_pool().select(target)
+        except ValueError:
+            # 接続が削除された場合は、再度 watch() されるまで監視しない
+            return {}, [job_id for job_id, _ in jobs]
+        try:
+            result = await connection.executor.call(_poll_jobs, jobs)
+        except Exception:
+            # ビジーやResolve側のエラーは次の周期で再試行する
+            return {}, []
+        self.polls += 1
+        return result
+
+
+# すべてのツールで共有するモニター
+render_monitor = RenderMonitor()
+
+
+def get_render_monitor():
+    """
+    共有のレンダーモニターを取得
+
+    Returns:
+        RenderMonitorインスタンス
+    """
+    return render_monitor
@@ -0,0 +1,289 @@
+"""
+DaVinci Resolve レンダー（デリバーページ）関連のツール
+
+ツールはレンダーの開始までを行ってすぐに戻り、進捗は共有のレンダーモニターが
+バックグラウンドで取得します。状態の確認や完了待ちはモニターのキャッシュを
+読むだけなので、Resolveへの問い合わせは増えません。
+
+複数のResolveに接続している場合は target で接続先を指定します。
+add_render_job の target="auto" は、レンダー中のジョブと処理待ちの呼び出しが
+最も少ない接続を選びます。
+"""
+
+import time
+
+from fastmcp import Context
+
+from .executor import DEFAULT_TARGET, call_resolve
+from .render_monitor import get_render_monitor
+from .resolve_pool import get_resolve_pool
+
+# 接続を選ぶときに、レンダー中のジョブ1件を処理待ちの呼び出し何件分とみなすか
+RENDER_JOB_LOAD = 10
+
+
+def _format_job(job):
+    """RenderJob を1行の文字列に整形"""
+    text = f"Render job '{job.job_id}': {job.status} {job.progress}%"
+    if "EstimatedTimeRemainingInMs" in job.details:
+        text += f" (about {job.details['EstimatedTimeRemainingInMs'] / 1000:.1f}s remaining)"
+    if job.info.get("TimelineName"):
+        text += f" [timeline '{job.info['TimelineName']}']"
+    if job.target != DEFAULT_TARGET:
+        text += f" on '{job.target}'"
+    if job.detached:
+        text += " - its project is not open, progress is not being tracked"
+    return text
+
+
+def _job_infos(project, job_ids):
+    """GetRenderJobList() から指定したジョブの情報を取得"""
+    infos = {}
+    for info in project.GetRenderJobList() or []:
+        if info.get("JobId") in job_ids:
+            infos[info["JobId"]] = info
+    return infos
+
+
+def _render_target(target):
+    """
+    target を接続名に解決（"auto" はレンダー中のジョブと処理待ちの呼び出しが最も少ない接続）
+
+    Raises:
+        ValueError: 接続名が不明、または正常な接続がない場合
+    """
+    monitor = get_render_monitor()
+    connection = get_resolve_pool().select(
+        target, load=lambda c: monitor.active_count(c.name) * RENDER_JOB_LOAD)
+    return connection.name
+
+
+def register_render_tools(mcp):
+    """
+    レンダー関連ツールをMCPサーバーに登録
+
+    Args:
+        mcp: FastMCPインスタンス
+    """
+
+    @mcp.resource("davinci://render/jobs")
+    def render_jobs() -> dict:
+        """Status and progress of all render jobs started through this server, plus poller state"""
+        monitor = get_render_monitor()
+        return {
+            "monitor": monitor.stats(),
+            "jobs": [job.to_dict() for job in monitor.jobs()],
+        }
+
+    @mcp.resource("davinci://render/jobs/{job_id}")
+    def render_job(job_id: str) -> dict:
+        """Status and progress of a single render job"""
+        job = get_render_monitor().get(job_id)
+        if job is None:
+            return {"job_id": job_id, "error": "Unknown render job"}
+        return job.to_dict()
+
+    @mcp.tool()
+    async def add_render_job(
+        target_dir: str = "",
+        custom_name: str = "",
+        preset_name: str = "",
+        start_rendering: bool = True,
+        target: str | None = None,
+    ) -> str:
+        """
+        Queue a render job for the current timeline and optionally start rendering it.
+        Returns immediately with the job id; rendering continues in the background.
+        Track it with get_render_job_status, wait_for_render_job or the
+        davinci://render/jobs/{job_id} resource instead of polling.
+
+        Args:
+            target_dir: Output directory (current render setting is used if empty)
+            custom_name: Output file name without extension (current render setting is used if empty)
+            preset_name: Render preset to load first, e.g. "H.264 Master" (optional)
+            start_rendering: Start rendering the new job right away (default: True)
+            target: Resolve instance to render on when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        """
+        def add_job(ctx):
+            project = ctx.project
+            if not project:
+                return "No project is currently open"
+            if not ctx.timeline:
+                return "No timeline is currently open"
+
+            if preset_name and not project.LoadRenderPreset(preset_name):
+                return f"Error: Render preset '{preset_name}' not found"
+
+            settings = {}
+            if target_dir:
+                settings["TargetDir"] = target_dir
+            if custom_name:
+                settings["CustomName"] = custom_name
+            if settings and not project.SetRenderSettings(settings):
+                return "Error: Failed to apply render settings"
+
+            job_id = project.AddRenderJob()
+            if not job_id:
+                return "Error: Failed to add render job"
+
+            started = False
+            if start_rendering:
+                started = bool(project.StartRendering([job_id], isInteractiveMode=False))
+            return job_id, ctx.project_id, started, _job_infos(project, [job_id]).get(job_id)
+
+        try:
+            target = _render_target(target)
+        except ValueError as e:
+            return f"Error: {e}"
+        result = await call_resolve(add_job, target=target)
+        if isinstance(result, str):
+            return result
+
+        job_id, project_id, started, info = result
+        where = f" on '{target}'" if target != DEFAULT_TARGET else ""
+        if not start_rendering:
+            return f"Render job '{job_id}' added to the render queue{where} (not started)"
+        if not started:
+            return f"Error: Render job '{job_id}' was added{where} but rendering could not be started"
+
+        get_render_monitor().watch(job_id, project_id, info, target)
+        return f"Render job '{job_id}' started{where}; progress is tracked in the background"
+
+    @mcp.tool()
+    async def start_rendering(job_ids: list[str] | None = None, target: str | None = None) -> str:
+        """
+        Start rendering queued render jobs without waiting for them to finish.
+
+        Args:
+            job_ids: Render job ids to start (all jobs in the render queue if omitted)
+            target: Resolve instance whose render queue to start (default instance if omitted)
+        """
+        def start(ctx):
+            project = ctx.project
+            if not project:
+                return "No project is currently open"
+
+            infos = {info.get("JobId"): info for info in project.GetRenderJobList() or []}
+            targets = list(job_ids) if job_ids else list(infos)
+            if not targets:
+                return "Error: The render queue is empty"
+            missing = [job_id for job_id in targets if job_id not in infos]
+            if missing:
+                return f"Error: Render jobs not found: {', '.join(missing)}"
+
+            if not project.StartRendering(targets, isInteractiveMode=False):
+                return "Error: Failed to start rendering"
+            return ctx.project_id, [(job_id, infos[job_id]) for job_id in targets]
+
+        try:
+            target = _render_target(target)
+        except ValueError as e:
+            return f"Error: {e}"
+        result = await call_resolve(start, target=target)
+        if isinstance(result, str):
+            return result
+
+        project_id, jobs = result
+        monitor = get_render_monitor()
+        for job_id, info in jobs:
+            monitor.watch(job_id, project_id, info, target)
+        return f"Started {len(jobs)} render job(s): {', '.join(job_id for job_id, _ in jobs)}"
+
+    @mcp.tool()
+    async def get_render_job_status(job_id: str = "", target: str | None = None) -> str:
+        """
+        Get the latest known status and progress of render jobs.
+        Reads the status cached by the background poller and does not query Resolve
+        for jobs started through this server.
+
+        Args:
+            job_id: Render job id (all tracked jobs if empty)
+            target: Resolve instance to ask about a job not started through this server
+                    (default instance if omitted)
+        """
+        monitor = get_render_monitor()
+        if not job_id:
+            jobs = monitor.jobs()
+            if not jobs:
+                return "No render jobs are being tracked"
+            return "\n".join(_format_job(job) for job in jobs)
+
+        job = monitor.get(job_id)
+        if job is not None:
+            return _format_job(job)
+
+        # このサーバー以外から開始されたジョブは1回だけ問い合わせ、レンダー中なら監視を始める
+        def fetch_status(ctx):
+            project = ctx.project
+            if not project:
+                return "No project is currently open"
+            status = project.GetRenderJobStatus(job_id)
+            if not status:
+                return f"Error: Render job '{job_id}' not found"
+            return ctx.project_id, status, _job_infos(project, [job_id]).get(job_id)
+
+        try:
+            target = _render_target(target)
+        except ValueError as e:
+            return f"Error: {e}"
+        result = await call_resolve(fetch_status, target=target)
+        if isinstance(result, str):
+            return result
+
+        project_id, status, info = result
+        job = monitor.watch(job_id, project_id, info, target)
+        job.update(status)
+        return _format_job(job)
+
+    @mcp.tool()
+    async def wait_for_render_job(job_id: str, context: Context, timeout_seconds: float = 60.0) -> str:
+        """
+        Wait until a render job finishes or the timeout expires, sending MCP progress
+        notifications (0-100) as the background poller observes progress.
+        Waiting does not add any polling of Resolve, so many clients can wait on many jobs.
+
+        Args:
+            job_id: Render job id returned by add_render_job
+            timeout_seconds: Maximum time to wait before returning the current status (default: 60)
+        """
+        monitor = get_render_monitor()
+        job = monitor.get(job_id)
+        if job is None:
+            return f"Error: Render job '{job_id}' is not being tracked; start it with add_render_job or start_rendering"
+        if job.detached:
+            monitor.watch(job_id, job.project_id, target=job.target)
+
+        deadline = time.monotonic() + max(0.0, timeout_seconds)
+        reported = None
+        while not job.finished and not job.detached:
+            if (job.status, job.progress) != reported:
+                reported = (job.status, job.progress)
+                await context.report_progress(job.progress, 100, f"{job.status} {job.progress}%")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return f"Timed out waiting; {_format_job(job)}"
+            await monitor.wait_for_update(remaining)
+
+        if job.finished:
+            await context.report_progress(job.progress, 100, job.status)
+        return _format_job(job)
+
+    @mcp.tool()
+    async def stop_rendering(target: str | None = None) -> str:
+        """
+        Stop all render jobs that are currently rendering
+
+        Args:
+            target: Resolve instance to stop (default instance if omitted)
+        """
+        def stop(ctx):
+            project = ctx.project
+            if not project:
+                return "No project is currently open"
+            if not project.IsRenderingInProgress():
+                return "No render is in progress"
+            project.StopRendering()
+            return "Rendering stopped"
+
+        return await call_resolve(stop, target=target)
@@ -0,0 +1,379 @@
+"""
+複数のResolveインスタンスへの接続プール
+
+レンダーファームのように複数のワークステーションでResolveを動かす場合に、
+名前付きの接続を保持します。接続ごとにResolve API専用のワーカースレッド
+(ResolveExecutor) とハンドルキャッシュ (ResolveContext) を持つため、
+ある接続が応答しなくても他の接続への呼び出しは待たされません。
+
+- "default": set_resolve_instance() で設定したインスタンス（従来どおり）
+- 環境変数 DAVINCI_MCP_RESOLVE_HOSTS の接続（例: "edit1=192.168.1.10,edit2=192.168.1.11"）。
+  DaVinciResolveScript.scriptapp("Resolve", ホスト) で最初の使用時に接続する
+- add() で追加した接続（動作確認では複数の fake_resolve を登録できる）
+
+default 以外の接続がある間は、バックグラウンドで定期的に GetProductName / GetVersionString で
+応答を確認します。応答のない接続は "auto" の候補から外し、Resolveが終了して切断された接続は
+次の確認で再接続します。
+
+ツールの target 引数に "auto" を指定すると、処理待ちの呼び出しが最も少ない
+（レンダー中のジョブなど呼び出し元が指定した負荷も加える）正常な接続を選びます。
+"""
+
+import asyncio
+import os
+import time
+
+from .base import ResolveContext, get_resolve_context, get_resolve_instance, get_tool_cache
+from .executor import DEFAULT_TARGET, ResolveBusyError, ResolveExecutor, get_executor, probe_resolve
+from .metrics import instrument
+
+RESOLVE_HOSTS_ENV = "DAVINCI_MCP_RESOLVE_HOSTS"
+
+# 最も空いている接続を選ぶ target
+AUTO_TARGET = "auto"
+
+# 応答を確認する間隔(秒)
+HEALTH_CHECK_INTERVAL = 15.0
+
+# 応答の確認・接続のタイムアウト(秒)
+HEALTH_CHECK_TIMEOUT = 2.0
+
+
+def scriptapp_connector(host):
+    """
+    DaVinciResolveScript.scriptapp() でリモートのResolveに接続する関数を作成
+    
+    DaVinciResolveScript はResolveのスクリプトAPIのモジュールフォルダを
+    PYTHONPATH に追加してimportできるようにしておく必要があります。
+    
+    Args:
+        host: Resolveが動いているホスト名またはIPアドレス
+    
+    Returns:
+        接続したResolveインスタンス（接続できない場合はNone）を返す関数
+    """
+    def connect():
+        try:
+            import DaVinciResolveScript as dvr_script
+        except ImportError:
+            return None
+        return dvr_script.scriptapp("Resolve", host)
+    
+    return connect
+
+
+def parse_hosts(value):
+    """
+    DAVINCI_MCP_RESOLVE_HOSTS の値を解釈
+    
+    Args:
+        value: "edit1=192.168.1.10,edit2=render-02"（名前を省略した場合はホスト名を接続名とする）
+    
+    Returns:
+        {接続名: ホスト}
+    """
+    hosts = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, separator, host = part.partition("=")
+        if not separator:
+            host = name
+        hosts[name.strip()] = host.strip()
+    return hosts
+
+
+class ResolveConnection:
+    """
+    名前付きのResolve接続（専用のワーカースレッドとハンドルキャッシュを持つ）
+    
+    Args:
+        name: 接続名
+        resolve: Resolveインスタンス（省略時は最初の使用時に connect で接続）
+        connect: Resolveインスタンスを返す関数（切断後の再接続にも使う）
+        executor: 使用するエグゼキュータ（省略時は専用のエグゼキュータを作成）
+    """
+    
+    def __init__(self, name, resolve=None, connect=None, executor=None):
+        self.name = name
+        self._connect = connect
+        self._resolve = None
+        self._context = None
+        self.executor = executor or ResolveExecutor(context_provider=lambda: self.context, name=name)
+        self.healthy = None
+        self.product = None
+        self.checked_at = None
+        self.last_error = None
+        self.checks = 0
+        self.connects = 0
+        self.scheduled = 0
+        if resolve is not None:
+            self._attach(resolve)
+    
+    @property
+    def resolve(self):
+        """計測用プロキシで包んだResolveインスタンス（未接続の場合はNone）"""
+        return self._resolve
+    
+    @property
+    def context(self):
+        """この接続のハンドルキャッシュ（未接続の場合はNone）"""
+        return self._context
+    
+    @property
+    def available(self):
+        """接続済みで、応答がないと判断されておらず、長い呼び出し (exclusive) を実行中でないか"""
+        return (self.resolve is not None and self.healthy is not False and self.executor.breaker.state == "closed"
+                and self.executor.exclusive is None)
+    
+    def load(self):
+        """処理待ちの呼び出しの数（スケジューリングの負荷）"""
+        return self.executor.pending
+    
+    async def ensure_connected(self, timeout=None):
+        """
+        未接続であれば接続する（接続はこの接続のワーカースレッドで行う）
+        
+        Args:
+            timeout: 接続のタイムアウト(秒)
+        
+        Returns:
+            接続済みの場合はTrue
+        
+        Raises:
+            ResolveBusyError: 接続がタイムアウトした場合
+        """
+        if self.resolve is not None:
+            return True
+        if self._connect is None:
+            return False
+        await self.executor.call(self._reconnect, timeout=min(timeout or HEALTH_CHECK_TIMEOUT, HEALTH_CHECK_TIMEOUT))
+        return self.resolve is not None
+    
+    async def check(self):
+        """
+        応答を確認し、切断されていれば次の呼び出しで再接続するようにする
+        
+        Returns:
+            応答があった場合はTrue
+        """
+        self.checks += 1
+        error = None
+        try:
+            if not await self.ensure_connected():
+                self._record(False, "not connected")
+                return False
+            result = await self.executor.call(probe_resolve, timeout=HEALTH_CHECK_TIMEOUT)
+        except ResolveBusyError as e:
+            if e.reason == "exclusive":
+                # プロジェクトの書き出しなどを実行中なだけなので、応答がないとは判断しない
+                return bool(self.healthy)
+            # レンダー中などで応答がないだけの場合があるため、再接続はしない
+            self._record(False, str(e))
+            return False
+        except Exception as e:
+            result = None
+            error = f"{type(e).__name__}: {e}"
+        if not result or not result[0]:
+            # Resolveが終了するとAPIはNoneを返すため、切断されたものとして接続し直す
+            self._record(False, error or "Resolve did not answer GetProductName")
+            self._detach()
+            return False
+        self.product = f"{result[0]} {result[1]}"
+        self._record(True, None)
+        return True
+    
+    def stats(self):
+        return {
+            "connected": self.resolve is not None,
+            "healthy": self.healthy,
+            "product": self.product,
+            "pending_calls": self.load(),
+            "exclusive": self.executor.exclusive,
+            "circuit": self.executor.breaker.state,
+            "scheduled": self.scheduled,
+            "checks": self.checks,
+            "connects": self.connects,
+            "checked_at": self.checked_at,
+            "last_error": self.last_error,
+        }
+    
+    def _attach(self, resolve):
+        self._resolve = instrument(resolve)
+        self._context = ResolveContext(self._resolve)
+    
+    def _detach(self):
+        if self._connect is not None:
+            self._resolve = None
+            self._context = None
+    
+    def _reconnect(self, ctx):
+        # ワーカースレッドで実行（scriptapp は応答まで待つため）
+        resolve = self._connect()
+        self.connects += 1
+        if resolve is None:
+            self.last_error = "could not connect"
+            return
+        self._attach(resolve)
+        # 接続先が変わった可能性があるため、キャッシュしたツールの結果を破棄
+        get_tool_cache().invalidate("project")
+    
+    def _record(self, healthy, error):
+        self.healthy = healthy
+        self.checked_at = time.time()
+        if error is not None:
+            self.last_error = error
+
+
+class _DefaultConnection(ResolveConnection):
+    """set_resolve_instance() で設定したインスタンスと共有のエグゼキュータを使う既定の接続"""
+    
+    def __init__(self):
+        super().__init__(DEFAULT_TARGET, executor=get_executor())
+    
+    @property
+    def resolve(self):
+        return get_resolve_instance()
+    
+    @property
+    def context(self):
+        return get_resolve_context()
+
+
+class ResolvePool:
+    """
+    名前付きのResolve接続の集合と、"auto" の接続先を選ぶスケジューラ
+    
+    Args:
+        hosts: {接続名: ホスト}（省略時は環境変数 DAVINCI_MCP_RESOLVE_HOSTS）
+        health_check_interval: 応答を確認する間隔(秒)
+    """
+    
+    def __init__(self, hosts=None, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.health_check_interval = health_check_interval
+        self._connections = {DEFAULT_TARGET: _DefaultConnection()}
+        self._task = None
+        if hosts is None:
+            hosts = parse_hosts(os.environ.get(RESOLVE_HOSTS_ENV))
+        for name, host in hosts.items():
+            self.add(name, connect=scriptapp_connector(host))
+    
+    def add(self, name, resolve=None, connect=None):
+        """
+        接続を追加（同じ名前の接続は置き換える）
+        
+        Args:
+            name: 接続名
+            resolve: Resolveインスタンス
+            connect: Resolveインスタンスを返す関数（resolve を省略した場合は必須）
+        
+        Returns:
+            ResolveConnectionインスタンス
+        
+        Raises:
+            ValueError: 予約された名前、または resolve と connect のどちらもない場合
+        """
+        if name in (DEFAULT_TARGET, AUTO_TARGET):
+            raise ValueError(f"'{name}' is a reserved target name")
+        if resolve is None and connect is None:
+            raise ValueError("Either resolve or connect is required")
+        connection = ResolveConnection(name, resolve, connect)
+        self._connections[name] = connection
+        self._ensure_monitoring()
+        return connection
+    
+    def remove(self, name):
+        """
+        接続を削除（実行中の呼び出しはそのまま完了する）
+        
+        Returns:
+            削除した場合はTrue
+        """
+        if name == DEFAULT_TARGET:
+            return False
+        return self._connections.pop(name, None) is not None
+    
+    def names(self):
+        return list(self._connections)
+    
+    def select(self, target=None, load=None):
+        """
+        target に対応する接続を選ぶ
+        
+        Args:
+            target: 接続名（None は "default"、"auto" は最も空いている正常な接続）
+            load: "auto" のとき接続ごとに加える負荷を返す関数 (ResolveConnection -> 数値)
+        
+        Returns:
+            ResolveConnectionインスタンス
+        
+        Raises:
+            ValueError: 接続名が不明、または "auto" で正常な接続がない場合
+        """
+        self._ensure_monitoring()
+        if target is None:
+            return self._connections[DEFAULT_TARGET]
+        if target != AUTO_TARGET:
+            connection = self._connections.get(target)
+            if connection is None:
+                raise ValueError(f"Unknown Resolve target '{target}' (available: {', '.join(self._connections)}, auto)")
+            return connection
+        
+        candidates = [connection for connection in self._connections.values() if connection.available]
+        if not candidates:
+            raise ValueError(f"No healthy Resolve instance is available (targets: {', '.join(self._connections)})")
+        # 負荷が同じ場合はこれまでに選んだ回数が少ない接続に振り分ける
+        connection = min(candidates, key=lambda c: (c.load() + (load(c) if load else 0), c.scheduled))
+        connection.scheduled += 1
+        return connection
+    
+    async def check_all(self):
+        """
+        すべての接続の応答を並行して確認
+        
+        Returns:
+            {接続名: 応答があったか}
+        """
+        connections = list(self._connections.values())
+        results = await asyncio.gather(*(connection.check() for connection in connections))
+        return {connection.name: result for connection, result in zip(connections, results)}
+    
+    def stats(self):
+        return {
+            "health_check_interval_seconds": self.health_check_interval,
+            "monitoring": self._task is not None and not self._task.done(),
+            "targets": {name: connection.stats() for name, connection in self._connections.items()},
+        }
+    
+    def _ensure_monitoring(self):
+        # default だけの場合は従来どおりブレーカーに任せ、定期的な確認はしない
+        if len(self._connections) < 2:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # イベントループの外で追加された場合は最初の select() で開始する
+            return
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._task = loop.create_task(self._run())
+    
+    async def _run(self):
+        while len(self._connections) > 1:
+            await self.check_all()
+            await asyncio.sleep(self.health_check_interval)
+
+
+# すべてのツールで共有する接続プール
+resolve_pool = ResolvePool()
+
+
+def get_resolve_pool():
+    """
+    共有の接続プールを取得
+    
+    Returns:
+        ResolvePoolインスタンス
+    """
+    return resolve_pool
@@ -0,0 +1,68 @@
+"""
+MCPサーバー自身の状態を公開するリソース
+"""
+
+from startup_profile import get_startup_profile
+
+from .base import get_tool_cache
+from .deadlines import ToolDeadlineMiddleware
+from .executor import get_executor
+from .resolve_pool import get_resolve_pool
+from .metrics import ToolTimingMiddleware, get_metrics
+
+
+def register_server_tools(mcp, metrics_route=None):
+    """
+    サーバー状態関連のリソースをMCPサーバーに登録
+    
+    Args:
+        mcp: FastMCPインスタンス
+        metrics_route: Prometheus形式のメトリクスを公開するHTTPパス（Noneの場合は公開しない）
+    """
+    # すべてのツール呼び出しの実行時間を計測
+    mcp.add_middleware(ToolTimingMiddleware())
+    # ツールごとの期限（Resolveが応答しない場合は "Resolve busy" の結果を返す）
+    deadline_middleware = ToolDeadlineMiddleware()
+    mcp.add_middleware(deadline_middleware)
+
+    @mcp.resource("davinci://stats/executor")
+    def executor_stats() -> dict:
+        """Queue depth and wait/run times of the Resolve API executor thread, and circuit breaker state"""
+        return get_executor().stats()
+
+    @mcp.resource("davinci://stats/deadlines")
+    def deadline_stats() -> dict:
+        """Per-tool deadlines and how many calls returned a "Resolve busy" result"""
+        return deadline_middleware.stats()
+
+    @mcp.resource("davinci://resolve/targets")
+    def resolve_targets() -> dict:
+        """Connected Resolve instances usable as a tool's target: health, product/version, pending calls"""
+        return get_resolve_pool().stats()
+
+    @mcp.resource("davinci://stats/startup")
+    def startup_stats() -> dict:
+        """Import/registration time per startup phase, time to listening, and tool modules loaded on first call"""
+        return get_startup_profile().as_dict()
+
+    @mcp.resource("davinci://stats/tool-cache")
+    def tool_cache_stats() -> dict:
+        """Hit rate per cached read-only tool, coalesced concurrent calls and invalidations per scope"""
+        return get_tool_cache().stats()
+
+    @mcp.resource("davinci://stats/metrics")
+    def metrics_stats() -> dict:
+        """Latency histograms per MCP tool and per Resolve API method (Class.Method), slowest first"""
+        return get_metrics().snapshot()
+
+    if metrics_route:
+        from starlette.responses import PlainTextResponse
+
+        @mcp.custom_route(metrics_route, methods=["GET"])
+        async def metrics_endpoint(request):
+            stats = get_executor().stats()
+            text = get_metrics().prometheus_text(gauges={
+                "davinci_mcp_executor_queue_depth": stats["queue_depth"],
+                "davinci_mcp_executor_max_queue_depth": stats["max_depth"],
+            })
+            return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,305 @@
+"""
+現在のタイムラインの変更フィード
+
+TimelineItem の GetUniqueId() ごとに前回確認した状態（トラック、開始・終了フレーム、名前）を
+保持し、タイムラインを読み直して差分を added / removed / moved / modified イベントとして
+連番付きで記録します。クライアントは最後に受け取った連番以降のイベントだけを読めば済みます。
+
+差分の取得はイベントループ上の1つのタスクで行い、
+- タイムラインを編集するツール (TIMELINE_EDIT_TAG 付き) の実行後
+- 一定間隔のタイマー（変更がない間は間隔を延ばす）
+に実行します。どちらもフィードが最近参照された間 (CHANGE_FEED_IDLE_TIMEOUT) だけ動き、
+誰も見ていない間は走査しません（次に参照されたときの走査で、その間の差分をまとめて記録します）。
+更新の通知（リソースの購読）はなく、クライアントは davinci://timeline/changes/{since} を
+定期的に読みます。
+1トラックずつエグゼキュータに積むため、大きなタイムラインの走査中も
+他のツール呼び出しが割り込めます。
+
+差分が見つかった場合のキャッシュの破棄は、変わったトラックに限ります。
+- 占有状況インデックスは、保持している区間が走査結果と一致しないトラックだけを破棄する
+  （ツール自身が record_added() で反映した編集では破棄しない）
+- スナップショットとツール結果のキャッシュは、編集ツールはすでに自分で破棄しているため、
+  編集ツールの実行後の走査では破棄しない（タイマーによる走査で見つかった変更だけ破棄する）
+"""
+
+import asyncio
+import collections
+import time
+
+from .base import get_tool_cache
+from .executor import get_executor
+from .timeline_occupancy import get_occupancy_index
+from .timeline_snapshot import get_snapshot_cache
+
+# タイムラインを編集するツールに付けるタグ（実行後に差分を取得する）
+TIMELINE_EDIT_TAG = "timeline-edit"
+
+# 保持するイベント数
+CHANGE_FEED_MAX_EVENTS = 10000
+
+# タイマーによる差分取得の間隔の下限・上限(秒)
+CHANGE_FEED_MIN_INTERVAL = 2.0
+CHANGE_FEED_MAX_INTERVAL = 30.0
+
+# 最後に参照されてからタイマーを止めるまでの時間(秒)
+CHANGE_FEED_IDLE_TIMEOUT = 300.0
+
+# 編集ツールの実行後、続けて実行される編集をまとめるための待ち時間(秒)
+CHANGE_FEED_DEBOUNCE = 0.2
+
+FEED_URI = "davinci://timeline/changes"
+
+_TRACK_TYPES = ("video", "audio", "subtitle")
+
+
+def _read_tracks(ctx):
+    """現在のタイムラインのIDとトラック一覧を取得（エグゼキュータ上で実行）"""
+    timeline = ctx.timeline if ctx is not None else None
+    if not timeline:
+        return None, []
+    tracks = []
+    for track_type in _TRACK_TYPES:
+        tracks.extend((track_type, i) for i in range(1, (timeline.GetTrackCount(track_type) or 0) + 1))
+    return ctx.timeline_id, tracks
+
+
+def _read_track(ctx, timeline_id, track_type, track_index):
+    """
+    1トラック分のアイテムの状態を取得（エグゼキュータ上で実行）
+
+    Returns:
+        {アイテムID: (トラック種別, トラック番号, 開始, 終了, 名前)}
+        （タイムラインが切り替わっていた場合はNone）
+    """
+    if ctx is None or ctx.timeline_id != timeline_id:
+        return None
+    timeline = ctx.timeline
+    start_frame = timeline.GetStartFrame()
+    state = {}
+    for item in timeline.GetItemListInTrack(track_type, track_index) or []:
+        state[item.GetUniqueId()] = (track_type, track_index, item.GetStart() - start_frame,
+                                     item.GetEnd() - start_frame, item.GetName())
+    return state
+
+
+def _track_intervals(state, tracks):
+    """
+    状態から指定したトラックのアイテム区間を取り出す
+
+    Returns:
+        {(トラック種別, トラック番号): [(開始, 終了)]}（アイテムのないトラックは空のリスト）
+    """
+    intervals = {track: [] for track in tracks}
+    for track_type, track_index, start, end, _ in state.values():
+        track = intervals.get((track_type, track_index))
+        if track is not None:
+            track.append((start, end))
+    return intervals
+
+
+def _item_event(event_type, item_id, state, previous=None):
+    track_type, track_index, start, end, name = state
+    event = {"type": event_type, "item_id": item_id, "track_type": track_type, "track_index": track_index,
+             "start": start, "end": end, "name": name}
+    if previous is not None:
+        event["previous"] = {"track_type": previous[0], "track_index": previous[1],
+                             "start": previous[2], "end": previous[3], "name": previous[4]}
+    return event
+
+
+def diff_states(previous, current):
+    """
+    2つの状態の差分をイベントのリストにする
+
+    同じ長さのまま位置やトラックが変わったアイテムは moved、
+    長さや名前が変わったアイテムは modified とします。
+
+    Args:
+        previous: 前回の {アイテムID: 状態}
+        current: 今回の {アイテムID: 状態}
+
+    Returns:
+        イベントのリスト
+    """
+    events = []
+    for item_id, state in current.items():
+        old = previous.get(item_id)
+        if old is None:
+            events.append(_item_event("added", item_id, state))
+        elif old != state:
+            same_length = old[3] - old[2] == state[3] - state[2]
+            event_type = "moved" if same_length and old[4] == state[4] else "modified"
+            events.append(_item_event(event_type, item_id, state, old))
+    for item_id, state in previous.items():
+        if item_id not in current:
+            events.append(_item_event("removed", item_id, state))
+    return events
+
+
+class ChangeFeed:
+    """
+    現在のタイムラインの変更イベントを記録するフィード
+
+    イベントには1から始まる連番 (seq) を付けます。タイムラインが切り替わったときは
+    "reset" イベントを記録し、新しいタイムラインの状態を基準にします。
+    """
+
+    def __init__(self, max_events=CHANGE_FEED_MAX_EVENTS):
+        self.events = collections.deque(maxlen=max_events)
+        self.seq = 0
+        self.scans = 0
+        self.interval = CHANGE_FEED_MIN_INTERVAL
+        self.timeline_id = None
+        self._state = {}
+        self._task = None
+        self._wakeup = None
+        self._last_access = 0.0
+        self._scanned_at = None
+
+    def touch(self):
+        """フィードが参照されたことを記録し、タイマーを起動する"""
+        self._last_access = time.monotonic()
+        self._ensure_running()
+
+    def notify_edit(self):
+        """タイムラインを編集するツールが実行されたことを通知（参照されている場合はすぐに差分を取得させる）"""
+        if not self._active():
+            return
+        self._ensure_running()
+        self.interval = CHANGE_FEED_MIN_INTERVAL
+        self._wakeup.set()
+
+    def read(self, since=None, limit=1000):
+        """
+        イベントを取得
+
+        Args:
+            since: この連番より後のイベントを返す（Noneの場合は最新 limit 件）
+            limit: 返すイベント数の上限
+
+        Returns:
+            イベントと連番情報の辞書。since が保持しているイベントより古い場合は
+            truncated が True になるため、クライアントはスナップショットを取り直してください。
+        """
+        self.touch()
+        oldest = self.events[0]["seq"] if self.events else self.seq + 1
+        if since is None:
+            events = list(self.events)[-limit:]
+        else:
+            events = [event for event in self.events if event["seq"] > since][:limit]
+        return {
+            "timeline_id": self.timeline_id,
+            "latest_seq": self.seq,
+            "oldest_seq": oldest,
+            "truncated": since is not None and since + 1 < oldest,
+            "next_since": events[-1]["seq"] if events else (self.seq if since is None else since),
+            "scanned_at": self._scanned_at,
+            "events": events,
+        }
+
+    def stats(self):
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": round(self.interval, 3),
+            "scans": self.scans,
+            "latest_seq": self.seq,
+            "tracked_items": len(self._state),
+        }
+
+    async def scan(self, after_edit=False):
+        """
+        タイムラインを読み直して差分をイベントとして記録
+
+        Args:
+            after_edit: 編集ツールの実行後の走査か（スナップショットとツール結果のキャッシュは
+                        ツールが破棄済みのため破棄しない）
+
+        Returns:
+            記録したイベントの数
+        """
+        executor = get_executor()
+        timeline_id, tracks = await executor.call(_read_tracks)
+        current = {}
+        for track_type, track_index in tracks:
+            state = await executor.call(_read_track, timeline_id, track_type, track_index)
+            if state is None:
+                # 走査中にタイムラインが切り替わった場合は次の周期でやり直す
+                return 0
+            current.update(state)
+        self.scans += 1
+        self._scanned_at = time.time()
+
+        if timeline_id != self.timeline_id:
+            self.timeline_id = timeline_id
+            self._state = current
+            get_tool_cache().invalidate("timeline")
+            self._append([{"type": "reset", "timeline_id": timeline_id, "items": len(current)}])
+            return 1
+
+        events = diff_states(self._state, current)
+        self._state = current
+        if events:
+            changed_tracks = {(event["track_type"], event["track_index"]) for event in events}
+            changed_tracks.update((event["previous"]["track_type"], event["previous"]["track_index"])
+                                  for event in events if "previous" in event)
+            # Resolve上の直接編集など、ツールが反映していない変更のあるトラックだけを破棄
+            get_occupancy_index().reconcile(timeline_id, _track_intervals(current, changed_tracks))
+            if not after_edit:
+                get_snapshot_cache().invalidate_tracks(timeline_id, changed_tracks)
+                get_tool_cache().invalidate("timeline")
+            self._append(events)
+        return len(events)
+
+    def _append(self, events):
+        now = time.time()
+        for event in events:
+            self.seq += 1
+            event["seq"] = self.seq
+            event["time"] = now
+            self.events.append(event)
+
+    def _active(self):
+        return time.monotonic() - self._last_access < CHANGE_FEED_IDLE_TIMEOUT
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while self._active() or self._wakeup.is_set():
+            woken = self._wakeup.is_set()
+            if woken:
+                # 連続する編集をまとめる
+                await asyncio.sleep(CHANGE_FEED_DEBOUNCE)
+                self._wakeup.clear()
+            try:
+                changed = await self.scan(after_edit=woken)
+            except Exception:
+                # ビジーやResolve側のエラーは次の周期で再試行する
+                changed = 0
+
+            if changed or woken:
+                self.interval = CHANGE_FEED_MIN_INTERVAL
+            else:
+                self.interval = min(CHANGE_FEED_MAX_INTERVAL, self.interval * 2)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+# すべてのツールで共有するフィード
+change_feed = ChangeFeed()
+
+
+def get_change_feed():
+    """
+    共有の変更フィードを取得
+
+    Returns:
+        ChangeFeedインスタンス
+    """
+    return change_feed
@@ -0,0 +1,298 @@
+"""
+書き出したタイムライン (EDL / FCPXML / OTIO) の読み込み
+
+Timeline.Export() は1回の呼び出しで編集全体をファイルに書き出すため、
+アイテムごとにAPIを呼び出すより大きなタイムラインでははるかに高速です。
+このモジュールは書き出したファイルを少しずつ読み込み、
+(トラック種別, トラック番号, アイテム) を順に返します。
+
+- EDL: 1行ずつ読み込む（ビデオはトラック1だけ、音声はチャンネル番号をトラック番号とする）
+- FCPXML: iterparse で要素ごとに読み込み、読み終えた要素は破棄する
+  （基本ストーリーラインはビデオトラック1、lane が正の接続クリップはビデオトラック lane+1、
+  負の接続クリップは音声トラック -lane）
+- OTIO: JSONのため読み込み自体は一括だが、object_hook でクリップごとに必要な値だけの
+  タプルに変換し、メタデータなどの大きなオブジェクトを保持しない
+
+アイテムの start / end はタイムラインの開始フレームを0としたフレーム番号です。
+"""
+
+import json
+import re
+import xml.etree.ElementTree as ElementTree
+from fractions import Fraction
+
+# 形式 → (Resolveの書き出し種別の定数名, サブタイプの定数名またはNone, 拡張子)
+EXPORT_FORMATS = {
+    "otio": ("EXPORT_OTIO", None, ".otio"),
+    "fcpxml": ("EXPORT_FCPXML_1_10", None, ".fcpxml"),
+    "edl": ("EXPORT_EDL", "EXPORT_NONE", ".edl"),
+}
+
+# 書き出したファイルから得られるアイテムのフィールド（それ以外はAPIで取得する）
+FILE_FIELDS = ("name", "start", "end", "duration", "source_start", "source_end")
+
+
+def covers_track(export_format, track_type, track_index):
+    """
+    書き出したファイルにトラックが含まれるか（含まれないトラックはAPIで取得する）
+
+    Args:
+        export_format: EXPORT_FORMATS のキー
+        track_type: トラック種別
+        track_index: トラック番号
+
+    Returns:
+        bool
+    """
+    if export_format == "edl":
+        return track_type == "video" and track_index == 1
+    return track_type in ("video", "audio")
+
+
+_EDL_EVENT_RE = re.compile(
+    r"^\s*(\d+)\s+(\S+)\s+(\S+)\s+(C|D|W\d+|K\s*[BO]?)\s+(?:(\d+)\s+)?"
+    r"(\d\d[:;]\d\d[:;]\d\d[:;]\d\d)\s+(\d\d[:;]\d\d[:;]\d\d[:;]\d\d)\s+"
+    r"(\d\d[:;]\d\d[:;]\d\d[:;]\d\d)\s+(\d\d[:;]\d\d[:;]\d\d[:;]\d\d)")
+_EDL_CLIP_NAME_RE = re.compile(r"^\s*\*\s*FROM CLIP NAME:\s*(.*?)\s*$", re.IGNORECASE)
+
+# FCPXML でアイテムとして扱う要素
+_FCPXML_CLIPS = {"asset-clip", "clip", "video", "audio", "ref-clip", "sync-clip", "mc-clip", "title"}
+
+
+def _item(name, start, duration, source_start):
+    return {
+        "name": name,
+        "start": start,
+        "end": start + duration,
+        "duration": duration,
+        "source_start": source_start,
+        "source_end": source_start + duration,
+    }
+
+
+def timecode_frames(timecode, fps, drop_frame=False):
+    """
+    タイムコードをフレーム番号に変換（29.97 / 59.94 のドロップフレームにも対応）
+
+    Args:
+        timecode: "HH:MM:SS:FF" または "HH:MM:SS;FF"
+        fps: フレームレート
+        drop_frame: ドロップフレームのタイムコードか
+
+    Returns:
+        フレーム番号
+    """
+    hours, minutes, seconds, frames = (int(part) for part in re.split(r"[:;]", timecode))
+    nominal = max(1, int(round(fps)))
+    total = ((hours * 60 + minutes) * 60 + seconds) * nominal + frames
+    if drop_frame:
+        dropped = int(round(fps * 0.066666))
+        total_minutes = hours * 60 + minutes
+        total -= dropped * (total_minutes - total_minutes // 10)
+    return total
+
+
+def parse_edl(path, fps, start_frame):
+    """
+    CMX3600 形式のEDLを1行ずつ読み込む
+
+    Args:
+        path: EDLファイルのパス
+        fps: タイムラインのフレームレート
+        start_frame: タイムラインの開始フレーム (GetStartFrame())
+
+    Yields:
+        (トラック種別, トラック番号, アイテム)
+    """
+    drop_frame = False
+    pending = None
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("FCM:"):
+                drop_frame = "NON" not in line.upper()
+                continue
+            match = _EDL_EVENT_RE.match(line)
+            if match:
+                if pending is not None:
+                    yield pending
+                reel, channel = match.group(2), match.group(3).upper()
+                source_in, _, record_in, record_out = (timecode_frames(tc, fps, drop_frame)
+                                                       for tc in match.group(6, 7, 8, 9))
+                if "V" in channel:
+                    track = ("video", 1)
+                elif channel.startswith("A"):
+                    track = ("audio", int(channel[1:]) if channel[1:].isdigit() else 1)
+                else:
+                    pending = None
+                    continue
+                pending = (*track, _item(reel, record_in - start_frame, record_out - record_in, source_in))
+                continue
+            name = _EDL_CLIP_NAME_RE.match(line)
+            if name and pending is not None:
+                pending[2]["name"] = name.group(1)
+    if pending is not None:
+        yield pending
+
+
+def parse_frame_rate(value, default=24.0):
+    """
+    Resolveが返すフレームレートを数値にする
+
+    GetSetting("timelineFrameRate") や GetClipProperty("FPS") は "29.97 DF" のように
+    数値以外を含む文字列を返すことがあるため、先頭の数値だけを読みます。
+
+    Args:
+        value: フレームレート（数値または文字列）
+        default: 読めない場合の値
+
+    Returns:
+        フレームレート(float)
+    """
+    match = re.match(r"\s*(\d+(?:\.\d*)?|\.\d+)", str(value or ""))
+    if match is None or float(match.group(1)) <= 0:
+        return default
+    return float(match.group(1))
+
+
+def exact_rate(fps):
+    """
+    フレームレートを有理数にする（23.976 などのNTSCレートは 24000/1001 とする）
+
+    Args:
+        fps: フレームレート（数値または "23.976"、"29.97 DF" などの文字列）
+
+    Returns:
+        Fraction
+    """
+    fps = parse_frame_rate(fps)
+    ntsc = round(fps * 1.001)
+    if abs(fps - round(fps)) > 0.01 and abs(fps - ntsc / 1.001) < 0.01:
+        return Fraction(ntsc * 1000, 1001)
+    return Fraction(fps).limit_denominator(1000)
+
+
+def _fcpxml_time(value):
+    # "1001/24000s" や "10s" を秒数の Fraction にする
+    if not value:
+        return Fraction(0)
+    return Fraction(value.rstrip("s"))
+
+
+def parse_fcpxml(path, fps, start_frame):
+    """
+    FCPXMLを iterparse で要素ごとに読み込む
+
+    Args:
+        path: FCPXMLファイルのパス
+        fps: タイムラインのフレームレート
+        start_frame: タイムラインの開始フレーム (GetStartFrame())
+
+    Yields:
+        (トラック種別, トラック番号, アイテム)
+    """
+    fps = exact_rate(fps)
+    # (要素, タイムライン上の位置(秒), 要素内の時間軸の開始(秒)) のスタック
+    stack = []
+    in_spine = 0
+    for event, element in ElementTree.iterparse(path, events=("start", "end")):
+        tag = element.tag
+        if event == "end":
+            if tag == "spine":
+                in_spine -= 1
+            elif stack and stack[-1][0] is element:
+                stack.pop()
+                # 読み終えた要素は破棄してメモリを抑える
+                element.clear()
+            continue
+
+        if tag == "spine":
+            in_spine += 1
+            continue
+        if not in_spine or (tag not in _FCPXML_CLIPS and tag != "gap"):
+            continue
+
+        offset = _fcpxml_time(element.get("offset"))
+        local_start = _fcpxml_time(element.get("start"))
+        lane = element.get("lane")
+        if stack and lane is not None:
+            # 接続クリップの offset は親の要素内の時間軸での位置
+            _, parent_position, parent_start = stack[-1]
+            position = parent_position + offset - parent_start
+        elif stack:
+            # lane のない子要素（clip 内の video など）は親のアイテムの中身
+            stack.append((element, stack[-1][1], stack[-1][2]))
+            continue
+        else:
+            position = offset
+        stack.append((element, position, local_start))
+        if tag == "gap":
+            continue
+
+        lane = int(lane or 0)
+        track = ("video", lane + 1) if lane >= 0 else ("audio", -lane)
+        start = int(round(position * fps)) - start_frame
+        duration = int(round(_fcpxml_time(element.get("duration")) * fps))
+        yield (*track, _item(element.get("name", ""), start, duration, int(round(local_start * fps))))
+
+
+def _otio_hook(fps, obj):
+    # クリップなどを必要な値だけのタプルに変換し、メタデータなどは保持しない
+    schema = obj.get("OTIO_SCHEMA", "").split(".")[0]
+    if schema == "RationalTime":
+        # タイムラインと同じレートならフレーム数そのもの
+        rate = Fraction(obj["rate"]).limit_denominator(1001)
+        value = Fraction(obj["value"]).limit_denominator(1000)
+        return value if abs(float(rate - fps)) < 0.001 else value * fps / rate
+    if schema == "TimeRange":
+        return obj["start_time"], obj["duration"]
+    if schema in ("Clip", "Gap", "Transition"):
+        return schema.lower(), obj.get("name") or "", obj.get("source_range")
+    if schema == "Stack":
+        return "stack", obj.get("name") or "", obj.get("source_range"), obj.get("children", [])
+    if schema == "Track":
+        return "track", obj.get("kind", "Video"), obj.get("children", [])
+    if schema == "Timeline":
+        return "timeline", obj.get("tracks")
+    return None
+
+
+def parse_otio(path, fps, start_frame):
+    """
+    OTIOファイルを読み込む
+
+    Args:
+        path: OTIOファイルのパス
+        fps: タイムラインのフレームレート
+        start_frame: タイムラインの開始フレーム（OTIOの位置はトラックの先頭からのため使わない）
+
+    Yields:
+        (トラック種別, トラック番号, アイテム)
+    """
+    fps = exact_rate(fps)
+    with open(path, "r", encoding="utf-8") as f:
+        timeline = json.load(f, object_hook=lambda obj: _otio_hook(fps, obj))
+    if not isinstance(timeline, tuple) or timeline[0] != "timeline" or not timeline[1]:
+        raise ValueError("The exported OTIO file does not contain a timeline")
+    counts = {}
+    for track in timeline[1][3]:
+        if not isinstance(track, tuple) or track[0] != "track":
+            continue
+        track_type = "audio" if track[1] == "Audio" else "video"
+        counts[track_type] = counts.get(track_type, 0) + 1
+        position = 0
+        for kind, name, source_range, *_ in track[2]:
+            # トランジションはトラック上の時間を消費しない
+            if kind == "transition" or source_range is None:
+                continue
+            source_start, duration = source_range
+            frames = int(round(duration))
+            if kind in ("clip", "stack"):
+                yield track_type, counts[track_type], _item(name, position, frames, int(round(source_start)))
+            position += frames
+
+
+PARSERS = {
+    "otio": parse_otio,
+    "fcpxml": parse_fcpxml,
+    "edl": parse_edl,
+}
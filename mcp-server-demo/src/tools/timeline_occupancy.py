@@ -0,0 +1,203 @@
+"""
+タイムラインのトラック占有状況インデックス
+
+トラックごとのクリップ区間 [start, end) をソート済みリストで保持し、
+重なり判定や空き位置の検索を GetItemListInTrack を呼び直さずに
+二分探索で行えるようにします。フレームはタイムライン先頭を0とした相対値です。
+"""
+
+import bisect
+import threading
+
+
+class TrackOccupancy:
+    """1トラック分のクリップ区間インデックス"""
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    @property
+    def end(self):
+        """トラック上の最後のクリップの終了フレーム（空の場合は0）"""
+        return self._ends[-1] if self._ends else 0
+
+    def add(self, start, end):
+        """区間を追加"""
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+
+    def matches(self, intervals):
+        """保持している区間が intervals と同じか"""
+        intervals = sorted(intervals)
+        return ([start for start, _ in intervals] == self._starts
+                and [end for _, end in intervals] == self._ends)
+
+    def overlaps(self, start, end):
+        """[start, end) が既存のクリップと重なるかどうか"""
+        i = bisect.bisect_right(self._ends, start)
+        return i < len(self._starts) and self._starts[i] < end
+
+    def first_free_slot(self, frame, duration):
+        """
+        frame 以降で duration フレーム分の空きがある最初の位置を検索
+
+        Args:
+            frame: 検索開始フレーム
+            duration: 必要なフレーム数
+
+        Returns:
+            空き区間の開始フレーム
+        """
+        position = frame
+        i = bisect.bisect_right(self._ends, position)
+        while i < len(self._starts) and self._starts[i] < position + duration:
+            position = max(position, self._ends[i])
+            i += 1
+        return position
+
+
+class _TimelineEntry:
+    """1タイムライン分のトラックインデックス"""
+
+    def __init__(self, start_frame, end_frame):
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.tracks = {}
+
+
+class OccupancyIndex:
+    """
+    タイムラインごとのトラック占有状況インデックス
+
+    タイムラインは GetUniqueId() で識別し、GetEndFrame() の値を
+    シグネチャとして保持します。Resolve上で直接編集されて終了フレームが
+    変わった場合はタイムライン全体を破棄し、次回アクセス時に再構築します。
+    トラックは取得のたびに GetItemListInTrack() のアイテム数と区間数を比べ、
+    途中のクリップが削除・追加されて数が変わったトラックはその一覧から再構築します
+    （アイテムの位置は読まないため、数の変わらない移動やトリムは変更フィードの
+    照合 reconcile() か invalidate() まで反映されません）。
+    ツール自身による編集は record_added() で差分反映します。
+    """
+
+    def __init__(self):
+        self._timelines = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def tracks(self, timeline, track_indices, track_type="video"):
+        """
+        トラックの占有状況を取得（未構築またはアイテム数の変わったトラックは GetItemListInTrack から構築）
+
+        Args:
+            timeline: 対象のタイムライン
+            track_indices: トラック番号 (1始まり) のリスト
+            track_type: トラック種別 ("video", "audio", "subtitle")
+
+        Returns:
+            トラック番号 → TrackOccupancy の辞書
+        """
+        with self._lock:
+            entry = self._entry(timeline)
+            result = {}
+            for track_index in track_indices:
+                key = (track_type, track_index)
+                occupancy = entry.tracks.get(key)
+                # 一覧の取得は1回の呼び出しで済み、各アイテムの開始・終了を読むのは再構築するときだけ
+                items = timeline.GetItemListInTrack(track_type, track_index) or []
+                if occupancy is None or len(occupancy) != len(items):
+                    occupancy = TrackOccupancy(
+                        (item.GetStart() - entry.start_frame, item.GetEnd() - entry.start_frame)
+                        for item in items
+                    )
+                    entry.tracks[key] = occupancy
+                    self.builds += 1
+                result[track_index] = occupancy
+            return result
+
+    def record_added(self, timeline, intervals, track_type="video"):
+        """
+        ツールで追加したクリップ区間を反映
+
+        Args:
+            timeline: 対象のタイムライン
+            intervals: (track_index, start, end) のリスト
+            track_type: トラック種別
+        """
+        with self._lock:
+            entry = self._timelines.get(timeline.GetUniqueId())
+            if entry is None:
+                return
+            for track_index, start, end in intervals:
+                occupancy = entry.tracks.get((track_type, track_index))
+                if occupancy is not None:
+                    occupancy.add(start, end)
+            entry.end_frame = timeline.GetEndFrame()
+
+    def reconcile(self, timeline_id, track_intervals):
+        """
+        保持している区間が実際のアイテム区間と一致しないトラックだけを破棄
+
+        ツールの編集は record_added() で反映済みのため一致し、インデックスは再構築されません。
+
+        Args:
+            timeline_id: 対象タイムラインの GetUniqueId()
+            track_intervals: {(トラック種別, トラック番号): [(開始, 終了)]}
+
+        Returns:
+            破棄したトラックの数
+        """
+        with self._lock:
+            entry = self._timelines.get(timeline_id)
+            if entry is None:
+                return 0
+            dropped = 0
+            for key, intervals in track_intervals.items():
+                occupancy = entry.tracks.get(key)
+                if occupancy is not None and not occupancy.matches(intervals):
+                    del entry.tracks[key]
+                    dropped += 1
+            return dropped
+
+    def invalidate(self, timeline=None):
+        """
+        インデックスを破棄
+
+        Args:
+            timeline: 対象タイムライン（Noneの場合はすべて）
+        """
+        with self._lock:
+            if timeline is None:
+                self._timelines.clear()
+            else:
+                self._timelines.pop(timeline.GetUniqueId(), None)
+
+    def _entry(self, timeline):
+        timeline_id = timeline.GetUniqueId()
+        end_frame = timeline.GetEndFrame()
+        entry = self._timelines.get(timeline_id)
+        if entry is None or entry.end_frame != end_frame:
+            entry = _TimelineEntry(timeline.GetStartFrame(), end_frame)
+            self._timelines[timeline_id] = entry
+        return entry
+
+
+# すべてのツールで共有するインデックス
+occupancy_index = OccupancyIndex()
+
+
+def get_occupancy_index():
+    """
+    共有のトラック占有状況インデックスを取得
+
+    Returns:
+        OccupancyIndexインスタンス
+    """
+    return occupancy_index
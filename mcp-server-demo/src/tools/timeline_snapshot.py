@@ -0,0 +1,283 @@
+"""
+タイムライン全体のスナップショット（トラック・アイテム・プロパティ）のキャッシュ
+
+get_timeline_snapshot ツール用に、タイムラインごと (GetUniqueId()) に
+トラックのアイテム一覧と取得済みのフィールド値を保持します。
+クライアントが要求したフィールドだけをアイテムごとに1回だけ取得し、
+ページ単位で返します。
+
+キャッシュは次の場合に破棄されます。
+- このサーバーのツールがタイムラインを編集したとき (invalidate())
+- GetEndFrame() が変わったとき（Resolve上で直接編集された場合の検出）
+- 最大保持時間を過ぎたとき（終了フレームが変わらない編集への備え）
+"""
+
+import threading
+import time
+
+# スナップショットの最大保持時間(秒)
+SNAPSHOT_MAX_AGE = 60.0
+
+# 既定で取得するトラック種別
+SNAPSHOT_TRACK_TYPES = ("video", "audio", "subtitle")
+
+# 既定で取得するフィールド
+DEFAULT_SNAPSHOT_FIELDS = ("name", "start", "end", "duration")
+
+
+def _relative(getter):
+    # タイムラインの開始フレームを0とした位置に変換
+    return lambda item, start_frame: getter(item) - start_frame
+
+
+def _clip_properties(item, start_frame):
+    media_pool_item = item.GetMediaPoolItem()
+    return media_pool_item.GetClipProperty() if media_pool_item else {}
+
+
+# フィールド名 → 値の取得関数 (item, タイムラインの開始フレーム)
+ITEM_FIELDS = {
+    "name": lambda item, start_frame: item.GetName(),
+    "unique_id": lambda item, start_frame: item.GetUniqueId(),
+    "start": _relative(lambda item: item.GetStart()),
+    "end": _relative(lambda item: item.GetEnd()),
+    "duration": lambda item, start_frame: item.GetDuration(),
+    "left_offset": lambda item, start_frame: item.GetLeftOffset(),
+    "right_offset": lambda item, start_frame: item.GetRightOffset(),
+    "source_start": lambda item, start_frame: item.GetSourceStartFrame(),
+    "source_end": lambda item, start_frame: item.GetSourceEndFrame(),
+    "clip_color": lambda item, start_frame: item.GetClipColor(),
+    "properties": lambda item, start_frame: item.GetProperty(),
+    "clip_properties": _clip_properties,
+}
+
+
+def parse_fields(fields):
+    """
+    要求されたフィールドを (フィールド名, 辞書フィールドのキーまたはNone) に分解
+
+    "properties.ZoomX" のように指定すると GetProperty() の結果から
+    ZoomX だけを返します（取得は1回の GetProperty() で行います）。
+
+    Args:
+        fields: フィールド名のリスト
+
+    Returns:
+        [(出力名, フィールド名, キーまたはNone)]
+
+    Raises:
+        ValueError: 不明なフィールドが含まれる場合
+    """
+    parsed = []
+    for field in fields:
+        name, _, key = field.partition(".")
+        if name not in ITEM_FIELDS or (key and name not in ("properties", "clip_properties")):
+            raise ValueError(f"Unknown field '{field}'. Available fields: {', '.join(ITEM_FIELDS)} "
+                             f"(or properties.<key> / clip_properties.<key>)")
+        parsed.append((field, name, key or None))
+    return parsed
+
+
+class _TrackSnapshot:
+    """1トラック分のアイテムハンドルと取得済みフィールド"""
+
+    def __init__(self, items):
+        self.items = items
+        self.rows = [{} for _ in items]
+
+
+class _TimelineSnapshot:
+    def __init__(self, generation, start_frame, end_frame):
+        self.generation = generation
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.created_at = time.monotonic()
+        self.track_counts = {}
+        self.tracks = {}
+
+
+class SnapshotCache:
+    """
+    タイムラインごとのスナップショットのキャッシュ
+
+    generation はスナップショットを作り直すたびに増える番号で、
+    ページングのカーソルが作成後に古くなっていないかの確認に使います。
+    """
+
+    def __init__(self, max_age=SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self._timelines = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.builds = 0
+        self.field_fetches = 0
+        self.field_hits = 0
+
+    def page(self, timeline, fields, track_types, cursor=None, page_size=200, refresh=False):
+        """
+        スナップショットの1ページ分を取得
+
+        トラックは track_types の順、同じ種別ではトラック番号順に並べ、
+        アイテム数が page_size に達したところでページを区切ります。
+
+        Args:
+            timeline: 対象のタイムライン
+            fields: parse_fields() の結果
+            track_types: 対象のトラック種別のリスト
+            cursor: 前のページの next_cursor（最初のページはNone）
+            page_size: 1ページあたりのアイテム数の上限
+            refresh: キャッシュを破棄して取得し直すか
+
+        Returns:
+            スナップショットのページ（辞書）
+
+        Raises:
+            ValueError: カーソルが不正、またはスナップショットが作り直されて古くなった場合
+        """
+        with self._lock:
+            timeline_id = timeline.GetUniqueId()
+            if refresh:
+                self._timelines.pop(timeline_id, None)
+            snapshot = self._snapshot(timeline, timeline_id)
+
+            position = (track_types[0], 1, 0) if track_types else None
+            if cursor:
+                generation, position = _parse_cursor(cursor)
+                if generation != snapshot.generation:
+                    raise ValueError("The timeline changed since this cursor was issued; "
+                                     "request the snapshot again without a cursor")
+                if position[0] not in track_types:
+                    raise ValueError(f"The cursor points to '{position[0]}' tracks, which are not in track_types")
+
+            tracks = []
+            remaining = page_size
+            next_cursor = None
+            for track_type in track_types[track_types.index(position[0]):] if position else []:
+                if track_type not in snapshot.track_counts:
+                    snapshot.track_counts[track_type] = timeline.GetTrackCount(track_type) or 0
+                first_track = position[1] if track_type == position[0] else 1
+                for track_index in range(first_track, snapshot.track_counts[track_type] + 1):
+                    if remaining <= 0:
+                        next_cursor = _format_cursor(snapshot.generation, track_type, track_index, 0)
+                        break
+                    track = self._track(timeline, snapshot, track_type, track_index)
+                    offset = position[2] if (track_type, track_index) == position[:2] else 0
+                    end = min(len(track.items), offset + remaining)
+                    tracks.append({
+                        "type": track_type,
+                        "index": track_index,
+                        "item_count": len(track.items),
+                        "items": [self._row(track, i, fields, snapshot.start_frame) for i in range(offset, end)],
+                    })
+                    remaining -= end - offset
+                    if end < len(track.items):
+                        next_cursor = _format_cursor(snapshot.generation, track_type, track_index, end)
+                        break
+                if next_cursor:
+                    break
+
+            return {
+                "timeline": {
+                    "name": timeline.GetName(),
+                    "unique_id": timeline_id,
+                    "start_frame": snapshot.start_frame,
+                    "end_frame": snapshot.end_frame - snapshot.start_frame,
+                },
+                "tracks": tracks,
+                "next_cursor": next_cursor,
+            }
+
+    def invalidate(self, timeline=None):
+        """
+        スナップショットを破棄
+
+        Args:
+            timeline: 対象タイムライン（Noneの場合はすべて）
+        """
+        with self._lock:
+            if timeline is None:
+                self._timelines.clear()
+            else:
+                self._timelines.pop(timeline.GetUniqueId(), None)
+
+    def invalidate_tracks(self, timeline_id, tracks):
+        """
+        指定したトラックを読み込み済みのスナップショットだけを破棄
+
+        Args:
+            timeline_id: 対象タイムラインの GetUniqueId()
+            tracks: (トラック種別, トラック番号) の集合
+        """
+        with self._lock:
+            snapshot = self._timelines.get(timeline_id)
+            if snapshot is not None and any(track in snapshot.tracks for track in tracks):
+                # カーソルが古くなったことを検出できるよう、トラック単位ではなく作り直す
+                del self._timelines[timeline_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "timelines": len(self._timelines),
+                "builds": self.builds,
+                "field_fetches": self.field_fetches,
+                "field_hits": self.field_hits,
+            }
+
+    def _snapshot(self, timeline, timeline_id):
+        end_frame = timeline.GetEndFrame()
+        snapshot = self._timelines.get(timeline_id)
+        if (snapshot is None or snapshot.end_frame != end_frame
+                or time.monotonic() - snapshot.created_at > self.max_age):
+            self._generation += 1
+            snapshot = _TimelineSnapshot(self._generation, timeline.GetStartFrame(), end_frame)
+            self._timelines[timeline_id] = snapshot
+            self.builds += 1
+        return snapshot
+
+    def _track(self, timeline, snapshot, track_type, track_index):
+        key = (track_type, track_index)
+        track = snapshot.tracks.get(key)
+        if track is None:
+            track = snapshot.tracks[key] = _TrackSnapshot(timeline.GetItemListInTrack(track_type, track_index) or [])
+        return track
+
+    def _row(self, track, i, fields, start_frame):
+        values = track.rows[i]
+        row = {"index": i}
+        for output_name, name, key in fields:
+            if name in values:
+                self.field_hits += 1
+            else:
+                values[name] = ITEM_FIELDS[name](track.items[i], start_frame)
+                self.field_fetches += 1
+            value = values[name]
+            if key is not None:
+                value = value.get(key) if isinstance(value, dict) else None
+            row[output_name] = value
+        return row
+
+
+def _format_cursor(generation, track_type, track_index, offset):
+    return f"{generation}:{track_type}:{track_index}:{offset}"
+
+
+def _parse_cursor(cursor):
+    try:
+        generation, track_type, track_index, offset = cursor.split(":")
+        return int(generation), (track_type, int(track_index), int(offset))
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+# すべてのツールで共有するキャッシュ
+snapshot_cache = SnapshotCache()
+
+
+def get_snapshot_cache():
+    """
+    共有のスナップショットキャッシュを取得
+
+    Returns:
+        SnapshotCacheインスタンス
+    """
+    return snapshot_cache
@@ -2,7 +2,525 @@
 DaVinci Resolve タイムライン関連のツール
 """
 
-from .base import get_resolve_instance
+import asyncio
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, NotRequired, TypedDict
+from xml.etree.ElementTree import ParseError
+
+from fastmcp.tools.tool import ToolResult
+from fastmcp.utilities.types import Image
+from mcp.types import TextContent
+
+from .audio_analysis import AUDIO_CUT_MODES, analyze_audio
+from .base import cached, invalidates
+from .executor import call_resolve
+from .frame_preview import (DEFAULT_PREVIEW_SIZE, PREVIEW_FORMATS, frames_to_timecode, get_preview_cache,
+                            get_preview_pool, render_preview, resolve_format, timecode_to_frames)
+from .item_properties import PropertyRule, parse_resolution
+from .marker_sync import PRUNE_MODES, MarkerIndex, apply_marker_sync, normalize_markers, plan_marker_sync
+from .media_pool_index import get_clip_index
+from .metrics import CallCounter
+from .resolve_pool import get_resolve_pool
+from .timeline_changes import TIMELINE_EDIT_TAG
+from .timeline_export import EXPORT_FORMATS, FILE_FIELDS, PARSERS, covers_track, parse_frame_rate
+from .timeline_occupancy import TrackOccupancy, get_occupancy_index
+from .timeline_snapshot import (DEFAULT_SNAPSHOT_FIELDS, ITEM_FIELDS, SNAPSHOT_TRACK_TYPES, get_snapshot_cache,
+                                parse_fields)
+
+
+# execute_batch で1回に実行できる操作数の上限
+MAX_BATCH_OPERATIONS = 1000
+
+# execute_batch 全体のタイムアウト(秒)。キュー待ち時間も含む
+BATCH_CALL_TIMEOUT = 300.0
+
+# build_timeline で1回に配置できるクリップ数の上限
+MAX_BUILD_CLIPS = 10000
+
+# get_timeline_snapshot の1ページあたりのアイテム数の上限
+MAX_SNAPSHOT_PAGE_SIZE = 1000
+
+# sync_markers で1回に指定できるマーカー数の上限
+MAX_SYNC_MARKERS = 20000
+
+# get_markers の結果を保持する秒数（このサーバー経由の編集では即座に破棄される）
+MARKER_CACHE_TTL = 5.0
+
+# get_frame_preview の画像サイズの上限(ピクセル)
+MAX_PREVIEW_SIZE = 1920
+
+# apply_item_properties の結果に含める変更例の数と失敗した書き込みの数
+PROPERTY_CHANGE_SAMPLES = 5
+MAX_REPORTED_FAILURES = 20
+
+# auto_cut_from_audio の結果に含めるカットの数
+AUTO_CUT_SAMPLES = 10
+
+# export_timeline_structure の既定のトラック種別（字幕トラックは書き出したファイルに含まれない）
+EXPORT_TRACK_TYPES = ("video", "audio")
+
+
+class ClipPlacement(TypedDict):
+    """add_clips_to_timeline に渡すクリップ配置"""
+    clip_name: str
+    start_frame: int
+    duration_in_frames: int
+    track_index: NotRequired[int]
+
+
+class TimelineClip(TypedDict):
+    """build_timeline に渡すクリップ"""
+    clip_name: str
+    record_frame: NotRequired[int]
+    in_frame: NotRequired[int]
+    out_frame: NotRequired[int]
+    track_index: NotRequired[int]
+
+
+class TimelineItemRef(TypedDict):
+    """タイムライン上のアイテムの指定（そのフレームを含むアイテム）"""
+    track_index: int
+    frame: int
+    track_type: NotRequired[str]
+
+
+class MarkerSpec(TypedDict):
+    """sync_markers に渡すマーカー"""
+    frame: int
+    color: NotRequired[str]
+    name: NotRequired[str]
+    note: NotRequired[str]
+    duration: NotRequired[int]
+    custom_data: NotRequired[str]
+
+
+class ItemPropertyRule(TypedDict):
+    """apply_item_properties に渡すルール"""
+    fit: NotRequired[str]
+    bias: NotRequired[float | str]
+    vertical_bias: NotRequired[float | str]
+    crop: NotRequired[bool]
+    set: NotRequired[dict[str, Any]]
+    expressions: NotRequired[dict[str, str]]
+
+
+class BatchOperation(TypedDict):
+    """execute_batch に渡す操作"""
+    op: str
+    args: NotRequired[dict[str, Any]]
+
+
+def _build_append_plan(placements, occupancy):
+    """
+    クリップ配置から AppendToTimeline 用の clipInfo リストを作成
+    
+    recordFrameの不具合回避のため、各トラックで最後のクリップとの隙間を
+    同じクリップのダミーで埋めます。AppendToTimelineはトラックの末尾にしか
+    追加できないため、最後のクリップより前の配置は追加できません。
+    
+    Args:
+        placements: (MediaPoolItem, start_frame, duration_in_frames, track_index[, source_start]) のリスト
+                    （source_start はクリップ内の開始フレーム。省略時は0）
+        occupancy: トラック番号 → TrackOccupancy の辞書
+    
+    Returns:
+        (clip_infos, record_frames, rejected) のタプル
+        record_frames は clip_infos と同じ長さで、各クリップの配置フレーム（ダミーはNone）、
+        rejected は (placementのインデックス, 理由) のリスト
+    """
+    clip_infos = []
+    record_frames = []
+    rejected = []
+    track_cursors = {track_index: track.end for track_index, track in occupancy.items()}
+    
+    order = sorted(range(len(placements)), key=lambda i: (placements[i][3], placements[i][1]))
+    for i in order:
+        clip, start_frame, duration_in_frames, track_index, *source = placements[i]
+        source_start = source[0] if source else 0
+        if duration_in_frames <= 0:
+            rejected.append((i, "duration_in_frames must be a positive integer"))
+            continue
+        if start_frame < 0 or track_index < 1:
+            rejected.append((i, "start_frame must be >= 0 and track_index must be >= 1"))
+            continue
+        
+        end_frame = start_frame + duration_in_frames
+        cursor = track_cursors[track_index]
+        if start_frame < cursor:
+            track = occupancy[track_index]
+            if end_frame > track.end or track.overlaps(start_frame, end_frame):
+                rejected.append((i, f"overlaps another clip on track {track_index} (track ends at frame {cursor})"))
+            else:
+                rejected.append((i, f"falls in a gap before the last clip on track {track_index}; "
+                                    f"clips can only be appended at or after frame {cursor}"))
+            continue
+        
+        if start_frame > cursor:
+            clip_infos.append({
+                "mediaPoolItem": clip,
+                "startFrame": 0,
+                "endFrame": start_frame - cursor - 1,  # 隙間の長さ
+                'trackIndex': track_index,
+            })
+            record_frames.append(None)
+        
+        # recordFrameを指定しない - 自動的にダミーの次の位置に追加される
+        clip_infos.append({
+            "mediaPoolItem": clip,
+            "startFrame": source_start,
+            "endFrame": source_start + duration_in_frames - 1,
+            'trackIndex': track_index,
+        })
+        record_frames.append(start_frame)
+        track_cursors[track_index] = end_frame
+    
+    rejected.sort()
+    return clip_infos, record_frames, rejected
+
+
+def _append_and_remove_fillers(media_pool, timeline, clip_infos, record_frames):
+    """
+    clip_infos を1回のAppendToTimelineで追加し、ダミークリップを一括削除
+    
+    追加したクリップの区間はトラック占有状況インデックスに反映します。
+    
+    Args:
+        media_pool: メディアプール
+        timeline: 追加先のタイムライン
+        clip_infos: _build_append_plan で作成した clipInfo リスト
+        record_frames: 各 clipInfo の配置フレーム（ダミーはNone）
+    
+    Returns:
+        (追加されたダミー以外のTimelineItemリスト, エラーメッセージまたはNone) のタプル
+    """
+    if not clip_infos:
+        return [], None
+    
+    occupancy_index = get_occupancy_index()
+    get_snapshot_cache().invalidate(timeline)
+    
+    appended = media_pool.AppendToTimeline(clip_infos)
+    if not appended:
+        return [], "Failed to add clip to timeline"
+    if len(appended) != len(clip_infos):
+        # どれがダミーか特定できないため、無関係なクリップを消さないよう削除しない
+        occupancy_index.invalidate(timeline)
+        return list(appended), "Timeline returned an unexpected number of items; dummy clips were not removed"
+    
+    fillers = [item for item, frame in zip(appended, record_frames) if frame is None]
+    clips = [item for item, frame in zip(appended, record_frames) if frame is not None]
+    if fillers and not timeline.DeleteClips(fillers):
+        occupancy_index.invalidate(timeline)
+        return clips, "Failed to delete dummy clip (but main clip was added)"
+    
+    occupancy_index.record_added(timeline, [
+        (info["trackIndex"], frame, frame + info["endFrame"] - info["startFrame"] + 1)
+        for info, frame in zip(clip_infos, record_frames) if frame is not None
+    ])
+    return clips, None
+
+
+def _ensure_video_tracks(timeline, clip_infos):
+    """
+    clip_infos の配置先のビデオトラックが足りない場合に追加
+    
+    Returns:
+        エラーメッセージ（成功した場合はNone）
+    """
+    needed_tracks = max((info["trackIndex"] for info in clip_infos), default=0)
+    if not needed_tracks:
+        return None
+    track_count = timeline.GetTrackCount("video")
+    while track_count < needed_tracks:
+        if not timeline.AddTrack("video"):
+            return f"Failed to add video track {track_count + 1}"
+        track_count += 1
+    return None
+
+
+def _item_at_frame(items, starts, frame):
+    """
+    トラックのアイテムから指定フレームを含むアイテムを探す
+    
+    アイテムは開始位置順に並んでいるため、必要な位置の GetStart() だけを呼んで二分探索します。
+    
+    Args:
+        items: GetItemListInTrack() の結果
+        starts: 取得済みの GetStart() の値（インデックス → 開始フレーム）。探索中に追加される
+        frame: タイムラインの絶対フレーム
+    
+    Returns:
+        見つかったTimelineItem（見つからない場合はNone）
+    """
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if mid not in starts:
+            starts[mid] = items[mid].GetStart()
+        if starts[mid] <= frame:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo and frame < items[lo - 1].GetEnd():
+        return items[lo - 1]
+    return None
+
+
+def _marker_target(ctx, clip_name, item, search_subfolders):
+    """
+    マーカーを読み書きする対象を取得（エグゼキュータ上で実行）
+    
+    Args:
+        ctx: ResolveContext
+        clip_name: メディアプールのクリップ名（指定した場合はクリップが対象）
+        item: TimelineItemRef（指定した場合は現在のタイムラインのアイテムが対象）
+        search_subfolders: クリップをカレントフォルダのサブフォルダからも探すか
+    
+    Returns:
+        (対象, 説明) のタプル、またはエラーメッセージ
+    """
+    if not ctx.project:
+        return "No project is currently open"
+    if clip_name:
+        current_folder = ctx.current_folder
+        if not current_folder:
+            return "Failed to get current folder in media pool"
+        clip = get_clip_index().find_clip(current_folder, clip_name, recursive=search_subfolders)
+        if clip is None:
+            return f"Clip '{clip_name}' not found in media pool"
+        return clip, f"clip '{clip_name}'"
+    
+    timeline = ctx.timeline
+    if not timeline:
+        return "No timeline is currently open. Please open or create a timeline first."
+    if item is None:
+        return timeline, f"timeline '{timeline.GetName()}'"
+    
+    track_type = item.get("track_type", "video")
+    track_index = int(item.get("track_index", 1))
+    items = timeline.GetItemListInTrack(track_type, track_index) or []
+    found = _item_at_frame(items, {}, int(item["frame"]) + timeline.GetStartFrame())
+    if found is None:
+        return f"No clip at frame {item['frame']} on {track_type} track {track_index}"
+    return found, f"item '{found.GetName()}' on {track_type} track {track_index}"
+
+
+def _audio_cut_clip_infos(clip, regions, fps, clip_frames):
+    """
+    残す区間（秒）をサブクリップの clipInfo のリストにする
+    
+    Args:
+        clip: MediaPoolItem
+        regions: analyze_audio() の regions
+        fps: クリップのフレームレート
+        clip_frames: クリップのフレーム数（不明な場合はNone）
+    
+    Returns:
+        clipInfo のリスト（endFrame は区間の最後のフレーム）
+    """
+    clip_infos = []
+    for start, end in regions:
+        start_frame = int(math.floor(start * fps))
+        end_frame = int(math.ceil(end * fps)) - 1
+        if clip_frames is not None:
+            end_frame = min(end_frame, clip_frames - 1)
+        if clip_infos and start_frame <= clip_infos[-1]["endFrame"]:
+            # フレームに丸めて重なった区間はつなげる
+            clip_infos[-1]["endFrame"] = max(clip_infos[-1]["endFrame"], end_frame)
+            continue
+        if end_frame >= start_frame:
+            clip_infos.append({"mediaPoolItem": clip, "startFrame": start_frame, "endFrame": end_frame})
+    return clip_infos
+
+
+def _read_export(export_format, path, fps, start_frame, track_types):
+    """
+    書き出したファイルを読み込み、トラックごとのアイテムにまとめる（ワーカースレッドで実行）
+    
+    Returns:
+        {(トラック種別, トラック番号): [アイテム]}（アイテムは開始位置順）
+    """
+    tracks = {}
+    for track_type, track_index, item in PARSERS[export_format](path, fps, start_frame):
+        if track_type in track_types:
+            tracks.setdefault((track_type, track_index), []).append(item)
+    for items in tracks.values():
+        items.sort(key=lambda item: item["start"])
+    return tracks
+
+
+def _project_row(index, values, fields):
+    """取得した値から要求されたフィールドだけの行を作る（"properties.ZoomX" などはキーを取り出す）"""
+    row = {"index": index}
+    for output_name, name, key in fields:
+        value = values.get(name)
+        if key is not None:
+            value = value.get(key) if isinstance(value, dict) else None
+        row[output_name] = value
+    return row
+
+
+class _BatchError(Exception):
+    """execute_batch の1操作の失敗を示す例外"""
+
+
+class _BatchRunner:
+    """
+    execute_batch の操作を順番に実行するクラス（エグゼキュータ上で使用）
+    
+    タイムライン・メディアプール・カレントフォルダは最初に1回だけ取得したものを使い、
+    連続する add_clip 操作は1回の AppendToTimeline にまとめます。
+    """
+    
+    def __init__(self, timeline, media_pool, current_folder, search_subfolders):
+        self.timeline = timeline
+        self.media_pool = media_pool
+        self.current_folder = current_folder
+        self.search_subfolders = search_subfolders
+        self.created = {}
+        self._clips = {}
+        self._track_items = {}
+        self._start_frame = None
+    
+    def add_clips(self, run, stop_on_error):
+        """
+        連続する add_clip 操作をまとめて実行
+        
+        Args:
+            run: (操作のインデックス, args) のリスト
+            stop_on_error: 最初に失敗する操作より後の操作を実行しないか
+        
+        Returns:
+            {操作のインデックス: (成功したか, 結果またはエラーメッセージ)}
+        """
+        results = {}
+        placements = []
+        for index, args in run:
+            try:
+                placement = (args["clip_name"], int(args["start_frame"]), int(args["duration_in_frames"]),
+                             int(args.get("track_index", 1)))
+            except (KeyError, TypeError, ValueError) as e:
+                results[index] = (False, f"invalid arguments: {type(e).__name__}: {e}")
+                continue
+            clip = self._find_clip(placement[0])
+            if clip is None:
+                results[index] = (False, f"clip '{placement[0]}' not found")
+                continue
+            placements.append((index, (clip,) + placement[1:]))
+        
+        occupancy = get_occupancy_index().tracks(self.timeline, sorted({p[3] for _, p in placements if p[3] >= 1}))
+        clip_infos, record_frames, rejected = _build_append_plan([p for _, p in placements], occupancy)
+        for j, reason in rejected:
+            results[placements[j][0]] = (False, reason)
+        
+        if stop_on_error and results:
+            # 最初に失敗する操作より前の操作だけで計画し直す
+            first_failure = min(results)
+            results = {first_failure: results[first_failure]}
+            placements = [(index, p) for index, p in placements if index < first_failure]
+            clip_infos, record_frames, _ = _build_append_plan([p for _, p in placements], occupancy)
+        
+        rejected_indices = set(results)
+        error = _ensure_video_tracks(self.timeline, clip_infos)
+        if not error:
+            added, error = _append_and_remove_fillers(self.media_pool, self.timeline, clip_infos, record_frames)
+            # 計画に入った配置は同じトラックで重ならないため、(トラック, 開始フレーム) で操作と対応付けられる
+            # （同じ位置を指定して却下された操作は含めない）
+            indices = {(p[3], p[1]): index for index, p in placements if index not in rejected_indices}
+            placed = [(info["trackIndex"], frame) for info, frame in zip(clip_infos, record_frames) if frame is not None]
+            if len(added) == len(placed):
+                for item, key in zip(added, placed):
+                    self.created[indices[key]] = item
+        
+        for index, (clip, start_frame, duration_in_frames, track_index) in placements:
+            if index in rejected_indices:
+                continue
+            if index not in self.created:
+                results[index] = (False, error or "Failed to add clip to timeline")
+                continue
+            result = {"start_frame": start_frame, "duration_in_frames": duration_in_frames, "track_index": track_index}
+            if error:
+                result["warning"] = error
+            results[index] = (True, result)
+            self._track_items.pop(("video", track_index), None)
+        return results
+    
+    def run(self, op, args):
+        """
+        add_clip 以外の操作を1つ実行
+        
+        Returns:
+            操作の結果（失敗した場合は _BatchError を送出）
+        """
+        if op == "set_item_property":
+            item = self._find_item(args.get("item"))
+            properties = args.get("properties")
+            if not isinstance(properties, dict) or not properties:
+                raise _BatchError("properties must be a non-empty object")
+            failed = [key for key, value in properties.items() if not item.SetProperty(key, value)]
+            if failed:
+                raise _BatchError(f"failed to set properties: {', '.join(failed)}")
+            return {"updated": list(properties)}
+        
+        if op == "set_clip_color":
+            color = args.get("color")
+            if not color or not self._find_item(args.get("item")).SetClipColor(color):
+                raise _BatchError(f"failed to set clip color '{color}'")
+            return {"color": color}
+        
+        if op == "add_marker":
+            target = self._find_item(args["item"]) if "item" in args else self.timeline
+            frame = int(args.get("frame", 0))
+            color = args.get("color", "Blue")
+            if not target.AddMarker(frame, color, args.get("name", ""), args.get("note", ""),
+                                    int(args.get("duration", 1)), args.get("custom_data", "")):
+                raise _BatchError(f"failed to add marker at frame {frame} (a marker may already exist there)")
+            return {"frame": frame, "color": color}
+        
+        if op == "add_track":
+            track_type = args.get("track_type", "video")
+            if not self.timeline.AddTrack(track_type):
+                raise _BatchError(f"failed to add {track_type} track")
+            return {"track_type": track_type, "track_count": self.timeline.GetTrackCount(track_type)}
+        
+        raise _BatchError(f"unknown operation '{op}'")
+    
+    def _find_clip(self, clip_name):
+        if clip_name not in self._clips:
+            self._clips[clip_name] = get_clip_index().find_clip(
+                self.current_folder, clip_name, recursive=self.search_subfolders)
+        return self._clips[clip_name]
+    
+    def _find_item(self, ref):
+        """
+        操作の対象のTimelineItemを取得
+        
+        Args:
+            ref: 同じバッチの add_clip 操作のインデックス、または
+                 {"track_index": n, "frame": f, "track_type": "video"}（そのフレームを含むアイテム）
+        """
+        if isinstance(ref, int):
+            if ref not in self.created:
+                raise _BatchError(f"operation {ref} did not add a clip")
+            return self.created[ref]
+        if not isinstance(ref, dict) or "frame" not in ref:
+            raise _BatchError("item must be an add_clip operation index or {track_index, frame}")
+        
+        key = (ref.get("track_type", "video"), int(ref.get("track_index", 1)))
+        if self._start_frame is None:
+            self._start_frame = self.timeline.GetStartFrame()
+        if key not in self._track_items:
+            self._track_items[key] = (self.timeline.GetItemListInTrack(*key) or [], {})
+        items, starts = self._track_items[key]
+        item = _item_at_frame(items, starts, int(ref["frame"]) + self._start_frame)
+        if item is None:
+            raise _BatchError(f"no clip at frame {ref['frame']} on {key[0]} track {key[1]}")
+        return item
 
 
 def register_timeline_tools(mcp):
@@ -13,8 +531,15 @@ def register_timeline_tools(mcp):
         mcp: FastMCPインスタンス
     """
 
-    @mcp.tool()
-    def add_solid_color_to_timeline(start_frame: int = 0, duration_in_frames: int = 50, clip_name: str = "Solid Color") -> str:
+    @mcp.resource("davinci://stats/clip-index")
+    def clip_index_stats() -> dict:
+        """Hit/miss counters of the shared media pool clip name index"""
+        return get_clip_index().stats()
+
+    @mcp.tool(tags={TIMELINE_EDIT_TAG})
+    @invalidates("timeline")
+    async def add_solid_color_to_timeline(start_frame: int = 0, duration_in_frames: int = 50, clip_name: str = "Solid Color",
+                                          search_subfolders: bool = False) -> str:
         """
         Add a Solid Color clip from media pool to the current timeline
         
@@ -29,86 +554,1073 @@ def register_timeline_tools(mcp):
                                Must be a positive integer. (default: 50)
             clip_name: The exact name of the clip to search for in the current media pool folder.
                       The clip must exist in the media pool before adding. (default: "Solid Color")
+            search_subfolders: If True, also search the subfolders of the current media pool folder.
+                               (default: False)
         
         Returns:
             Success or error message
         """
-        resolve = get_resolve_instance()
-        if resolve is None:
-            return "No Resolve instance available"
+        def add_clip(ctx):
+            try:
+                # Get current timeline (キャッシュ済みのハンドルを使用)
+                timeline = ctx.timeline
+                if not timeline:
+                    if not ctx.project:
+                        return "No project is currently open"
+                    return "No timeline is currently open. Please open or create a timeline first."
+                
+                # Get media pool and search for the clip
+                media_pool = ctx.media_pool
+                if not media_pool:
+                    return "Failed to get media pool"
+                
+                current_folder = ctx.current_folder
+                if not current_folder:
+                    return "Failed to get current folder in media pool"
+                
+                # Search for the target clip (共有インデックスで検索)
+                target_clip = get_clip_index().find_clip(current_folder, clip_name, recursive=search_subfolders)
+                
+                if not target_clip:
+                    return f"Clip '{clip_name}' not found in current media pool folder"
+                
+                # recordFrameの不具合回避: ダミークリップ方式を使用
+                # ダミークリップと本来のクリップを1回のAppendToTimelineで追加し、
+                # 作成したダミークリップだけを削除する
+                occupancy = get_occupancy_index().tracks(timeline, [1])
+                clip_infos, record_frames, rejected = _build_append_plan(
+                    [(target_clip, start_frame, duration_in_frames, 1)], occupancy)
+                if rejected:
+                    return f"Invalid placement: {rejected[0][1]}"
+                
+                _, error = _append_and_remove_fillers(media_pool, timeline, clip_infos, record_frames)
+                if error:
+                    return error
+                
+                timeline_name = timeline.GetName()
+                return f"Successfully added '{clip_name}' to timeline '{timeline_name}' at frame {start_frame} (duration: {duration_in_frames} frames)"
+                    
+            except Exception as e:
+                return f"Error: {type(e).__name__}: {str(e)}"
         
-        try:
-            # Get current project
-            project = resolve.GetProjectManager().GetCurrentProject()
-            if not project:
-                return "No project is currently open"
+        return await call_resolve(add_clip)
+
+    @mcp.tool(tags={TIMELINE_EDIT_TAG})
+    @invalidates("timeline")
+    async def add_clips_to_timeline(placements: list[ClipPlacement], search_subfolders: bool = False) -> str:
+        """
+        Add many media pool clips to the current timeline in one operation
+        
+        All placements are planned first and then added with a single append, so
+        building an edit with hundreds of cues is much faster than calling
+        add_solid_color_to_timeline once per clip. Clips are appended after the last
+        existing clip on each track; use find_free_timeline_slot to pick free positions.
+        
+        Args:
+            placements: List of clip placements. Each placement has:
+                        clip_name: The exact name of the clip in the current media pool folder.
+                        start_frame: The frame where the clip should start (0 is the beginning of the timeline).
+                        duration_in_frames: The length of the clip in frames (positive integer).
+                        track_index: The video track number, starting at 1. (default: 1)
+                        Clips on the same track must not overlap.
+            search_subfolders: If True, also search the subfolders of the current media pool folder.
+                               (default: False)
+        
+        Returns:
+            Summary of the added clips and any placements that were skipped
+        """
+        if not placements:
+            return "No placements specified"
+        
+        def add_clips(ctx):
+            try:
+                timeline = ctx.timeline
+                if not timeline:
+                    if not ctx.project:
+                        return "No project is currently open"
+                    return "No timeline is currently open. Please open or create a timeline first."
+                
+                media_pool = ctx.media_pool
+                if not media_pool:
+                    return "Failed to get media pool"
+                
+                current_folder = ctx.current_folder
+                if not current_folder:
+                    return "Failed to get current folder in media pool"
+                
+                # クリップ名ごとに1回だけ検索
+                clip_index = get_clip_index()
+                clips_by_name = {}
+                for placement in placements:
+                    name = placement["clip_name"]
+                    if name not in clips_by_name:
+                        clips_by_name[name] = clip_index.find_clip(current_folder, name, recursive=search_subfolders)
+                
+                resolved = []
+                skipped = []
+                for i, placement in enumerate(placements):
+                    clip = clips_by_name[placement["clip_name"]]
+                    if clip is None:
+                        skipped.append((i, f"clip '{placement['clip_name']}' not found"))
+                        continue
+                    resolved.append((i, (clip, placement["start_frame"], placement["duration_in_frames"],
+                                         placement.get("track_index", 1))))
+                
+                track_indices = {p[3] for _, p in resolved if p[3] >= 1}
+                occupancy = get_occupancy_index().tracks(timeline, sorted(track_indices))
+                clip_infos, record_frames, rejected = _build_append_plan([p for _, p in resolved], occupancy)
+                skipped.extend((resolved[j][0], reason) for j, reason in rejected)
+                skipped.sort()
+                
+                # 必要なビデオトラックを追加
+                error = _ensure_video_tracks(timeline, clip_infos)
+                if error:
+                    return error
+                
+                added, error = _append_and_remove_fillers(media_pool, timeline, clip_infos, record_frames)
+                
+                lines = [f"Added {len(added)} of {len(placements)} clips to timeline '{timeline.GetName()}'"]
+                if error:
+                    lines.append(error)
+                for i, reason in skipped:
+                    lines.append(f"Skipped placement {i}: {reason}")
+                return "\n".join(lines)
+        
+            except Exception as e:
+                return f"Error: {type(e).__name__}: {str(e)}"
+        
+        return await call_resolve(add_clips)
+
+    @mcp.tool(tags={TIMELINE_EDIT_TAG})
+    @invalidates("timeline")
+    async def build_timeline(name: str, clips: list[TimelineClip], search_subfolders: bool = False) -> dict:
+        """
+        Create a new timeline from an ordered edit description in one operation
+        
+        All clip names are resolved with one media pool lookup and the whole edit is validated before
+        anything is created. When every clip sits back to back on track 1, the timeline is created with
+        a single CreateTimelineFromClips call; otherwise it is created empty and all clips on all tracks
+        are added with a single append. The new timeline becomes the current timeline.
+        
+        Args:
+            name: Name of the new timeline
+            clips: Clips in edit order. Each clip has:
+                   clip_name: Exact name of the clip in the current media pool folder
+                   in_frame: First source frame to use (default: 0)
+                   out_frame: Source frame after the last one to use (default: end of the clip)
+                   record_frame: Timeline position (0 = timeline start; default: right after the
+                                 previous clip on the same track)
+                   track_index: Video track number, starting at 1 (default: 1)
+                   Clips on the same track must not overlap.
+            search_subfolders: Also search subfolders of the current media pool folder
+        
+        Returns:
+            The new timeline, the number of clips placed, how it was built, and the elapsed time and
+            number of Resolve API calls per stage (lookup, create, append)
+        """
+        if not clips:
+            return {"error": "No clips specified"}
+        if len(clips) > MAX_BUILD_CLIPS:
+            return {"error": f"Too many clips ({len(clips)}); the limit is {MAX_BUILD_CLIPS}"}
+        errors = []
+        for i, clip in enumerate(clips):
+            if clip.get("in_frame", 0) < 0 or clip.get("track_index", 1) < 1 or clip.get("record_frame", 0) < 0:
+                errors.append(f"clips[{i}]: in_frame and record_frame must be >= 0 and track_index >= 1")
+            elif clip.get("out_frame") is not None and clip["out_frame"] <= clip.get("in_frame", 0):
+                errors.append(f"clips[{i}]: out_frame must be greater than in_frame")
+        if errors:
+            return {"error": "Invalid clips", "details": errors}
+        
+        def build(ctx):
+            stages = {}
             
-            # Get current timeline
-            timeline = project.GetCurrentTimeline()
-            if not timeline:
-                return "No timeline is currently open. Please open or create a timeline first."
+            def stage(stage_name, started, counter):
+                stages[stage_name] = {"ms": round((time.perf_counter() - started) * 1000, 3),
+                                      "api_calls": counter.calls}
             
-            # Get media pool and search for the clip
-            media_pool = project.GetMediaPool()
-            if not media_pool:
-                return "Failed to get media pool"
+            if not ctx.project:
+                return "No project is currently open"
+            media_pool = ctx.media_pool
+            current_folder = ctx.current_folder
+            if not media_pool or not current_folder:
+                return "Failed to get the media pool"
             
-            current_folder = media_pool.GetCurrentFolder()
-            if not current_folder:
-                return "Failed to get current folder in media pool"
+            started = time.perf_counter()
+            with CallCounter() as counter:
+                names = {clip["clip_name"] for clip in clips}
+                found = get_clip_index().find_clips(current_folder, names, recursive=search_subfolders)
+                missing = sorted(names - found.keys())
+                if missing:
+                    return {"error": f"{len(missing)} clips not found in media pool",
+                            "missing": missing[:MAX_REPORTED_FAILURES]}
+                # out_frame が省略されたクリップだけ長さを読む（同じクリップは1回）
+                lengths = {}
+                for clip in clips:
+                    if clip.get("out_frame") is None and clip["clip_name"] not in lengths:
+                        frames = found[clip["clip_name"]].GetClipProperty("Frames")
+                        lengths[clip["clip_name"]] = int(frames) if str(frames or "").isdigit() else 0
+            stage("lookup", started, counter)
             
-            clip_list = current_folder.GetClipList()
-            if not clip_list:
-                return "No clips found in current media pool folder"
+            placements = []
+            cursors = {}
+            for clip in clips:
+                track_index = clip.get("track_index", 1)
+                in_frame = clip.get("in_frame", 0)
+                out_frame = clip.get("out_frame")
+                if out_frame is None:
+                    out_frame = lengths[clip["clip_name"]]
+                record_frame = clip.get("record_frame")
+                if record_frame is None:
+                    record_frame = cursors.get(track_index, 0)
+                cursors[track_index] = record_frame + out_frame - in_frame
+                placements.append((found[clip["clip_name"]], record_frame, out_frame - in_frame, track_index,
+                                   in_frame))
+            occupancy = {track_index: TrackOccupancy() for track_index in cursors}
+            clip_infos, record_frames, rejected = _build_append_plan(placements, occupancy)
+            if rejected:
+                return {"error": "The edit cannot be built; nothing was created",
+                        "details": [f"clips[{i}]: {reason}" for i, reason in rejected[:MAX_REPORTED_FAILURES]]}
             
-            # Search for the target clip
-            target_clip = None
-            for clip in clip_list:
-                if clip.GetClipProperty('Clip Name') == clip_name:
-                    target_clip = clip
-                    break
+            # トラック1だけに隙間なく並ぶ場合は CreateTimelineFromClips の1回で済む
+            single_call = set(cursors) == {1} and all(frame is not None for frame in record_frames)
+            started = time.perf_counter()
+            with CallCounter() as counter:
+                if single_call:
+                    infos = [{key: info[key] for key in ("mediaPoolItem", "startFrame", "endFrame")}
+                             for info in clip_infos]
+                    timeline = media_pool.CreateTimelineFromClips(name, infos)
+                else:
+                    timeline = media_pool.CreateEmptyTimeline(name)
+                if not timeline:
+                    return f"Failed to create timeline '{name}' (a timeline with that name may already exist)"
+                ctx.project.SetCurrentTimeline(timeline)
+                if single_call:
+                    placed = len(timeline.GetItemListInTrack("video", 1) or [])
+            stage("create", started, counter)
             
-            if not target_clip:
-                return f"Clip '{clip_name}' not found in current media pool folder"
+            result = {
+                "timeline": name,
+                "method": "CreateTimelineFromClips" if single_call else "AppendToTimeline",
+                "clips": len(clips),
+            }
+            if single_call:
+                result["placed"] = placed
+            else:
+                started = time.perf_counter()
+                with CallCounter() as counter:
+                    error = _ensure_video_tracks(timeline, clip_infos)
+                    added = []
+                    if not error:
+                        added, error = _append_and_remove_fillers(media_pool, timeline, clip_infos, record_frames)
+                stage("append", started, counter)
+                result["placed"] = len(added)
+                if error:
+                    result["error"] = error
+            result["fillers"] = sum(frame is None for frame in record_frames)
+            result["stages"] = stages
+            result["api_calls"] = sum(entry["api_calls"] for entry in stages.values())
+            return result
+        
+        result = await call_resolve(build, timeout=BATCH_CALL_TIMEOUT)
+        if isinstance(result, str):
+            return {"error": result}
+        return result
+
+    @mcp.tool()
+    async def find_free_timeline_slot(start_frame: int = 0, duration_in_frames: int = 50, track_index: int = 1) -> str:
+        """
+        Find the first free position on a video track of the current timeline
+        
+        Looks for the first frame at or after start_frame where a clip of the given
+        length fits without overlapping existing clips. Note that the clip placement
+        tools can only append after the last clip of a track, so a slot inside a gap
+        is only usable on another track or for planning. Track contents are cached: clips
+        added or deleted in Resolve are picked up on the next call, but a clip moved or
+        trimmed in Resolve (same number of clips, same timeline end) may not be until the
+        timeline change feed notices it.
+        
+        Args:
+            start_frame: The frame to start searching from (0 is the beginning of the timeline). (default: 0)
+            duration_in_frames: The length of the clip that needs to fit, in frames. (default: 50)
+            track_index: The video track number, starting at 1. (default: 1)
+        
+        Returns:
+            The first free frame and the frame where the track ends
+        """
+        if duration_in_frames <= 0 or start_frame < 0 or track_index < 1:
+            return "Invalid arguments: duration_in_frames must be positive, start_frame >= 0 and track_index >= 1"
+        
+        def find_slot(ctx):
+            try:
+                timeline = ctx.timeline
+                if not timeline:
+                    if not ctx.project:
+                        return "No project is currently open"
+                    return "No timeline is currently open. Please open or create a timeline first."
+                
+                track = get_occupancy_index().tracks(timeline, [track_index])[track_index]
+                slot = track.first_free_slot(start_frame, duration_in_frames)
+                return f"First free slot on video track {track_index}: frame {slot} (track ends at frame {track.end})"
+        
+            except Exception as e:
+                return f"Error: {type(e).__name__}: {str(e)}"
+        
+        return await call_resolve(find_slot)
+
+
+    @mcp.tool(tags={TIMELINE_EDIT_TAG})
+    @invalidates("timeline")
+    async def execute_batch(operations: list[BatchOperation], stop_on_error: bool = False,
+                            search_subfolders: bool = False) -> dict:
+        """
+        Run many timeline edits on the current timeline in one request
+        
+        Operations run in order, back-to-back, and consecutive add_clip operations are
+        appended together. Use this instead of calling single-clip tools hundreds of times.
+        
+        Args:
+            operations: Ordered list of operations, each {"op": name, "args": {...}}. Supported ops:
+                        add_clip: clip_name, start_frame, duration_in_frames, track_index (default 1).
+                                  Same rules as add_clips_to_timeline.
+                        set_item_property: item, properties (e.g. {"ZoomX": 1.2, "Pan": 100})
+                        set_clip_color: item, color (e.g. "Orange")
+                        add_marker: frame, color (default "Blue"), name, note, duration (default 1),
+                                    custom_data, and optional item (the marker frame is then relative
+                                    to the clip start; otherwise it is a timeline frame, 0 = start)
+                        add_track: track_type ("video", "audio" or "subtitle"; default "video")
+                        "item" is either the index of an earlier add_clip operation in this batch,
+                        or {"track_index": n, "frame": f} for the clip covering frame f on video track n
+                        (add "track_type" for other tracks).
+            stop_on_error: Stop at the first failed operation; later operations are not run. (default: False)
+            search_subfolders: If True, add_clip also searches subfolders of the current media pool folder.
+                               (default: False)
+        
+        Returns:
+            Per-operation results ({"index", "op", "ok", "result" or "error"}) and counts
+        """
+        if not operations:
+            return {"error": "No operations specified", "results": []}
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return {"error": f"Too many operations ({len(operations)}); the limit is {MAX_BATCH_OPERATIONS}",
+                    "results": []}
+        
+        def run_batch(ctx):
+            timeline = ctx.timeline
+            if not timeline:
+                if not ctx.project:
+                    return "No project is currently open"
+                return "No timeline is currently open. Please open or create a timeline first."
+            media_pool = ctx.media_pool
+            current_folder = ctx.current_folder
+            if not media_pool or not current_folder:
+                return "Failed to get current folder in media pool"
             
-            # recordFrameの不具合回避: ダミークリップ方式を使用
-            # ステップ1: recordFrame位置までダミークリップを追加
-            if start_frame > 0:
-                dummy_clip_config = {
-                    "mediaPoolItem": target_clip,
-                    "startFrame": 0,
-                    "endFrame": start_frame - 1,  # start_frameまでの長さ
-                    'trackIndex': 1,
-                }
+            runner = _BatchRunner(timeline, media_pool, current_folder, search_subfolders)
+            results = []
+            stopped_at = None
+            i = 0
+            while i < len(operations) and stopped_at is None:
+                op = operations[i].get("op")
+                if op == "add_clip":
+                    # 連続する add_clip をまとめて追加
+                    j = i
+                    while j < len(operations) and operations[j].get("op") == "add_clip":
+                        j += 1
+                    outcomes = runner.add_clips([(k, operations[k].get("args") or {}) for k in range(i, j)],
+                                                stop_on_error)
+                    i = j
+                else:
+                    try:
+                        outcomes = {i: (True, runner.run(op, operations[i].get("args") or {}))}
+                    except _BatchError as e:
+                        outcomes = {i: (False, str(e))}
+                    except Exception as e:
+                        outcomes = {i: (False, f"{type(e).__name__}: {e}")}
+                    i += 1
                 
-                dummy_result = media_pool.AppendToTimeline([dummy_clip_config])
-                if not dummy_result:
-                    return "Failed to add dummy clip"
+                for index in sorted(outcomes):
+                    ok, value = outcomes[index]
+                    entry = {"index": index, "op": operations[index].get("op"), "ok": ok}
+                    entry["result" if ok else "error"] = value
+                    results.append(entry)
+                    if not ok and stop_on_error:
+                        stopped_at = index
             
-            # ステップ2: 本来追加したいクリップを追加(recordFrameを指定しない)
-            clip_config = {
-                "mediaPoolItem": target_clip,
-                "startFrame": 0,
-                "endFrame": duration_in_frames - 1,
-                'trackIndex': 1
-                # recordFrameを指定しない - 自動的にダミーの次の位置に追加される
+            completed = sum(1 for entry in results if entry["ok"])
+            if completed:
+                get_snapshot_cache().invalidate(timeline)
+            return {
+                "timeline": timeline.GetName(),
+                "completed": completed,
+                "failed": len(results) - completed,
+                "not_run": len(operations) - len(results),
+                "stopped_at": stopped_at,
+                "results": results,
+            }
+        
+        result = await call_resolve(run_batch, timeout=BATCH_CALL_TIMEOUT)
+        if isinstance(result, str):
+            return {"error": result, "results": []}
+        return result
+
+    @mcp.resource("davinci://stats/timeline-snapshot")
+    def timeline_snapshot_stats() -> dict:
+        """Build count and field cache hit counters of the timeline snapshot cache"""
+        return get_snapshot_cache().stats()
+
+    @mcp.tool()
+    async def get_timeline_snapshot(fields: list[str] | None = None, track_types: list[str] | None = None,
+                                    cursor: str | None = None, page_size: int = 200,
+                                    refresh: bool = False) -> dict:
+        """
+        Get the tracks and items of the current timeline, one page at a time
+        
+        Only the requested fields are read from Resolve, and values are cached per
+        timeline until it is edited, so paging through a large timeline or asking
+        again is cheap. Pass next_cursor from the previous page to get the next page.
+        
+        Args:
+            fields: Item fields to return (default: name, start, end, duration). Available:
+                    name, unique_id, start, end, duration (frames; start/end are relative to the
+                    timeline start, 0 = beginning), left_offset, right_offset, source_start,
+                    source_end, clip_color, properties (all GetProperty values, e.g. Pan, ZoomX),
+                    clip_properties (all media pool clip properties). Use "properties.ZoomX" or
+                    "clip_properties.Resolution" to return a single key.
+            track_types: Track types to include, in order (default: ["video", "audio", "subtitle"])
+            cursor: next_cursor from the previous page; omit for the first page
+            page_size: Maximum number of items per page (default: 200, max: 1000)
+            refresh: Discard cached values and read everything from Resolve again (default: False)
+        
+        Returns:
+            Timeline info, the tracks in this page with their items, and next_cursor
+            (null when there are no more pages)
+        """
+        try:
+            parsed_fields = parse_fields(fields or DEFAULT_SNAPSHOT_FIELDS)
+        except ValueError as e:
+            return {"error": str(e)}
+        track_types = list(track_types or SNAPSHOT_TRACK_TYPES)
+        unknown = [t for t in track_types if t not in SNAPSHOT_TRACK_TYPES]
+        if unknown:
+            return {"error": f"Unknown track types: {', '.join(unknown)}"}
+        if not 1 <= page_size <= MAX_SNAPSHOT_PAGE_SIZE:
+            return {"error": f"page_size must be between 1 and {MAX_SNAPSHOT_PAGE_SIZE}"}
+        
+        def get_snapshot(ctx):
+            try:
+                timeline = ctx.timeline
+                if not timeline:
+                    if not ctx.project:
+                        return {"error": "No project is currently open"}
+                    return {"error": "No timeline is currently open. Please open or create a timeline first."}
+                return get_snapshot_cache().page(timeline, parsed_fields, track_types, cursor, page_size, refresh)
+            
+            except ValueError as e:
+                return {"error": str(e)}
+            except Exception as e:
+                return {"error": f"{type(e).__name__}: {str(e)}"}
+        
+        result = await call_resolve(get_snapshot)
+        if isinstance(result, str):
+            return {"error": result}
+        return result
+
+    @mcp.tool()
+    @cached("timeline", ttl=MARKER_CACHE_TTL)
+    async def get_markers(clip_name: str | None = None, item: TimelineItemRef | None = None,
+                          start_frame: int | None = None, end_frame: int | None = None,
+                          color: str | None = None, search_subfolders: bool = False,
+                          target: str | None = None) -> dict:
+        """
+        Get the markers of the current timeline, a media pool clip or a timeline item in one call
+        
+        Args:
+            clip_name: Read the markers of this media pool clip instead of the timeline
+            item: Read the markers of the timeline item covering {"track_index": n, "frame": f}
+                  (add "track_type" for audio/subtitle tracks) instead of the timeline
+            start_frame: Only markers at or after this frame
+            end_frame: Only markers before this frame
+            color: Only markers of this color
+            search_subfolders: Also search subfolders of the current media pool folder for clip_name
+            target: Resolve instance to read from when several are connected (a name from
+                    davinci://resolve/targets, or "auto"; default instance if omitted)
+        
+        Returns:
+            The target and its markers sorted by frame
+            ({"frame", "color", "name", "note", "duration", "custom_data"})
+        """
+        def read_markers(ctx):
+            target = _marker_target(ctx, clip_name, item, search_subfolders)
+            if isinstance(target, str):
+                return target
+            target, description = target
+            index = MarkerIndex(target.GetMarkers())
+            markers = [
+                {"frame": frame, "color": marker.get("color"), "name": marker.get("name"),
+                 "note": marker.get("note"), "duration": marker.get("duration"),
+                 "custom_data": marker.get("customData", "")}
+                for frame, marker in sorted(index.by_frame.items())
+                if (start_frame is None or frame >= start_frame) and (end_frame is None or frame < end_frame)
+                and (color is None or marker.get("color") == color)
+            ]
+            return {"target": description, "count": len(markers), "markers": markers}
+        
+        result = await call_resolve(read_markers, target=target)
+        if isinstance(result, str):
+            return {"error": result}
+        return result
+
+    @mcp.tool()
+    @invalidates("timeline")
+    async def sync_markers(markers: list[MarkerSpec], clip_name: str | None = None,
+                           item: TimelineItemRef | None = None, prune: str = "managed",
+                           dry_run: bool = False, search_subfolders: bool = False) -> dict:
+        """
+        Make the markers of the current timeline, a media pool clip or a timeline item match a desired set
+        
+        Reads the existing markers once and only adds, deletes or re-creates the markers that differ,
+        so re-syncing an unchanged set makes no changes. Markers are matched by custom_data (use a
+        stable ID such as a review note ID); markers without custom_data are matched by frame.
+        
+        Args:
+            markers: Desired markers: frame (timeline: 0 = timeline start; clip/item: relative to the
+                     clip start), color (default "Blue"), name, note, duration (default 1), custom_data
+            clip_name: Sync the markers of this media pool clip instead of the timeline
+            item: Sync the markers of the timeline item covering {"track_index": n, "frame": f}
+                  (add "track_type" for audio/subtitle tracks) instead of the timeline
+            prune: Existing markers not in the set: "managed" deletes those with custom_data (default),
+                   "all" deletes all of them, "none" keeps them
+            dry_run: Only report what would change
+            search_subfolders: Also search subfolders of the current media pool folder for clip_name
+        
+        Returns:
+            Counts of unchanged/added/updated/moved/deleted markers, API writes, markers that could
+            not be placed because a kept marker occupies the frame, and failed operations
+        """
+        if len(markers) > MAX_SYNC_MARKERS:
+            return {"error": f"Too many markers ({len(markers)}); the limit is {MAX_SYNC_MARKERS}"}
+        if prune not in PRUNE_MODES:
+            return {"error": f"prune must be one of: {', '.join(PRUNE_MODES)}"}
+        try:
+            desired = normalize_markers(markers)
+        except (TypeError, ValueError) as e:
+            return {"error": str(e)}
+        
+        def sync(ctx):
+            target = _marker_target(ctx, clip_name, item, search_subfolders)
+            if isinstance(target, str):
+                return target
+            target, description = target
+            plan = plan_marker_sync(MarkerIndex(target.GetMarkers()), desired, prune)
+            failed = [] if dry_run else apply_marker_sync(target, plan)
+            return {
+                "target": description,
+                "dry_run": dry_run,
+                **plan.counts,
+                "writes": plan.writes,
+                "conflicts": [{"frame": spec["frame"], "custom_data": spec["custom_data"]}
+                              for spec in plan.conflicts],
+                "failed": failed,
             }
+        
+        result = await call_resolve(sync, timeout=BATCH_CALL_TIMEOUT)
+        if isinstance(result, str):
+            return {"error": result}
+        return result
+
+    @mcp.tool(tags={TIMELINE_EDIT_TAG})
+    @invalidates("timeline")
+    async def apply_item_properties(rule: ItemPropertyRule, track_index: int | None = None,
+                                    track_type: str = "video", start_frame: int | None = None,
+                                    end_frame: int | None = None, dry_run: bool = False) -> dict:
+        """
+        Set transform/crop/composite properties (Pan, Tilt, ZoomX, ZoomY, RotationAngle, Crop*, Opacity, ...)
+        of every item on a track at once
+        
+        Reads the properties of all items once, computes the new values for all items together and
+        only calls SetProperty for values that actually change, so re-applying a rule makes no changes.
+        
+        Rule keys (applied in this order):
+        - fit: Fill a window of this aspect ratio, e.g. "9:16", centered in the timeline frame
+          (sets ZoomX/ZoomY/Pan/Tilt; assumes clips are scaled to fit the timeline at zoom 1.0)
+        - bias / vertical_bias: Which part of the clip stays in the window: "center" (default),
+          "left"/"right" ("top"/"bottom"), or -1 to 1
+        - crop: With fit, also crop away the part of the frame outside the window
+        - set: Constant values, e.g. {"Opacity": 80, "FlipX": true}
+        - expressions: Per-item formulas, e.g. {"ZoomX": "ZoomX * 1.1", "Pan": "where(index % 2 == 0, -100, 100)"}.
+          Names: any numeric property (value after fit/set), index, count, track, start, end, duration
+          (frames), width, height (timeline), clip_width, clip_height (source), pi.
+          Functions: abs, min, max, clip, round, sqrt, sin, cos, where
+        
+        Example: fit every clip on V2 to 9:16 keeping the center:
+        rule={"fit": "9:16", "bias": "center"}, track_index=2
+        
+        Args:
+            rule: The rule to apply (see above)
+            track_index: Track to edit (all tracks of track_type if omitted)
+            track_type: "video" (default) or "audio"
+            start_frame: Only items starting at or after this frame (0 = timeline start)
+            end_frame: Only items starting before this frame
+            dry_run: Only report what would change
+        
+        Returns:
+            Counts of items, changed items and SetProperty calls per property, min/max of the new values,
+            a few example changes and failed writes
+        """
+        if track_type not in ("video", "audio"):
+            return {"error": "track_type must be 'video' or 'audio'"}
+        if track_index is not None and track_index < 1:
+            return {"error": "track_index must be >= 1"}
+        if not isinstance(rule, dict):
+            return {"error": "rule must be an object"}
+        
+        def apply(ctx):
+            timeline = ctx.timeline
+            if not timeline:
+                if not ctx.project:
+                    return "No project is currently open"
+                return "No timeline is currently open. Please open or create a timeline first."
+            tracks = ([track_index] if track_index is not None
+                      else range(1, (timeline.GetTrackCount(track_type) or 0) + 1))
+            items = []
+            for index in tracks:
+                items.extend((index, item) for item in timeline.GetItemListInTrack(track_type, index) or [])
+            if not items:
+                return {"items": 0, "changed_items": 0, "writes": 0, "dry_run": dry_run}
             
-            result = media_pool.AppendToTimeline([clip_config])
-            if not result:
-                return "Failed to add clip to timeline"
+            # 1件目のプロパティ名でルールを検証してから全アイテムを読む
+            properties = [items[0][1].GetProperty() or {}]
+            try:
+                plan = PropertyRule(rule, properties[0])
+            except (TypeError, ValueError) as e:
+                return str(e)
             
-            # ステップ3: ダミークリップを削除（start_frame > 0の場合のみ）
-            if start_frame > 0:
-                track_items = timeline.GetItemListInTrack("video", 1)
-                if track_items and len(track_items) > 0:
-                    first_item = track_items[0]  # 最初のアイテム(ダミークリップ)
-                    delete_result = timeline.DeleteClips([first_item])
-                    if not delete_result:
-                        return "Failed to delete dummy clip (but main clip was added)"
+            width = float(timeline.GetSetting("timelineResolutionWidth") or 1920)
+            height = float(timeline.GetSetting("timelineResolutionHeight") or 1080)
+            timeline_start = timeline.GetStartFrame()
+            ranged = start_frame is not None or end_frame is not None
+            clip_sizes = {}
+            rows = []
+            selected = []
+            for i, (index, item) in enumerate(items):
+                row = {"track": index}
+                if ranged or plan.needs_timing:
+                    row["start"] = item.GetStart() - timeline_start
+                    if ((start_frame is not None and row["start"] < start_frame)
+                            or (end_frame is not None and row["start"] >= end_frame)):
+                        continue
+                    row["end"] = item.GetEnd() - timeline_start
+                    row["duration"] = row["end"] - row["start"]
+                row["properties"] = properties[0] if i == 0 else (item.GetProperty() or {})
+                if plan.needs_clip_size:
+                    # 同じクリップの解像度は1回だけ読む（読めない場合はタイムラインと同じとみなす）
+                    # GetMediaPoolItem() は呼び出しごとに別のオブジェクトを返すため、GetUniqueId() で識別する
+                    clip = item.GetMediaPoolItem()
+                    clip_id = clip.GetUniqueId() if clip else None
+                    if clip_id not in clip_sizes:
+                        clip_sizes[clip_id] = parse_resolution(clip.GetClipProperty("Resolution")) if clip else None
+                    row["clip_width"], row["clip_height"] = clip_sizes[clip_id] or (width, height)
+                rows.append(row)
+                selected.append(item)
             
-            timeline_name = timeline.GetName()
-            return f"Successfully added '{clip_name}' to timeline '{timeline_name}' at frame {start_frame} (duration: {duration_in_frames} frames)"
-                
-        except Exception as e:
-            return f"Error: {type(e).__name__}: {str(e)}"
+            try:
+                changes = plan.compute(rows, width, height)
+            except ValueError as e:
+                return str(e)
+            
+            writes = {}
+            values = {}
+            failed = []
+            samples = []
+            changed_items = 0
+            for row, item, change in zip(rows, selected, changes):
+                if not change:
+                    continue
+                changed_items += 1
+                if len(samples) < PROPERTY_CHANGE_SAMPLES:
+                    samples.append({"name": item.GetName(), "track": row["track"],
+                                    **{key: {"from": row["properties"].get(key), "to": value}
+                                       for key, value in change.items()}})
+                for key, value in change.items():
+                    writes[key] = writes.get(key, 0) + 1
+                    if not isinstance(value, bool) and isinstance(value, (int, float)):
+                        low, high = values.get(key, (value, value))
+                        values[key] = (min(low, value), max(high, value))
+                    if not dry_run and not item.SetProperty(key, value):
+                        failed.append({"name": item.GetName(), "track": row["track"], "property": key,
+                                       "value": value})
+            if not dry_run and sum(writes.values()) > len(failed):
+                # 変更フィードはアイテムのプロパティを追跡しないため、ここでスナップショットを破棄する
+                get_snapshot_cache().invalidate(timeline)
+            return {
+                "dry_run": dry_run,
+                "items": len(rows),
+                "changed_items": changed_items,
+                "writes": sum(writes.values()),
+                "properties": {key: {"writes": count, **({"min": values[key][0], "max": values[key][1]}
+                                                         if key in values else {})}
+                               for key, count in sorted(writes.items())},
+                "samples": samples,
+                "failed": failed[:MAX_REPORTED_FAILURES],
+                "failed_count": len(failed),
+            }
+        
+        result = await call_resolve(apply, timeout=BATCH_CALL_TIMEOUT)
+        if isinstance(result, str):
+            return {"error": result}
+        return result
+
+    @mcp.tool(tags={TIMELINE_EDIT_TAG})
+    @invalidates("timeline")
+    async def auto_cut_from_audio(clip_name: str, timeline_name: str | None = None, mode: str = "silence",
+                                  threshold_db: float = -40.0, min_silence: float = 0.5, padding: float = 0.1,
+                                  min_segment: float = 0.25, onset_db: float = 9.0, min_onset_gap: float = 0.25,
+                                  audio_path: str | None = None, dry_run: bool = False,
+                                  search_subfolders: bool = False) -> dict:
+        """
+        Cut a media pool clip by its audio and put the pieces on a new timeline, e.g. to remove the
+        silences from a podcast recording
+        
+        The clip's WAV file is analyzed in chunks through a memory map (hour-long multitrack files
+        take seconds), and the kept ranges are added to the new timeline with one AppendToTimeline call.
+        A range counts as silent when every channel is below threshold_db.
+        
+        Args:
+            clip_name: Media pool clip to cut (its File Path must be a WAV file unless audio_path is given)
+            timeline_name: Name of the new timeline (default: "<clip_name> (auto cut)")
+            mode: "silence" removes silences (default); "onsets" keeps everything but cuts at each
+                  sudden rise in level (speech or beat onsets)
+            threshold_db: Level below which audio counts as silent, in dBFS (default: -40)
+            min_silence: Shortest silence to remove, in seconds (default: 0.5)
+            padding: Audio kept before and after each removed silence, in seconds (default: 0.1)
+            min_segment: Drop kept pieces shorter than this, in seconds (default: 0.25)
+            onset_db: "onsets" mode: level rise (dB within 30 ms) that counts as an onset (default: 9)
+            min_onset_gap: "onsets" mode: shortest time between cuts, in seconds (default: 0.25)
+            audio_path: Analyze this WAV file instead of the clip's own file (e.g. a separately recorded
+                        track in sync with the clip)
+            dry_run: Only analyze and report the cuts
+            search_subfolders: Also search subfolders of the current media pool folder for clip_name
+        
+        Returns:
+            The analyzed audio, number of pieces, kept and removed seconds, the first cuts (clip frames)
+            and the new timeline
+        """
+        if mode not in AUDIO_CUT_MODES:
+            return {"error": f"mode must be one of: {', '.join(AUDIO_CUT_MODES)}"}
+        if min_silence <= 0 or padding < 0 or min_segment < 0 or min_onset_gap <= 0:
+            return {"error": "min_silence and min_onset_gap must be positive; padding and min_segment must be >= 0"}
+        timeline_name = timeline_name or f"{clip_name} (auto cut)"
+        
+        def find_clip(ctx):
+            if not ctx.project:
+                return "No project is currently open"
+            current_folder = ctx.current_folder
+            if not current_folder:
+                return "Failed to get current folder in media pool"
+            clip = get_clip_index().find_clip(current_folder, clip_name, recursive=search_subfolders)
+            if clip is None:
+                return f"Clip '{clip_name}' not found in media pool"
+            return clip
+        
+        def read_clip(ctx):
+            try:
+                clip = find_clip(ctx)
+                if isinstance(clip, str):
+                    return clip
+                frames = clip.GetClipProperty("Frames")
+                fps = clip.GetClipProperty("FPS") or ctx.project.GetSetting("timelineFrameRate")
+                return {
+                    "path": clip.GetClipProperty("File Path"),
+                    "fps": parse_frame_rate(fps),
+                    "frames": int(frames) if str(frames or "").isdigit() else None,
+                }
+            except Exception as e:
+                return f"Error: {type(e).__name__}: {str(e)}"
+        
+        clip_info = await call_resolve(read_clip)
+        if isinstance(clip_info, str):
+            return {"error": clip_info}
+        path = audio_path or clip_info["path"]
+        if not path:
+            return {"error": f"Clip '{clip_name}' has no file path; pass audio_path"}
+        
+        started = time.perf_counter()
+        try:
+            analysis = await asyncio.to_thread(analyze_audio, path, mode, threshold_db, min_silence, padding,
+                                               min_segment, onset_db, min_onset_gap)
+        except (OSError, ValueError) as e:
+            return {"error": f"Failed to analyze {path}: {e}"}
+        regions = analysis["regions"]
+        kept = sum(end - start for start, end in regions)
+        result = {
+            "clip": clip_name,
+            "mode": mode,
+            "audio": analysis["audio"],
+            "analysis_seconds": round(time.perf_counter() - started, 3),
+            "silences": analysis["silences"],
+            **({"onsets": analysis["onsets"]} if "onsets" in analysis else {}),
+            "pieces": len(regions),
+            "kept_seconds": round(kept, 3),
+            "removed_seconds": round(analysis["audio"]["duration"] - kept, 3),
+            "dry_run": dry_run,
+        }
+        if not regions:
+            return {**result, "error": "Nothing to keep; the whole file is below threshold_db"}
+        
+        def cut(ctx):
+            try:
+                clip = find_clip(ctx)
+                if isinstance(clip, str):
+                    return clip
+                clip_infos = _audio_cut_clip_infos(clip, regions, clip_info["fps"], clip_info["frames"])
+                cuts = [[info["startFrame"], info["endFrame"]] for info in clip_infos[:AUTO_CUT_SAMPLES]]
+                if dry_run:
+                    return {"cuts": cuts}
+                media_pool = ctx.media_pool
+                timeline = media_pool.CreateEmptyTimeline(timeline_name)
+                if not timeline:
+                    return f"Failed to create timeline '{timeline_name}' (a timeline with that name may already exist)"
+                ctx.project.SetCurrentTimeline(timeline)
+                # すべての区間を1回の AppendToTimeline で追加する
+                appended = media_pool.AppendToTimeline(clip_infos) or []
+                return {"timeline": timeline_name, "appended": len(appended), "cuts": cuts}
+            except Exception as e:
+                return f"Error: {type(e).__name__}: {str(e)}"
+        
+        cut_result = await call_resolve(cut, timeout=BATCH_CALL_TIMEOUT)
+        if isinstance(cut_result, str):
+            return {**result, "error": cut_result}
+        return {**result, **cut_result}
+
+    @mcp.resource("davinci://stats/frame-preview")
+    def frame_preview_stats() -> dict:
+        """Entries, bytes and hit/miss/eviction counters of the frame preview image cache"""
+        return get_preview_cache().stats()
+
+    @mcp.tool()
+    async def get_frame_preview(frame: int | None = None, max_size: int = DEFAULT_PREVIEW_SIZE,
+                                image_format: str = "auto", refresh: bool = False) -> ToolResult:
+        """
+        Get a small preview image of the current timeline at a frame
+        
+        Moves the playhead to the frame, takes a downscaled thumbnail of the clip there (from the
+        current clip of the Color page) and moves the playhead back. Previews are cached per
+        timeline, clip and frame, so looking at the same frames again is fast.
+        
+        Args:
+            frame: Timeline frame (0 = timeline start); the current playhead position if omitted
+            max_size: Maximum width/height of the preview in pixels (default: 320, max: 1920)
+            image_format: "auto" (JPEG when available, otherwise PNG), "jpeg" or "png"
+            refresh: Ignore the cached preview (e.g. after changing the grade)
+        
+        Returns:
+            The preview image, plus its frame, clip, size and format
+        """
+        if not 16 <= max_size <= MAX_PREVIEW_SIZE:
+            return ToolResult(structured_content={"error": f"max_size must be between 16 and {MAX_PREVIEW_SIZE}"})
+        if image_format not in PREVIEW_FORMATS:
+            return ToolResult(structured_content={"error": f"image_format must be one of: {', '.join(PREVIEW_FORMATS)}"})
+        output_format = resolve_format(image_format)
+        cache = get_preview_cache()
+        
+        def grab_thumbnail(ctx):
+            timeline = ctx.timeline
+            if not timeline:
+                if not ctx.project:
+                    return "No project is currently open"
+                return "No timeline is currently open. Please open or create a timeline first."
+            start_frame = timeline.GetStartFrame()
+            fps = parse_frame_rate(timeline.GetSetting("timelineFrameRate"))
+            if frame is None:
+                position = timecode_to_frames(timeline.GetCurrentTimecode(), fps) - start_frame
+                return thumbnail_at(ctx, timeline, position)
+            # プレビューは読み取りだけのため、動かした再生ヘッドはユーザーの位置に戻す
+            playhead = timeline.GetCurrentTimecode()
+            try:
+                if not timeline.SetCurrentTimecode(frames_to_timecode(start_frame + frame, fps)):
+                    return f"Failed to move the playhead to frame {frame}"
+                return thumbnail_at(ctx, timeline, frame)
+            finally:
+                if playhead:
+                    timeline.SetCurrentTimecode(playhead)
+        
+        def thumbnail_at(ctx, timeline, position):
+            item = timeline.GetCurrentVideoItem()
+            if not item:
+                return f"No video clip at frame {position}"
+            
+            key = (ctx.timeline_id, item.GetUniqueId(), position, max_size, output_format)
+            info = {"frame": position, "clip": item.GetName()}
+            if not refresh:
+                cached = cache.get(key)
+                if cached is not None:
+                    return key, info, cached, None
+            thumbnail = timeline.GetCurrentClipThumbnailImage()
+            if not thumbnail or not thumbnail.get("data"):
+                return "Failed to get a thumbnail (the Color page must be available for the current clip)"
+            return key, info, None, thumbnail
+        
+        result = await call_resolve(grab_thumbnail)
+        if isinstance(result, str):
+            return ToolResult(structured_content={"error": result})
+        key, info, preview, thumbnail = result
+        cached = preview is not None
+        if not cached:
+            # 縮小と圧縮はResolveの実行スレッドとイベントループを塞がないようワーカースレッドで行う
+            try:
+                preview = await asyncio.get_running_loop().run_in_executor(
+                    get_preview_pool(), render_preview, thumbnail, max_size, output_format)
+            except (KeyError, TypeError, ValueError) as e:
+                return ToolResult(structured_content={"error": f"Failed to decode thumbnail: {e}"})
+            cache.put(key, preview)
+        
+        data, width, height = preview
+        info.update({"width": width, "height": height, "format": output_format, "bytes": len(data), "cached": cached})
+        return ToolResult(content=[Image(data=data, format=output_format).to_image_content(),
+                                   TextContent(type="text", text=json.dumps(info))],
+                          structured_content=info)
+
+    @mcp.tool()
+    async def export_timeline_structure(fields: list[str] | None = None, track_types: list[str] | None = None,
+                                        export_format: str = "otio", target: str | None = None) -> dict:
+        """
+        Get every track and item of the current timeline in one request, fast even for very large timelines
+        
+        The timeline is exported to a temporary file with Timeline.Export (one API call) and the file
+        is parsed, instead of reading each item through the API. The result has the same shape as
+        get_timeline_snapshot (all items in one page). Fields the file does not contain, and tracks the
+        format does not cover, are read through the API.
+        
+        Args:
+            fields: Item fields to return (default: name, start, end, duration). name, start, end, duration,
+                    source_start and source_end come from the file; other get_timeline_snapshot fields
+                    (unique_id, properties.ZoomX, clip_color, ...) are read through the API.
+            track_types: Track types to include, in order (default: ["video", "audio"]; subtitle tracks are
+                         read through the API)
+            export_format: "otio" (default, all video and audio tracks), "fcpxml" (video tracks as lanes,
+                           audio as negative lanes) or "edl" (video track 1 only; other tracks via the API)
+            target: Resolve instance to export from when several are connected (a name from
+                    davinci://resolve/targets, or "auto" for the least busy one; default instance if omitted)
+        
+        Returns:
+            Timeline info, tracks with their items, and how the data was obtained (export/parse/API times)
+        """
+        try:
+            parsed_fields = parse_fields(fields or DEFAULT_SNAPSHOT_FIELDS)
+        except ValueError as e:
+            return {"error": str(e)}
+        track_types = list(track_types or EXPORT_TRACK_TYPES)
+        unknown = [t for t in track_types if t not in SNAPSHOT_TRACK_TYPES]
+        if unknown:
+            return {"error": f"Unknown track types: {', '.join(unknown)}"}
+        if export_format not in EXPORT_FORMATS:
+            return {"error": f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"}
+        api_fields = [field for field in parsed_fields if field[1] not in FILE_FIELDS]
+        type_name, subtype_name, extension = EXPORT_FORMATS[export_format]
+        try:
+            # 書き出しとAPIでの読み込みを同じ接続で行うため、"auto" はここで1回だけ解決する
+            target = get_resolve_pool().select(target).name
+        except ValueError as e:
+            return {"error": str(e)}
+        
+        temp_dir = tempfile.mkdtemp(prefix="davinci_mcp_export_")
+        path = os.path.join(temp_dir, "timeline" + extension)
+        
+        def export(ctx):
+            timeline = ctx.timeline
+            if not timeline:
+                if not ctx.project:
+                    return "No project is currently open"
+                return "No timeline is currently open. Please open or create a timeline first."
+            export_type = getattr(ctx.resolve, type_name, None)
+            if export_type is None:
+                return f"This version of DaVinci Resolve cannot export {export_format}"
+            args = [path, export_type]
+            if subtype_name:
+                args.append(getattr(ctx.resolve, subtype_name))
+            started = time.perf_counter()
+            if not timeline.Export(*args):
+                return f"Failed to export the timeline as {export_format}"
+            export_ms = (time.perf_counter() - started) * 1000
+            start_frame = timeline.GetStartFrame()
+            return {
+                "timeline": {
+                    "name": timeline.GetName(),
+                    "unique_id": ctx.timeline_id,
+                    "start_frame": start_frame,
+                    "end_frame": timeline.GetEndFrame() - start_frame,
+                },
+                "fps": parse_frame_rate(timeline.GetSetting("timelineFrameRate")),
+                "track_counts": {track_type: timeline.GetTrackCount(track_type) or 0 for track_type in track_types},
+                "export_ms": export_ms,
+            }
+        
+        try:
+            info = await call_resolve(export, timeout=BATCH_CALL_TIMEOUT, target=target)
+            if isinstance(info, str):
+                return {"error": info}
+            started = time.perf_counter()
+            try:
+                file_tracks = await asyncio.to_thread(_read_export, export_format, path, info["fps"],
+                                                      info["timeline"]["start_frame"], track_types)
+            except (OSError, KeyError, TypeError, ValueError, ParseError) as e:
+                return {"error": f"Failed to read the exported {export_format} file: {type(e).__name__}: {e}"}
+            parse_ms = (time.perf_counter() - started) * 1000
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        
+        track_keys = [(track_type, index) for track_type in track_types
+                      for index in range(1, info["track_counts"][track_type] + 1)]
+        api_tracks = [key for key in track_keys if api_fields or not covers_track(export_format, *key)]
+        
+        def read_from_api(ctx):
+            timeline = ctx.timeline
+            if not timeline or ctx.timeline_id != info["timeline"]["unique_id"]:
+                return "The current timeline changed while reading it"
+            start_frame = info["timeline"]["start_frame"]
+            names = {name for _, name, _ in parsed_fields}
+            for key in api_tracks:
+                items = timeline.GetItemListInTrack(*key) or []
+                if not covers_track(export_format, *key):
+                    file_tracks[key] = [{name: ITEM_FIELDS[name](item, start_frame) for name in names} for item in items]
+                    continue
+                # ファイルとAPIのアイテムは同じ開始位置順。数が合わない場合だけ開始位置で対応付ける
+                rows = file_tracks.get(key, [])
+                if len(items) != len(rows):
+                    by_start = {item.GetStart() - start_frame: item for item in items}
+                    items = [by_start.get(row["start"]) for row in rows]
+                for row, item in zip(rows, items):
+                    for _, name, _ in api_fields:
+                        row[name] = ITEM_FIELDS[name](item, start_frame) if item is not None else None
+            return None
+        
+        api_ms = 0.0
+        if api_tracks:
+            started = time.perf_counter()
+            error = await call_resolve(read_from_api, timeout=BATCH_CALL_TIMEOUT, target=target)
+            if error:
+                return {"error": error}
+            api_ms = (time.perf_counter() - started) * 1000
+        
+        return {
+            "timeline": info["timeline"],
+            "tracks": [
+                {
+                    "type": track_type,
+                    "index": index,
+                    "item_count": len(file_tracks.get((track_type, index), [])),
+                    "items": [_project_row(i, values, parsed_fields)
+                              for i, values in enumerate(file_tracks.get((track_type, index), []))],
+                }
+                for track_type, index in track_keys
+            ],
+            "next_cursor": None,
+            "source": {
+                "format": export_format,
+                "export_ms": round(info["export_ms"], 3),
+                "parse_ms": round(parse_ms, 3),
+                "api_ms": round(api_ms, 3),
+                "api_fields": [output_name for output_name, _, _ in api_fields],
+                "api_tracks": [f"{track_type} {index}" for track_type, index in api_tracks],
+            },
+        }
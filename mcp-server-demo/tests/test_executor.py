@@ -0,0 +1,263 @@
+"""
+executor のタイムアウト・サーキットブレーカーと deadlines のツールの期限のテスト
+
+使い方:
+    python -m unittest discover tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+
+from fake_resolve import build_demo_resolve  # noqa: E402
+from fastmcp import Client, FastMCP  # noqa: E402
+
+from tools import set_resolve_instance  # noqa: E402
+from tools.deadlines import ToolDeadlineMiddleware, parse_deadlines  # noqa: E402
+from tools.executor import (  # noqa: E402
+    CircuitBreaker, ResolveBusyError, ResolveExecutor, call_resolve, get_executor, tool_deadline,
+)
+
+
+def block(context, event):
+    """event が設定されるまでワーカースレッドを止める（応答しないResolveの代わり）"""
+    event.wait(5)
+    return "released"
+
+
+def wait_idle(executor):
+    """取り消された呼び出しを含め、キューが空になるまで待つ"""
+    for _ in range(500):
+        if executor.pending == 0:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"executor still has {executor.pending} pending calls")
+
+
+class ResolveExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ResolveExecutor(queue_size=4, context_provider=lambda: None, name="test")
+        self.event = threading.Event()
+
+    def tearDown(self):
+        self.event.set()
+
+    def test_call_runs_on_worker_thread(self):
+        result = asyncio.run(self.executor.call(lambda context, value: (value, threading.current_thread().name), 1))
+        self.assertEqual(result, (1, "resolve-executor-test"))
+        self.assertEqual(self.executor.stats()["completed"], 1)
+
+    def test_exception_is_raised_to_caller(self):
+        def fail(context):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.executor.call(fail))
+        # 例外はタイムアウトではないため、ブレーカーの失敗には数えない
+        self.assertEqual(self.executor.breaker.consecutive_failures, 0)
+
+    def test_timeout_cancels_queued_call(self):
+        ran = []
+
+        async def run():
+            blocked = self.executor.submit(block, self.event)
+            with self.assertRaises(ResolveBusyError) as raised:
+                await self.executor.call(lambda context: ran.append(True), timeout=0.05)
+            self.event.set()
+            await asyncio.wrap_future(blocked)
+            return raised.exception
+
+        error = asyncio.run(run())
+        self.assertEqual(error.reason, "timeout")
+        wait_idle(self.executor)
+        # キューで待っていた呼び出しは実行されない
+        self.assertEqual(ran, [])
+        stats = self.executor.stats()
+        self.assertEqual((stats["timeouts"], stats["cancelled"]), (1, 1))
+
+    def test_queue_full(self):
+        running = self.executor.submit(block, self.event)
+        while not running.running():
+            time.sleep(0.01)
+        for _ in range(4):
+            self.executor.submit(block, self.event)
+        with self.assertRaises(ResolveBusyError) as raised:
+            self.executor.submit(block, self.event)
+        self.assertEqual(raised.exception.reason, "queue_full")
+        self.assertEqual(self.executor.stats()["rejected"], 1)
+        self.event.set()
+        wait_idle(self.executor)
+
+    def test_exclusive_call_rejects_others(self):
+        async def run():
+            task = asyncio.create_task(self.executor.call(block, self.event, exclusive="exporting project 'A'"))
+            for _ in range(100):
+                if self.executor.exclusive is not None:
+                    break
+                await asyncio.sleep(0.01)
+            with self.assertRaises(ResolveBusyError) as raised:
+                await self.executor.call(lambda context: None)
+            self.event.set()
+            await task
+            return raised.exception
+
+        error = asyncio.run(run())
+        self.assertEqual(error.reason, "exclusive")
+        self.assertIn("exporting project 'A'", str(error))
+        self.assertIsNone(self.executor.exclusive)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ResolveExecutor(context_provider=lambda: None, name="breaker")
+        self.executor.breaker = CircuitBreaker(failure_threshold=3, probe_interval=0.05, probe_timeout=1.0)
+        self.event = threading.Event()
+
+    def tearDown(self):
+        self.event.set()
+
+    def test_opens_after_consecutive_timeouts_and_closes_after_probe(self):
+        breaker = self.executor.breaker
+
+        async def run():
+            self.executor.submit(block, self.event)
+            for _ in range(3):
+                with self.assertRaises(ResolveBusyError):
+                    await self.executor.call(lambda context: None, timeout=0.01)
+            self.assertEqual(breaker.state, "open")
+
+            # 開いている間はキューに積まずにすぐに断る
+            submitted = self.executor.submitted
+            with self.assertRaises(ResolveBusyError) as raised:
+                await self.executor.call(lambda context: None)
+            self.assertEqual(raised.exception.reason, "circuit_open")
+            self.assertEqual(raised.exception.retry_after, 0.05)
+            self.assertEqual(self.executor.submitted, submitted)
+
+            # Resolveが応答するようになればヘルスチェックで閉じる
+            self.event.set()
+            for _ in range(100):
+                if breaker.state == "closed":
+                    break
+                await asyncio.sleep(0.02)
+            return await self.executor.call(lambda context: "ok")
+
+        self.assertEqual(asyncio.run(run()), "ok")
+        stats = breaker.stats()
+        self.assertEqual((stats["state"], stats["trips"], stats["short_circuited"]), ("closed", 1, 1))
+        self.assertGreaterEqual(stats["probes"], 1)
+
+    def test_success_resets_failure_count(self):
+        breaker = self.executor.breaker
+
+        async def run():
+            for _ in range(2):
+                blocked = self.executor.submit(block, self.event)
+                with self.assertRaises(ResolveBusyError):
+                    await self.executor.call(lambda context: None, timeout=0.01)
+                self.event.set()
+                await asyncio.wrap_future(blocked)
+                self.event.clear()
+                await self.executor.call(lambda context: None)
+
+        asyncio.run(run())
+        self.assertEqual((breaker.state, breaker.consecutive_failures), ("closed", 0))
+
+
+class ParseDeadlinesTest(unittest.TestCase):
+
+    def test_values(self):
+        self.assertEqual(parse_deadlines("45"), {"default": 45.0})
+        self.assertEqual(parse_deadlines("default=45, execute_batch=600,import_media=none,sync_markers=0"),
+                         {"default": 45.0, "execute_batch": 600.0, "import_media": None, "sync_markers": None})
+        self.assertEqual(parse_deadlines(None), {})
+
+    def test_invalid_entries_are_ignored(self):
+        with self.assertLogs("tools.deadlines", "WARNING"):
+            deadlines = parse_deadlines("execute_batch=ten,build_timeline=-5,search_clips=inf,default=20")
+        self.assertEqual(deadlines, {"default": 20.0})
+
+    def test_deadline_for(self):
+        middleware = ToolDeadlineMiddleware({"default": 10.0, "build_timeline": None})
+        self.assertEqual(middleware.deadline_for("get_project_name"), 10.0)
+        self.assertIsNone(middleware.deadline_for("build_timeline"))
+        self.assertEqual(middleware.deadline_for("execute_batch"), 300.0)
+
+
+class ToolDeadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        set_resolve_instance(build_demo_resolve(clip_count=1))
+        self.event = threading.Event()
+
+    def tearDown(self):
+        self.event.set()
+        wait_idle(get_executor())
+
+    def test_expired_deadline_does_not_call_resolve(self):
+        async def run():
+            token = tool_deadline.set(time.monotonic() - 1)
+            try:
+                await call_resolve(lambda context: None)
+            finally:
+                tool_deadline.reset(token)
+
+        submitted = get_executor().submitted
+        with self.assertRaises(ResolveBusyError) as raised:
+            asyncio.run(run())
+        self.assertEqual((raised.exception.reason, raised.exception.target), ("deadline", "default"))
+        self.assertEqual(get_executor().submitted, submitted)
+
+    def test_deadline_limits_call_timeout(self):
+        async def run():
+            token = tool_deadline.set(time.monotonic() + 0.1)
+            try:
+                started = time.monotonic()
+                with self.assertRaises(ResolveBusyError):
+                    await call_resolve(block, self.event, timeout=30)
+                return time.monotonic() - started
+            finally:
+                tool_deadline.reset(token)
+
+        self.assertLess(asyncio.run(run()), 1.0)
+
+    def test_busy_result(self):
+        mcp = FastMCP("deadlines")
+        mcp.add_middleware(ToolDeadlineMiddleware({"default": 0.1, "slow_tool": 0.1}))
+
+        @mcp.tool()
+        async def stuck_tool():
+            return await call_resolve(block, self.event)
+
+        @mcp.tool()
+        async def slow_tool():
+            await asyncio.sleep(5)
+            return "done"
+
+        async def run():
+            async with Client(mcp) as client:
+                stuck = await client.call_tool("stuck_tool", {}, raise_on_error=False)
+                slow = await client.call_tool("slow_tool", {}, raise_on_error=False)
+                return stuck, slow
+
+        stuck, slow = asyncio.run(run())
+        for result, reason in ((stuck, "timeout"), (slow, "deadline")):
+            self.assertTrue(result.is_error)
+            info = json.loads(result.content[0].text)
+            self.assertTrue(info["busy"])
+            self.assertEqual((info["reason"], info["deadline_seconds"]), (reason, 0.1))
+        # 1回のタイムアウトではブレーカーは開かない
+        get_executor().breaker.record_success()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+item_properties の式の評価のテスト
+
+使い方:
+    python -m unittest discover tests
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench")
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_resolve import build_demo_resolve  # noqa: E402
+from fastmcp import Client, FastMCP  # noqa: E402
+
+from tools import register_tools, set_resolve_instance  # noqa: E402
+
+# 式の評価がこれより長くかかったら失敗とする秒数
+EVALUATION_TIMEOUT = 10.0
+
+# 子プロセスで compute() を実行するスクリプト
+# （巨大な整数の計算はGILを手放さないため、同じプロセスではタイムアウトを検出できない）
+_COMPUTE_SCRIPT = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+from tools import item_properties
+if sys.argv[3] == "scalar":
+    item_properties.np = None
+rows = [{"properties": {"ZoomX": 1.0, "ZoomY": 1.0, "Pan": 0.0, "Tilt": 0.0}} for _ in range(3)]
+try:
+    rule = item_properties.PropertyRule({"expressions": json.loads(sys.argv[2])}, ("ZoomX", "ZoomY", "Pan", "Tilt"))
+    print(json.dumps({"result": rule.compute(rows, 1920, 1080)}))
+except ValueError as e:
+    print(json.dumps({"error": str(e)}))
+"""
+
+
+def _compute(expressions, mode):
+    """
+    子プロセスで式を評価する
+
+    Args:
+        expressions: {プロパティ名: 式}
+        mode: "vectorized"（NumPyで計算）または "scalar"（NumPyなしで計算）
+
+    Returns:
+        {"result": 変更のリスト} または {"error": ValueError のメッセージ}
+    """
+    try:
+        completed = subprocess.run([sys.executable, "-c", _COMPUTE_SCRIPT, SRC_DIR, json.dumps(expressions), mode],
+                                   capture_output=True, text=True, timeout=EVALUATION_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise AssertionError(f"compute() did not finish within {EVALUATION_TIMEOUT} seconds: {expressions}")
+    if completed.returncode != 0:
+        raise AssertionError(completed.stderr)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def _has_numpy():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ExpressionTest(unittest.TestCase):
+
+    def check_huge_power(self, mode):
+        for text in ("9**9**9", "(index + 2) ** 99999", "(count + 9) ** 9 ** 9"):
+            with self.subTest(expression=text):
+                outcome = _compute({"ZoomX": text}, mode)
+                # 大きすぎる累乗はエラーになるか、計算できない値（inf）として書き込まれない
+                if "result" in outcome:
+                    self.assertTrue(all("ZoomX" not in change for change in outcome["result"]), outcome)
+
+    @unittest.skipUnless(_has_numpy(), "NumPy is not installed")
+    def test_huge_power_vectorized(self):
+        self.check_huge_power("vectorized")
+
+    def test_huge_power_scalar(self):
+        self.check_huge_power("scalar")
+
+    def test_power(self):
+        modes = ("vectorized", "scalar") if _has_numpy() else ("scalar",)
+        for mode in modes:
+            with self.subTest(mode=mode):
+                changes = _compute({"ZoomX": "2 ** 3", "Pan": "index ** 2"}, mode)["result"]
+                self.assertEqual([change.get("ZoomX") for change in changes], [8.0, 8.0, 8.0])
+                self.assertEqual([change.get("Pan") for change in changes], [None, 1.0, 4.0])
+
+
+
+class ApplyItemPropertiesTest(unittest.TestCase):
+
+    def setUp(self):
+        set_resolve_instance(build_demo_resolve(clip_count=3, timeline_items=4))
+        self.mcp = FastMCP("test")
+        register_tools(self.mcp, lazy=False)
+
+    def test_snapshot_shows_new_values(self):
+        async def run():
+            async with Client(self.mcp) as client:
+                fields = ["name", "properties.ZoomX"]
+                before = (await client.call_tool("get_timeline_snapshot", {"fields": fields,
+                                                                           "track_types": ["video"]})).data
+                applied = (await client.call_tool("apply_item_properties", {"rule": {"set": {"ZoomX": 2.0}},
+                                                                            "track_index": 1})).data
+                after = (await client.call_tool("get_timeline_snapshot", {"fields": fields,
+                                                                          "track_types": ["video"]})).data
+                return before, applied, after
+
+        before, applied, after = asyncio.run(run())
+        self.assertEqual(applied["changed_items"], 4)
+        zoom = [[item["properties.ZoomX"] for item in track["items"]] for track in before["tracks"]]
+        self.assertEqual(zoom, [[1.0] * 4])
+        zoom = [[item["properties.ZoomX"] for item in track["items"]] for track in after["tracks"]]
+        self.assertEqual(zoom, [[2.0] * 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+marker_sync の差分の計画のテスト
+
+使い方:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from tools.marker_sync import MarkerIndex, normalize_markers, plan_marker_sync  # noqa: E402
+
+
+def existing(frame_markers):
+    """{フレーム: (色, 名前, customData)} から GetMarkers() の形の辞書を作る"""
+    return MarkerIndex({
+        frame: {"color": color, "name": name, "note": "", "duration": 1, "customData": custom_data}
+        for frame, (color, name, custom_data) in frame_markers.items()
+    })
+
+
+class NormalizeMarkersTest(unittest.TestCase):
+
+    def test_defaults(self):
+        self.assertEqual(normalize_markers([{"frame": "12"}]), [
+            {"color": "Blue", "name": "", "note": "", "duration": 1, "frame": 12, "custom_data": ""},
+        ])
+
+    def test_rejects_duplicates_and_bad_values(self):
+        for markers in ([{"frame": 1}, {"frame": 1}],
+                        [{"frame": 1, "custom_data": "a"}, {"frame": 2, "custom_data": "a"}],
+                        [{"frame": 1, "duration": 0}],
+                        [{"name": "no frame"}]):
+            with self.subTest(markers=markers), self.assertRaises(ValueError):
+                normalize_markers(markers)
+
+
+class PlanMarkerSyncTest(unittest.TestCase):
+
+    def test_unchanged_needs_no_writes(self):
+        index = existing({10: ("Blue", "A", "id-a"), 20: ("Red", "B", "")})
+        desired = normalize_markers([
+            {"frame": 10, "name": "A", "custom_data": "id-a"},
+            {"frame": 20, "color": "Red", "name": "B"},
+        ])
+        plan = plan_marker_sync(index, desired)
+        self.assertEqual(plan.writes, 0)
+        self.assertEqual(plan.counts["unchanged"], 2)
+
+    def test_changed_marker_is_replaced(self):
+        index = existing({10: ("Blue", "A", "id-a")})
+        plan = plan_marker_sync(index, normalize_markers([{"frame": 10, "name": "A2", "custom_data": "id-a"}]))
+        self.assertEqual(plan.deletes, [10])
+        self.assertEqual([spec["name"] for spec in plan.adds], ["A2"])
+        self.assertEqual(plan.counts["updated"], 1)
+
+    def test_moved_marker(self):
+        index = existing({10: ("Blue", "A", "id-a")})
+        plan = plan_marker_sync(index, normalize_markers([{"frame": 30, "name": "A", "custom_data": "id-a"}]))
+        self.assertEqual((plan.deletes, [spec["frame"] for spec in plan.adds]), ([10], [30]))
+        self.assertEqual(plan.counts["moved"], 1)
+
+    def test_same_content_is_relabelled(self):
+        index = existing({10: ("Blue", "A", "")})
+        plan = plan_marker_sync(index, normalize_markers([{"frame": 10, "name": "A", "custom_data": "id-a"}]))
+        # 削除と追加ではなく customData の付け替えだけ
+        self.assertEqual((plan.deletes, plan.adds, plan.relabels), ([], [], [(10, "id-a")]))
+        self.assertEqual(plan.counts["updated"], 1)
+
+    def test_prune_modes(self):
+        markers = {10: ("Blue", "managed", "id-old"), 20: ("Red", "manual", "")}
+        expected = {"managed": [10], "all": [10, 20], "none": []}
+        for prune, deletes in expected.items():
+            with self.subTest(prune=prune):
+                plan = plan_marker_sync(existing(markers), [], prune)
+                self.assertEqual(sorted(plan.deletes), deletes)
+                self.assertEqual(plan.counts["deleted"], len(deletes))
+
+    def test_kept_marker_blocks_add(self):
+        index = existing({10: ("Red", "manual", "")})
+        plan = plan_marker_sync(index, normalize_markers([{"frame": 10, "name": "new", "custom_data": "id-new"}]),
+                                prune="none")
+        self.assertEqual([spec["custom_data"] for spec in plan.conflicts], ["id-new"])
+        self.assertEqual(plan.writes, 0)
+
+    def test_blocked_move_keeps_source(self):
+        # 移動先に残るマーカーがあるため、移動元のマーカーも削除しない
+        index = existing({10: ("Blue", "A", "id-a"), 30: ("Red", "manual", "")})
+        plan = plan_marker_sync(index, normalize_markers([{"frame": 30, "name": "A", "custom_data": "id-a"}]),
+                                prune="managed")
+        self.assertEqual((plan.deletes, plan.adds), ([], []))
+        self.assertEqual(len(plan.conflicts), 1)
+
+    def test_swap_frames(self):
+        index = existing({10: ("Blue", "A", "id-a"), 20: ("Blue", "B", "id-b")})
+        desired = normalize_markers([
+            {"frame": 20, "name": "A", "custom_data": "id-a"},
+            {"frame": 10, "name": "B", "custom_data": "id-b"},
+        ])
+        plan = plan_marker_sync(index, desired)
+        self.assertEqual(sorted(plan.deletes), [10, 20])
+        self.assertEqual(sorted(spec["frame"] for spec in plan.adds), [10, 20])
+        self.assertEqual((plan.counts["moved"], plan.conflicts), (2, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
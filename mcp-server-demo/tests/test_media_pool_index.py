@@ -0,0 +1,84 @@
+"""
+media_pool_index のクリップ名インデックスのテスト
+
+使い方:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+
+from fake_resolve import CallRecorder, FakeFolder  # noqa: E402
+
+from tools.media_pool_index import ClipIndex  # noqa: E402
+
+
+class ClipIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = CallRecorder()
+        self.root = FakeFolder(self.recorder, "Master")
+        for i in range(100):
+            self.root.add_clip(f"Clip {i:03d}")
+        self.sub = self.root.add_subfolder("Interviews")
+        self.sub.add_clip("Interview A")
+        self.index = ClipIndex()
+
+    def property_reads(self):
+        return self.recorder.snapshot().get("MediaPoolItem.GetClipProperty", 0)
+
+    def test_hit_reads_one_property(self):
+        self.assertIs(self.index.find_clip(self.root, "Clip 042"), self.root._clips[42])
+        self.recorder.reset()
+        self.assertIs(self.index.find_clip(self.root, "Clip 042"), self.root._clips[42])
+        # ヒットした1件の名前の再確認だけ
+        self.assertEqual(self.property_reads(), 1)
+
+    def test_subfolder_lookups_do_not_rebuild_root(self):
+        # 1回目の検索で親フォルダを構築し、2回目の検索で見つからない名前のために1回だけ再構築する
+        self.assertIsNotNone(self.index.find_clip(self.root, "Interview A", recursive=True))
+        self.assertIsNotNone(self.index.find_clip(self.root, "Interview A", recursive=True))
+        rebuilds = self.index.rebuilds
+        self.recorder.reset()
+        for _ in range(5):
+            self.assertIs(self.index.find_clip(self.root, "Interview A", recursive=True), self.sub._clips[0])
+            self.assertEqual(self.index.find_clips(self.root, ["Interview A"], recursive=True),
+                             {"Interview A": self.sub._clips[0]})
+        self.assertEqual(self.index.rebuilds, rebuilds)
+        # サブフォルダでヒットした1件の再確認だけ
+        self.assertEqual(self.property_reads(), 10)
+
+    def test_rename_to_searched_name(self):
+        self.assertIsNone(self.index.find_clip(self.root, "Renamed"))
+        self.root._clips[5].SetClipProperty("Clip Name", "Renamed")
+        # シグネチャは変わらないが、見つからない名前で1回だけ再構築する
+        self.assertIs(self.index.find_clip(self.root, "Renamed"), self.root._clips[5])
+        self.assertIsNone(self.index.find_clip(self.root, "Clip 005"))
+
+    def test_rename_of_hit_is_detected(self):
+        self.assertIsNotNone(self.index.find_clip(self.root, "Clip 007"))
+        self.root._clips[7].SetClipProperty("Clip Name", "Other")
+        self.assertIsNone(self.index.find_clip(self.root, "Clip 007"))
+        self.assertEqual(self.index.find_clips(self.root, ["Other", "Clip 008"]),
+                         {"Other": self.root._clips[7], "Clip 008": self.root._clips[8]})
+
+    def test_signature_change_rebuilds(self):
+        self.assertIsNone(self.index.find_clip(self.root, "New clip"))
+        self.assertIsNone(self.index.find_clip(self.root, "New clip"))
+        rebuilds = self.index.rebuilds
+        clip = self.root.add_clip("New clip")
+        self.assertIs(self.index.find_clip(self.root, "New clip"), clip)
+        self.assertEqual(self.index.rebuilds, rebuilds + 1)
+
+    def test_duplicate_names_prefer_first(self):
+        duplicate = self.root.add_clip("Clip 000")
+        self.assertIs(self.index.find_clip(self.root, "Clip 000"), self.root._clips[0])
+        self.assertIsNot(self.index.find_clip(self.root, "Clip 000"), duplicate)
+
+
+if __name__ == "__main__":
+    unittest.main()
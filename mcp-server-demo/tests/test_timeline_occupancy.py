@@ -0,0 +1,109 @@
+"""
+timeline_occupancy のトラック占有状況インデックスのテスト
+
+使い方:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+
+from fake_resolve import CallRecorder, FakeTimeline  # noqa: E402
+
+from tools.timeline_occupancy import OccupancyIndex, TrackOccupancy  # noqa: E402
+
+
+class TrackOccupancyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.track = TrackOccupancy([(100, 150), (0, 50), (200, 240)])
+
+    def test_end(self):
+        self.assertEqual(self.track.end, 240)
+        self.assertEqual(TrackOccupancy().end, 0)
+
+    def test_overlaps(self):
+        self.assertTrue(self.track.overlaps(40, 60))
+        self.assertTrue(self.track.overlaps(120, 130))
+        self.assertTrue(self.track.overlaps(0, 300))
+        # 区間は [start, end) のため、接しているだけなら重ならない
+        self.assertFalse(self.track.overlaps(50, 100))
+        self.assertFalse(self.track.overlaps(150, 200))
+        self.assertFalse(self.track.overlaps(240, 300))
+
+    def test_first_free_slot(self):
+        self.assertEqual(self.track.first_free_slot(0, 50), 50)
+        self.assertEqual(self.track.first_free_slot(0, 60), 240)
+        self.assertEqual(self.track.first_free_slot(160, 40), 160)
+        self.assertEqual(self.track.first_free_slot(160, 41), 240)
+        self.assertEqual(self.track.first_free_slot(300, 10), 300)
+
+    def test_add_keeps_order(self):
+        self.track.add(60, 90)
+        self.assertEqual(self.track.first_free_slot(50, 20), 150)
+        self.assertTrue(self.track.matches([(0, 50), (60, 90), (100, 150), (200, 240)]))
+        self.assertFalse(self.track.matches([(0, 50), (100, 150), (200, 240)]))
+
+
+class OccupancyIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = CallRecorder()
+        self.timeline = FakeTimeline(self.recorder, "Timeline 1", start_frame=1000)
+        self.items = [self.timeline.place(None, 1, 50, 1000 + start) for start in (0, 100, 200)]
+        self.index = OccupancyIndex()
+
+    def reads(self):
+        counts = self.recorder.snapshot()
+        return counts.get("TimelineItem.GetStart", 0) + counts.get("TimelineItem.GetEnd", 0)
+
+    def test_relative_frames_and_cached_build(self):
+        track = self.index.tracks(self.timeline, [1])[1]
+        self.assertEqual(track.end, 250)
+        self.assertEqual(track.first_free_slot(0, 50), 50)
+        self.recorder.reset()
+        self.assertIs(self.index.tracks(self.timeline, [1])[1], track)
+        # 2回目はアイテムの一覧だけを取得し、開始・終了は読まない
+        self.assertEqual(self.reads(), 0)
+        self.assertEqual(self.index.builds, 1)
+
+    def test_record_added_does_not_rebuild(self):
+        self.index.tracks(self.timeline, [1])
+        self.timeline.place(None, 1, 30, 1250)
+        self.index.record_added(self.timeline, [(1, 250, 280)])
+        track = self.index.tracks(self.timeline, [1])[1]
+        self.assertEqual(track.end, 280)
+        self.assertEqual(self.index.builds, 1)
+
+    def test_deleted_clip_inside_track_is_detected(self):
+        self.assertTrue(self.index.tracks(self.timeline, [1])[1].overlaps(100, 150))
+        # 終了フレームの変わらない途中のクリップの削除
+        self.timeline.DeleteClips([self.items[1]])
+        track = self.index.tracks(self.timeline, [1])[1]
+        self.assertFalse(track.overlaps(100, 150))
+        self.assertEqual(self.index.builds, 2)
+
+    def test_end_frame_change_rebuilds(self):
+        self.index.tracks(self.timeline, [1])
+        self.timeline.place(None, 1, 50, 1300)
+        self.timeline.DeleteClips([self.items[0]])
+        self.assertEqual(self.index.tracks(self.timeline, [1])[1].end, 350)
+        self.assertEqual(self.index.builds, 2)
+
+    def test_reconcile_drops_only_changed_tracks(self):
+        self.timeline.place(None, 2, 50, 1000)
+        self.index.tracks(self.timeline, [1, 2])
+        timeline_id = self.timeline.GetUniqueId()
+        dropped = self.index.reconcile(timeline_id, {("video", 1): [(0, 50), (100, 150), (200, 250)],
+                                                     ("video", 2): [(10, 60)]})
+        self.assertEqual(dropped, 1)
+        self.index.tracks(self.timeline, [1, 2])
+        self.assertEqual(self.index.builds, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
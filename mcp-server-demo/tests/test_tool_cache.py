@@ -0,0 +1,158 @@
+"""
+base の ToolCache（TTL・同時呼び出しの集約・無効化）のテスト
+
+使い方:
+    python -m unittest discover tests
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from tools.base import ToolCache  # noqa: E402
+
+
+class Counter:
+    """呼び出し回数を数え、指定した時間待ってから結果を返すツールの代わり"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"result {call}"
+
+
+class ToolCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ToolCache()
+        self.key = ("get_current_timeline_name", "{}")
+
+    def test_hit_within_ttl(self):
+        func = Counter()
+
+        async def run():
+            first = await self.cache.get_or_call(self.key, "timeline", 60, func)
+            second = await self.cache.get_or_call(self.key, "timeline", 60, func)
+            return first, second
+
+        self.assertEqual(asyncio.run(run()), ("result 1", "result 1"))
+        self.assertEqual(func.calls, 1)
+        self.assertEqual(self.cache.stats()["tools"]["get_current_timeline_name"]["hits"], 1)
+
+    def test_expires_after_ttl(self):
+        func = Counter()
+
+        async def run():
+            first = await self.cache.get_or_call(self.key, "timeline", 0.05, func)
+            await asyncio.sleep(0.1)
+            second = await self.cache.get_or_call(self.key, "timeline", 0.05, func)
+            return first, second
+
+        self.assertEqual(asyncio.run(run()), ("result 1", "result 2"))
+        self.assertEqual(func.calls, 2)
+
+    def test_concurrent_callers_share_one_call(self):
+        func = Counter(delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*(
+                self.cache.get_or_call(self.key, "timeline", 60, func) for _ in range(10)))
+
+        self.assertEqual(asyncio.run(run()), ["result 1"] * 10)
+        self.assertEqual(func.calls, 1)
+        counters = self.cache.stats()["tools"]["get_current_timeline_name"]
+        self.assertEqual((counters["misses"], counters["coalesced"]), (1, 9))
+        self.assertEqual(self.cache.stats()["in_flight"], 0)
+
+    def test_concurrent_callers_share_the_exception(self):
+        func = Counter(delay=0.05, error=RuntimeError("Resolve went away"))
+
+        async def run():
+            return await asyncio.gather(*(
+                self.cache.get_or_call(self.key, "timeline", 60, func) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertEqual(func.calls, 1)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        # 例外はキャッシュしない
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_errors_are_not_cached(self):
+        async def not_connected():
+            return "No Resolve instance available"
+
+        async def error():
+            return {"error": "No project is currently open"}
+
+        async def run():
+            await self.cache.get_or_call(self.key, "timeline", 60, not_connected)
+            await self.cache.get_or_call(("search_clips", "{}"), "folder", 60, error)
+
+        asyncio.run(run())
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_invalidate_drops_scope(self):
+        func = Counter()
+        folder_key = ("list_media_pool_clips", "{}")
+
+        async def run():
+            await self.cache.get_or_call(self.key, "timeline", 60, func)
+            await self.cache.get_or_call(folder_key, "folder", 60, func)
+            self.cache.invalidate("timeline")
+            timeline = await self.cache.get_or_call(self.key, "timeline", 60, func)
+            folder = await self.cache.get_or_call(folder_key, "folder", 60, func)
+            return timeline, folder
+
+        self.assertEqual(asyncio.run(run()), ("result 3", "result 2"))
+
+    def test_project_invalidates_every_scope(self):
+        func = Counter()
+
+        async def run():
+            await self.cache.get_or_call(self.key, "timeline", 60, func)
+            self.cache.invalidate("project")
+            return await self.cache.get_or_call(self.key, "timeline", 60, func)
+
+        self.assertEqual(asyncio.run(run()), "result 2")
+
+    def test_result_invalidated_while_running_is_not_kept(self):
+        func = Counter(delay=0.05)
+
+        async def run():
+            task = asyncio.create_task(self.cache.get_or_call(self.key, "timeline", 60, func))
+            await asyncio.sleep(0.01)
+            self.cache.invalidate("timeline")
+            # 無効化の後の呼び出しは実行中の呼び出しを待たずに実行し直す
+            after = await self.cache.get_or_call(self.key, "timeline", 60, func)
+            before = await task
+            return before, after
+
+        self.assertEqual(asyncio.run(run()), ("result 1", "result 2"))
+        self.assertEqual(func.calls, 2)
+
+    def test_evicts_oldest_entries(self):
+        cache = ToolCache(max_entries=3)
+        func = Counter()
+
+        async def run():
+            for i in range(5):
+                await cache.get_or_call(("tool", str(i)), "project", 60, func)
+
+        asyncio.run(run())
+        self.assertEqual(cache.stats()["entries"], 3)
+        self.assertEqual(list(cache._entries), [("tool", "2"), ("tool", "3"), ("tool", "4")])
+
+
+if __name__ == "__main__":
+    unittest.main()